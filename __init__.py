@@ -0,0 +1,72 @@
+"""Postprocessing of FEM-design stresses to crack widths for deformation load cases
+
+Importing the package does not import any of its modules, pandas or the excel, parquet and scipy
+dependencies. The functions below are imported from their module on first access, e.g.
+
+    import deformation_load_cracking as dlc
+    df_sigma=dlc.getTopBottomShellStressesDataFrame("FD_STRESSES.xlsx")
+
+only imports stress_approach and what it needs.
+
+The modules import each other relative to the package, so importing the package does not change
+sys.path and does not publish its modules under top level names. When a module is run as a script or
+imported from the repository folder, e.g. python crack_width_batch.py, it falls back to importing the
+other modules by their plain names.
+"""
+import importlib
+
+#public name -> module it is defined in
+_LAZY_ATTRIBUTES = {
+    "readFemDesignWorkbook":"fd_loader",
+    "iterFemDesignWorkbookChunks":"fd_loader",
+    "fillMissingStringsInDataFrame":"fd_loader",
+    "readFemDesignWorkbookCached":"fd_cache",
+    "clearCache":"fd_cache",
+    "readFemDesignTextExport":"fd_text_export",
+    "iterFemDesignTextTables":"fd_text_export",
+    "writeBatchScript":"fd_text_export",
+    "getTopBottomShellStressesDataFrame":"stress_approach",
+    "strainsAtRebars":"stress_approach",
+    "strainsAtRebarsArrays":"stress_approach",
+    "crackWidths":"crack_width",
+    "crackWidthArrays":"crack_width",
+    "crackWidthsInRebarDirections":"crack_width",
+    "principalToComponents":"shell_calculations",
+    "componentsToPrincipal":"shell_calculations",
+    "rebarDirectionStresses":"shell_calculations",
+    "proposeRebars":"reinforcement",
+    "minimumReinforcementLayout":"reinforcement",
+    "nLargestPerGroup":"group_selection",
+    "sweepCrackWidths":"parameter_sweep",
+    "UnitLoadCases":"superposition",
+    "combinedCrackWidths":"superposition",
+    "loadCaseEnvelope":"envelope",
+    "governingLoadCases":"envelope",
+    "smoothNodalStresses":"smoothing",
+    "compactDataFrame":"result_table",
+    "ResultTable":"result_table",
+    "ResultStore":"result_store",
+    "writeCrackWidthStore":"result_store",
+    "streamCrackWidths":"streaming",
+    "writeDataFrame":"result_writers",
+    "writeGroupedFiles":"result_writers",
+    "writeGroupedWorkbook":"result_writers",
+    "runBatch":"crack_width_batch",
+    "watchExports":"watch_exports",
+    "tracing":"instrumentation",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    module_name=_LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module=importlib.import_module(f".{module_name}",__name__)
+    value=getattr(module,name)
+    #cached on the package, so __getattr__ is only called once per name
+    globals()[name]=value
+    return value
+
+def __dir__():
+    return sorted(set(globals())|set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,312 @@
+"""Benchmarks of the loaders, calculation engines and writers on synthetic FEM-design exports
+
+A synthetic export of the requested size is written with synthetic_exports, then every benchmark is
+run `repeat` times and the best wall time is kept. Peak memory is measured in one extra run under
+tracemalloc before the timed runs, so they are not slowed down by it and start with warm imports.
+Every result is appended to a history file together with the git commit and package versions, and
+compared with the previous result of the same benchmark and export size, so regressions show up
+between runs.
+
+usage:
+    python benchmarks/run_benchmarks.py --shells 20 --elements 500 --load-cases 10
+    python benchmarks/run_benchmarks.py --only load_txt strains_at_rebars --repeat 5
+
+Benchmarks:
+    load_xlsx_cold             getTopBottomShellStressesDataFrame on the workbook, parquet cache cleared first
+    load_xlsx_cached           getTopBottomShellStressesDataFrame on the workbook, tables from the parquet cache
+    load_txt                   getTopBottomShellStressesDataFrame on the list file
+    strains_at_rebars          stress_approach.strainsAtRebars for all rows
+    crack_widths               crack_width.crackWidthsInRebarDirections for all rows
+    merge_dataframes           FD_TO_MULTICON.mergeDataFrames of all tables of the workbook
+    propose_rebar_diameters    FD_TO_MULTICON.proposeElementwiseRebarDiameters of the merged table
+    write_xlsx, write_csv, write_parquet  result_writers.writeDataFrame of the merged table
+    write_grouped_xlsx         result_writers.writeGroupedFiles, one workbook per shell
+"""
+import os
+import sys
+import csv
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime,timezone
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR,"inspiration"))
+
+from synthetic_exports import SyntheticModel,writeSyntheticWorkbook,writeSyntheticTextExport
+from instrumentation import maxRssMb
+
+DEFAULT_HISTORY_PATH = os.path.join(BENCHMARK_DIR,"benchmark_history.csv")
+HISTORY_COLUMNS = ['timestamp','commit','python','numpy','pandas','benchmark','export_rows','rows','repeat',
+    'best_s','mean_s','rows_per_s','peak_traced_mb','max_rss_mb']
+
+#parameters of the calculation benchmarks, as in the example of stress_approach
+T = 300
+EC = 30000
+PHI = 16
+CC = 200
+D_TOP = (T-45-PHI/2,T-45-PHI*3/2)
+
+class BenchmarkContext:
+    """Synthetic exports and the intermediate tables benchmarks start from
+
+    Intermediate tables are computed on first use and outside of the timed runs.
+    """
+    def __init__(self,model,work_dir):
+        self.model=model
+        self.work_dir=work_dir
+        self.output_dir=os.path.join(work_dir,"output")
+        os.makedirs(self.output_dir,exist_ok=True)
+
+    @cached_property
+    def xlsx_path(self):
+        path=os.path.join(self.work_dir,"synthetic.xlsx")
+        writeSyntheticWorkbook(self.model,path)
+        return path
+
+    @cached_property
+    def txt_path(self):
+        path=os.path.join(self.work_dir,"synthetic.txt")
+        writeSyntheticTextExport(self.model,path)
+        return path
+
+    @cached_property
+    def fd_workbook(self):
+        from fd_cache import readFemDesignWorkbookCached
+        return readFemDesignWorkbookCached(self.xlsx_path)
+
+    @cached_property
+    def df_sigma(self):
+        from stress_approach import getTopBottomShellStressesDataFrame
+        return getTopBottomShellStressesDataFrame(self.txt_path)
+
+    @cached_property
+    def df_epsilon(self):
+        from stress_approach import strainsAtRebars
+        return strainsAtRebars(self.df_sigma,T,EC,D_TOP)
+
+    @cached_property
+    def merge_inputs(self):
+        import FD_TO_MULTICON
+        fd_workbook=self.fd_workbook
+        return (FD_TO_MULTICON.getLoadCasesDataFrame(self.xlsx_path,fd_workbook=fd_workbook),
+            FD_TO_MULTICON.getShellStressesDataFrame(self.xlsx_path,n_largest=None,fd_workbook=fd_workbook),
+            FD_TO_MULTICON.getShellInternalForcesDataFrame(self.xlsx_path,fd_workbook=fd_workbook),
+            FD_TO_MULTICON.getAppliedReinforcement(self.xlsx_path,fd_workbook=fd_workbook),
+            FD_TO_MULTICON.getWallsAndPlatesDataFrame(self.xlsx_path,fd_workbook=fd_workbook))
+
+    @cached_property
+    def df_mapped(self):
+        import FD_TO_MULTICON
+        return FD_TO_MULTICON.mapFDColumnsToMCColumns(FD_TO_MULTICON.mergeDataFrames(*self.merge_inputs))
+
+    def outputPath(self,name):
+        return os.path.join(self.output_dir,name)
+
+def _clearCache(context):
+    from fd_cache import clearCache
+    clearCache(context.xlsx_path)
+
+def _warmCache(context):
+    from fd_cache import readFemDesignWorkbookCached
+    readFemDesignWorkbookCached(context.xlsx_path,kinds=("stresses_top","stresses_bottom"))
+
+def _clearOutput(context):
+    shutil.rmtree(context.output_dir,ignore_errors=True)
+    os.makedirs(context.output_dir,exist_ok=True)
+
+def loadStresses(context,path):
+    from stress_approach import getTopBottomShellStressesDataFrame
+    return len(getTopBottomShellStressesDataFrame(path))
+
+def strainsAtRebarsBenchmark(context):
+    from stress_approach import strainsAtRebars
+    return len(strainsAtRebars(context.df_sigma,T,EC,D_TOP))
+
+def crackWidthsBenchmark(context):
+    from crack_width import crackWidthsInRebarDirections
+    return len(crackWidthsInRebarDirections(context.df_epsilon,T,PHI,CC,D_TOP))
+
+def mergeDataFramesBenchmark(context):
+    import FD_TO_MULTICON
+    #mergeDataFrames modifies some of its inputs, every run starts from copies
+    inputs=[df.copy() for df in context.merge_inputs]
+    return len(FD_TO_MULTICON.mergeDataFrames(*inputs))
+
+def proposeRebarDiametersBenchmark(context):
+    import FD_TO_MULTICON
+    #the progress messages of proposeElementwiseRebarDiameters are not part of the benchmark output
+    with open(os.devnull,"w") as devnull,contextlib.redirect_stdout(devnull):
+        df=FD_TO_MULTICON.proposeElementwiseRebarDiameters(context.df_mapped)
+    return len(df)
+
+def writeBenchmark(context,file_format):
+    from result_writers import writeDataFrame
+    writeDataFrame(context.df_mapped,context.outputPath(f"mapped.{file_format}"),sheet_name="XLSX-Export")
+    return len(context.df_mapped)
+
+def writeGroupedBenchmark(context):
+    from result_writers import writeGroupedFiles
+    writeGroupedFiles(context.df_mapped,output_dir=context.outputPath("grouped"),file_format="xlsx",max_workers=1)
+    return len(context.df_mapped)
+
+#name -> (function(context) returning number of rows processed, setup(context) run before every run or None)
+BENCHMARKS = {
+    "load_xlsx_cold":(lambda context: loadStresses(context,context.xlsx_path),_clearCache),
+    "load_xlsx_cached":(lambda context: loadStresses(context,context.xlsx_path),_warmCache),
+    "load_txt":(lambda context: loadStresses(context,context.txt_path),None),
+    "strains_at_rebars":(strainsAtRebarsBenchmark,None),
+    "crack_widths":(crackWidthsBenchmark,None),
+    "merge_dataframes":(mergeDataFramesBenchmark,None),
+    "propose_rebar_diameters":(proposeRebarDiametersBenchmark,None),
+    "write_xlsx":(lambda context: writeBenchmark(context,"xlsx"),_clearOutput),
+    "write_csv":(lambda context: writeBenchmark(context,"csv"),_clearOutput),
+    "write_parquet":(lambda context: writeBenchmark(context,"parquet"),_clearOutput),
+    "write_grouped_xlsx":(writeGroupedBenchmark,_clearOutput),
+}
+
+def runBenchmark(name,context,repeat=3,measure_memory=True):
+    """Runs one benchmark repeat times, after one run under tracemalloc if measure_memory
+
+    Returns dictionary with rows, best and mean wall time [s], rows per second and peak memory [MB]
+    """
+    function,setup=BENCHMARKS[name]
+
+    #the memory run comes first and also warms up imports and caches of numpy and pandas for the timed runs
+    peak_traced_mb=None
+    if measure_memory:
+        if setup is not None:
+            setup(context)
+        tracemalloc.start()
+        try:
+            function(context)
+            peak_traced_mb=tracemalloc.get_traced_memory()[1]/1024**2
+        finally:
+            tracemalloc.stop()
+
+    times=[]
+    for _ in range(repeat):
+        if setup is not None:
+            setup(context)
+        start=time.perf_counter()
+        n_rows=function(context)
+        times.append(time.perf_counter()-start)
+
+    best=min(times)
+    return {"benchmark":name,"rows":n_rows,"repeat":repeat,"best_s":best,"mean_s":float(np.mean(times)),
+        "rows_per_s":n_rows/best if best>0 else float("inf"),"peak_traced_mb":peak_traced_mb,"max_rss_mb":maxRssMb()}
+
+def gitCommit():
+    #Short hash of the checked out commit, with + if the work tree has changes, None outside git
+    try:
+        commit=subprocess.run(["git","rev-parse","--short","HEAD"],cwd=REPO_DIR,capture_output=True,text=True,check=True).stdout.strip()
+        changes=subprocess.run(["git","status","--porcelain","--untracked-files=no"],cwd=REPO_DIR,capture_output=True,text=True,check=True).stdout
+    except (OSError,subprocess.CalledProcessError):
+        return None
+    return commit+("+" if changes.strip() else "")
+
+def readHistory(history_path=DEFAULT_HISTORY_PATH):
+    if not os.path.exists(history_path):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.read_csv(history_path)
+
+def appendHistory(results,history_path=DEFAULT_HISTORY_PATH):
+    #Appends result rows to the history csv, writing the header for a new file
+    new_file=not os.path.exists(history_path)
+    with open(history_path,"a",newline="") as f:
+        writer=csv.DictWriter(f,fieldnames=HISTORY_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        for result in results:
+            writer.writerow({column:result.get(column) for column in HISTORY_COLUMNS})
+
+def compareWithHistory(results,df_history):
+    """Dataframe of results with the best time of the previous run of the same benchmark and export size
+
+    ratio: best_s / previous_best_s, above 1 is slower than before
+    """
+    df=pd.DataFrame(results)[['benchmark','export_rows','rows','best_s','rows_per_s','peak_traced_mb']]
+    if len(df_history):
+        previous=df_history.drop_duplicates(['benchmark','export_rows'],keep="last")[['benchmark','export_rows','best_s']]
+        df=df.merge(previous.rename(columns={"best_s":"previous_best_s"}),on=['benchmark','export_rows'],how="left")
+    else:
+        df["previous_best_s"]=np.nan
+    df["ratio"]=df["best_s"]/df["previous_best_s"]
+    return df
+
+def runBenchmarks(model,names=None,repeat=3,measure_memory=True,work_dir=None,history_path=DEFAULT_HISTORY_PATH):
+    """Runs the benchmarks on synthetic exports of model and appends the results to the history
+
+    names: names in BENCHMARKS, all if None
+    work_dir: directory of the synthetic exports and outputs, a temporary directory removed afterwards if None
+    history_path: csv history of results, not written if None
+
+    Returns dataframe of results compared with the previous run, see compareWithHistory
+    """
+    names=list(BENCHMARKS) if names is None else list(names)
+    unknown=[name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}, expected some of {list(BENCHMARKS)}")
+
+    temporary_dir=tempfile.mkdtemp(prefix="fd_benchmarks_") if work_dir is None else None
+    context=BenchmarkContext(model,work_dir if work_dir is not None else temporary_dir)
+    timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds")
+    versions={"timestamp":timestamp,"commit":gitCommit(),"python":platform.python_version(),
+        "numpy":np.__version__,"pandas":pd.__version__,"export_rows":model.n_rows*model.n_load_cases}
+
+    results=[]
+    try:
+        for name in names:
+            result=runBenchmark(name,context,repeat=repeat,measure_memory=measure_memory)
+            result.update(versions)
+            results.append(result)
+            print(f"{name:<26}{result['best_s']:>10.3f} s{result['rows_per_s']:>14,.0f} rows/s"
+                +(f"{result['peak_traced_mb']:>10.1f} MB" if result['peak_traced_mb'] is not None else ""))
+    finally:
+        if temporary_dir is not None:
+            shutil.rmtree(temporary_dir,ignore_errors=True)
+
+    df_history=readHistory(history_path) if history_path is not None else pd.DataFrame(columns=HISTORY_COLUMNS)
+    df_comparison=compareWithHistory(results,df_history)
+    if history_path is not None:
+        appendHistory(results,history_path)
+
+    return df_comparison
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Benchmarks on synthetic FEM-design exports")
+    parser.add_argument("--shells",type=int,default=10,help="number of shells")
+    parser.add_argument("--elements",type=int,default=500,help="elements per shell")
+    parser.add_argument("--nodes",type=int,default=1,choices=range(1,5),help="result rows per element, 1 to 4")
+    parser.add_argument("--load-cases",type=int,default=5,help="number of load cases")
+    parser.add_argument("--repeat",type=int,default=3,help="timed runs per benchmark, the best is kept")
+    parser.add_argument("--only",nargs="+",choices=list(BENCHMARKS),help="benchmarks to run, all if not given")
+    parser.add_argument("--no-memory",action="store_true",help="skip the tracemalloc run of every benchmark")
+    parser.add_argument("--work-dir",help="directory for exports and outputs, a temporary directory if not given")
+    parser.add_argument("--history",default=DEFAULT_HISTORY_PATH,help="csv file the results are appended to")
+    parser.add_argument("--no-history",action="store_true",help="do not read or write the history file")
+    args=parser.parse_args(argv)
+
+    model=SyntheticModel(args.shells,args.elements,nodes_per_element=args.nodes,n_load_cases=args.load_cases)
+    print(f"Synthetic export: {args.shells} shells x {args.elements} elements x {args.nodes} nodes x {args.load_cases} load cases"
+        f" = {model.n_rows*model.n_load_cases:,} rows per table kind")
+
+    df_comparison=runBenchmarks(model,names=args.only,repeat=args.repeat,measure_memory=not args.no_memory,
+        work_dir=args.work_dir,history_path=None if args.no_history else args.history)
+    with pd.option_context("display.max_columns",None,"display.width",200):
+        print(df_comparison)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
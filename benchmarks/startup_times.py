@@ -0,0 +1,135 @@
+"""Cold import times of the modules, checked against a budget
+
+Worker processes of parallel runs (crack_width_batch, result_writers.writeGroupedFiles) import the
+pipeline modules again when processes are spawned, so slow or noisy imports are paid once per worker.
+Every module is imported in a fresh interpreter, repeat times, and the fastest import is compared with
+the budget. A module also fails the check if importing it
+- prints anything, i.e. runs code at import, or
+- imports one of the optional heavy dependencies in HEAVY_MODULES, which should be imported inside the
+  functions that use them. Dependencies pandas itself imports, e.g. pyarrow for strings in pandas 3,
+  are not counted.
+
+The exit code is 1 if any module fails, so the check can run in CI. Results can be appended to the
+benchmark history of run_benchmarks as benchmarks named "import <module>".
+
+usage:
+    python benchmarks/startup_times.py --budget 1.5 --repeat 3
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+from datetime import datetime,timezone
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+#modules of the repository, and the directory they are imported from
+MODULES = {name:REPO_DIR for name in ("fd_loader","fd_cache","fd_text_export","shell_calculations","crack_width",
+    "stress_approach","force_approach","group_selection","reinforcement","parameter_sweep","superposition","envelope",
+    "smoothing","result_table","result_store","result_writers","streaming","instrumentation","crack_width_batch","watch_exports")}
+MODULES["FD_TO_MULTICON"]=os.path.join(REPO_DIR,"inspiration")
+MODULES["excel2mult_runner"]=os.path.join(REPO_DIR,"inspiration")
+#the repository as package, see __init__.py, importable when its folder name is a valid module name
+PACKAGE_NAME = os.path.basename(REPO_DIR)
+if PACKAGE_NAME.isidentifier():
+    MODULES[PACKAGE_NAME]=os.path.dirname(REPO_DIR)
+
+#optional dependencies that are only needed by some functions and are slow to import
+HEAVY_MODULES = ("openpyxl","docx","scipy","pyarrow","xarray","matplotlib","zarr","h5py")
+#every module imports pandas, heavy modules imported by pandas are not counted
+BASELINE_MODULE = "pandas"
+
+DEFAULT_BUDGET_S = 1.5
+
+#run in the fresh interpreter, the last line of output is the measurement
+_IMPORT_SCRIPT = """
+import sys,time,json
+sys.path.insert(0,{directory!r})
+start=time.perf_counter()
+import {module}
+elapsed=time.perf_counter()-start
+print(json.dumps({{"import_s":elapsed,"heavy":sorted(set(sys.modules)&set({heavy!r}))}}))
+"""
+
+def importTime(module,directory=REPO_DIR):
+    """Imports module in a fresh interpreter
+
+    Returns dictionary with import_s, the heavy modules imported and the output printed at import
+    """
+    script=_IMPORT_SCRIPT.format(directory=directory,module=module,heavy=HEAVY_MODULES)
+    completed=subprocess.run([sys.executable,"-c",script],cwd=directory,capture_output=True,text=True)
+    if completed.returncode!=0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    lines=completed.stdout.rstrip("\n").split("\n")
+    result=json.loads(lines[-1])
+    result["output"]="\n".join(lines[:-1])
+    return result
+
+def interpreterStartTime():
+    #Wall time of starting and stopping an interpreter without imports [s], for reference
+    import time
+    start=time.perf_counter()
+    subprocess.run([sys.executable,"-c","pass"],check=True)
+    return time.perf_counter()-start
+
+def checkStartupTimes(modules=None,budget=DEFAULT_BUDGET_S,repeat=3):
+    """Cold import time of every module and whether it meets the budget
+
+    modules: names in MODULES, all if None
+    budget: largest allowed import time [s]
+
+    Returns list of dictionaries with module, import_s (fastest of repeat), heavy, output, ok and reason
+    """
+    baseline=set(importTime(BASELINE_MODULE)["heavy"])
+    results=[]
+    for module in (MODULES if modules is None else modules):
+        runs=[importTime(module,MODULES[module]) for _ in range(repeat)]
+        best=min(runs,key=lambda run: run["import_s"])
+        heavy=[name for name in best["heavy"] if name not in baseline]
+
+        reasons=[]
+        if best["import_s"]>budget:
+            reasons.append(f"import takes {best['import_s']:.3f} s, budget {budget:.3f} s")
+        if heavy:
+            reasons.append(f"imports {', '.join(heavy)}")
+        if best["output"]:
+            reasons.append("prints at import")
+        results.append({"module":module,"import_s":best["import_s"],"heavy":heavy,"output":best["output"],
+            "ok":not reasons,"reason":"; ".join(reasons)})
+    return results
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Cold import times of the modules, checked against a budget")
+    parser.add_argument("--modules",nargs="+",choices=sorted(MODULES),help="modules to check, all if not given")
+    parser.add_argument("--budget",type=float,default=DEFAULT_BUDGET_S,help="largest allowed import time [s]")
+    parser.add_argument("--repeat",type=int,default=3,help="imports per module, the fastest is kept")
+    parser.add_argument("--history",help="csv history of run_benchmarks to append the import times to")
+    args=parser.parse_args(argv)
+
+    print(f"Interpreter start: {interpreterStartTime():.3f} s")
+    results=checkStartupTimes(args.modules,budget=args.budget,repeat=args.repeat)
+    for result in results:
+        print(f"{result['module']:<22}{result['import_s']:>8.3f} s  {'ok' if result['ok'] else 'FAILED: '+result['reason']}")
+        if result["output"]:
+            print("    "+result["output"].replace("\n","\n    "))
+
+    if args.history is not None:
+        sys.path.append(BENCHMARK_DIR)
+        import numpy as np
+        import pandas as pd
+        from run_benchmarks import appendHistory,gitCommit
+
+        versions={"timestamp":datetime.now(timezone.utc).isoformat(timespec="seconds"),"commit":gitCommit(),
+            "python":platform.python_version(),"numpy":np.__version__,"pandas":pd.__version__}
+        appendHistory([dict(versions,benchmark=f"import {result['module']}",repeat=args.repeat,best_s=result["import_s"])
+            for result in results],args.history)
+
+    n_failed=sum(not result["ok"] for result in results)
+    print(f"{len(results)-n_failed} of {len(results)} modules within budget")
+    return 1 if n_failed else 0
+
+if __name__=="__main__":
+    sys.exit(main())
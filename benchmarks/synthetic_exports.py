@@ -0,0 +1,232 @@
+"""Synthetic FEM-design exports of any size for benchmarks
+
+Writes excel workbooks and tab-separated list files laid out as exported from FEM-design, see
+fd_loader and fd_text_export:
+- one "Shells, Stresses, top", "Shells, Stresses, bottom" and "Shells, Internal forces" table per
+  load case, with the load case in the title (A1 in excel)
+- "Applied reinforcement", "Walls" and "Plates" tables and a "Load cases" table
+- the shell ID only on the first row of every shell, as exported without "fill all cells"
+
+Rows are generated and written one load case at a time, so the size of the export is only limited by
+disk space, e.g. 20 shells x 5000 elements x 4 nodes x 25 load cases is 10 million stress rows per face.
+Values are random but deterministic for a given seed, and the principal stresses are consistent with
+the stress components.
+
+usage:
+    python benchmarks/synthetic_exports.py synthetic.xlsx --shells 20 --elements 5000 --load-cases 25
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shell_calculations import componentsToPrincipal
+
+STRESS_COLUMNS = ("Shell","Elem","Node","Sigma x'","Sigma y'","Tau x'y'","Tau x'z'","Tau y'z'","Sigma vm","Sigma 1","Sigma 2","alpha")
+STRESS_UNITS = ("[-]","[-]","[-]")+("[N/mm2]",)*8+("[rad]",)
+INTERNAL_FORCE_COLUMNS = ("ID","Elem","Node","No.","Mx'","My'","Mx'y'","Tx'z'","Ty'z'","Nx'","Ny'","Nx'y'")
+INTERNAL_FORCE_UNITS = ("[-]","[-]","[-]","[-]")+("[kNm/m]",)*3+("[kN/m]",)*5
+APPLIED_REINFORCEMENT_COLUMNS = ("ID","Elem","Node","x' or r top","y' or t top","x' or r bottom","y' or t bottom")
+APPLIED_REINFORCEMENT_UNITS = ("[-]","[-]","[-]")+("[mm2/m]",)*4
+WALLS_AND_PLATES_COLUMNS = ("ID","Material","t1")
+WALLS_AND_PLATES_UNITS = ("[-]","[-]","[m]")
+LOAD_CASES_COLUMNS = ("Name","Type","Duration")
+
+#areas [mm2/m] of common rebar layouts, phi 10 to 25 at c/c 150 to 200
+REBAR_AREAS = (393.,524.,754.,1005.,1340.,2454.)
+DECIMALS = 3
+
+class SyntheticModel:
+    """Shells, elements and nodes of a synthetic FEM-design model
+
+    n_shells: number of shells, every other shell is a wall (W.<i>), the others are plates (P.<i>)
+    elements_per_shell: number of elements of every shell
+    nodes_per_element: result rows per element, 1 as in exports of the governing node, up to 4 for quads
+    n_load_cases: number of load cases
+    seed: seed of the random values
+    """
+    def __init__(self,n_shells=4,elements_per_shell=100,nodes_per_element=1,n_load_cases=3,seed=0):
+        self.n_shells=n_shells
+        self.elements_per_shell=elements_per_shell
+        self.nodes_per_element=nodes_per_element
+        self.n_load_cases=n_load_cases
+        self.seed=seed
+
+        self.shells=[f"{'W' if i%2==0 else 'P'}.{i+1}" for i in range(n_shells)]
+        self.load_cases=[f"LC{i+1}" for i in range(n_load_cases)]
+        rng=np.random.default_rng(seed)
+        self.thickness=np.round(rng.choice([0.2,0.25,0.3,0.35,0.4],size=n_shells),DECIMALS)
+
+        n_elements=n_shells*elements_per_shell
+        #element numbers as in FEM-design, consecutive within a shell and starting after the previous shell
+        self.elem=np.repeat(np.arange(1,n_elements+1),nodes_per_element)
+        #every shell is a strip of quads with a row of elements_per_shell+1 nodes along each edge, so
+        #neighbouring elements of a shell share their corner nodes like in a mesh, and shells do not
+        position=np.repeat(np.arange(n_elements)%elements_per_shell,nodes_per_element)
+        first_node=np.repeat(np.arange(n_elements)//elements_per_shell*2*(elements_per_shell+1)+1,nodes_per_element)
+        #corners counter-clockwise, (0, 0), (1, 0), (1, 1) and (0, 1)
+        corner=np.tile(np.arange(nodes_per_element),n_elements)
+        along=position+np.array([0,1,1,0])[corner]
+        across=np.array([0,0,1,1])[corner]
+        self.node=first_node+across*(elements_per_shell+1)+along
+        self.shell_index=np.repeat(np.arange(n_shells),elements_per_shell*nodes_per_element)
+
+    @property
+    def n_rows(self):
+        #rows of one results table of one load case
+        return len(self.elem)
+
+    def shellCells(self,first_only=True):
+        #Shell ID of every row, only on the first row of every shell if first_only
+        shells=np.asarray(self.shells,dtype=object)[self.shell_index]
+        if first_only:
+            shells[1:][self.shell_index[1:]==self.shell_index[:-1]]=None
+        return shells
+
+    def _rng(self,table,load_case_index):
+        #Independent random stream for each table and load case, so tables can be generated in any order
+        return np.random.default_rng([self.seed,table,load_case_index])
+
+    def stresses(self,face,load_case_index):
+        #Dictionary column -> values of the stress table of one face and load case
+        rng=self._rng(0 if face=="top" else 1,load_case_index)
+        n=self.n_rows
+        #shrinkage like stresses, mostly tension with scatter between elements
+        sigma_x=rng.normal(0.5,1.0,n)
+        sigma_y=rng.normal(0.3,0.8,n)
+        tau_xy=rng.normal(0.0,0.3,n)
+        sigma_1,sigma_2,alpha=componentsToPrincipal(sigma_x,sigma_y,tau_xy)
+        sigma_vm=np.sqrt(sigma_x**2-sigma_x*sigma_y+sigma_y**2+3*tau_xy**2)
+        zeros=np.zeros(n)
+        values=(sigma_x,sigma_y,tau_xy,zeros,zeros,sigma_vm,sigma_1,sigma_2,alpha)
+        return dict(zip(STRESS_COLUMNS[3:],(np.round(value,DECIMALS) for value in values)))
+
+    def internalForces(self,load_case_index):
+        #Dictionary column -> values of the internal forces table of one load case
+        rng=self._rng(2,load_case_index)
+        n=self.n_rows
+        moments=rng.normal(0.0,20.0,(3,n))
+        shear=rng.normal(0.0,10.0,(2,n))
+        normal=rng.normal(50.0,100.0,(3,n))
+        values=[np.full(n,load_case_index+1)]+[np.round(value,DECIMALS) for value in (*moments,*shear,*normal)]
+        return dict(zip(INTERNAL_FORCE_COLUMNS[3:],values))
+
+    def appliedReinforcement(self):
+        #Dictionary column -> values of the applied reinforcement table, one row per element
+        rng=self._rng(3,0)
+        n=len(self.elem)//self.nodes_per_element
+        values=[rng.choice(REBAR_AREAS,size=n) for _ in APPLIED_REINFORCEMENT_COLUMNS[3:]]
+        return dict(zip(APPLIED_REINFORCEMENT_COLUMNS[3:],values))
+
+def _stressTitle(face,load_case,for_selected_objects):
+    suffix=" - for selected objects" if for_selected_objects else ""
+    return f"Shells, Stresses, {face}, Ultimate - Load case: {load_case}{suffix}"
+
+def _internalForceTitle(load_case,for_selected_objects):
+    suffix=" - for selected objects" if for_selected_objects else ""
+    return f"Shells, Internal forces, Ultimate - Load case: {load_case}{suffix}"
+
+def iterTables(model,for_selected_objects=True):
+    """Tables of the export in the order FEM-design writes them
+
+    Yields (title, column names, units or None, dataframe) with None in the shell ID cells that
+    FEM-design leaves blank. Only one load case is held in memory at a time.
+    """
+    shells=model.shellCells()
+    keys={"Elem":model.elem,"Node":model.node}
+
+    for i,load_case in enumerate(model.load_cases):
+        for face in ("top","bottom"):
+            df=pd.DataFrame({"Shell":shells,**keys,**model.stresses(face,i)},columns=STRESS_COLUMNS)
+            yield _stressTitle(face,load_case,for_selected_objects),STRESS_COLUMNS,STRESS_UNITS,df
+    for i,load_case in enumerate(model.load_cases):
+        df=pd.DataFrame({"ID":shells,**keys,**model.internalForces(i)},columns=INTERNAL_FORCE_COLUMNS)
+        yield _internalForceTitle(load_case,for_selected_objects),INTERNAL_FORCE_COLUMNS,INTERNAL_FORCE_UNITS,df
+
+    #one row per element, at its first node
+    first_node=slice(None,None,model.nodes_per_element)
+    element_shells=np.asarray(model.shells,dtype=object)[model.shell_index[first_node]]
+    element_shells[1:][element_shells[1:]==element_shells[:-1]]=None
+    df=pd.DataFrame({"ID":element_shells,"Elem":model.elem[first_node],"Node":model.node[first_node],**model.appliedReinforcement()},
+        columns=APPLIED_REINFORCEMENT_COLUMNS)
+    yield "Applied reinforcement",APPLIED_REINFORCEMENT_COLUMNS,APPLIED_REINFORCEMENT_UNITS,df
+
+    for title,prefix in (("Walls","W"),("Plates","P")):
+        rows=[(shell,"C30/37",t1) for shell,t1 in zip(model.shells,model.thickness) if shell.startswith(prefix)]
+        yield title,WALLS_AND_PLATES_COLUMNS,WALLS_AND_PLATES_UNITS,pd.DataFrame(rows,columns=WALLS_AND_PLATES_COLUMNS)
+
+    df=pd.DataFrame({"Name":model.load_cases,"Type":"Shrinkage","Duration":"Permanent"},columns=LOAD_CASES_COLUMNS)
+    yield "Load cases",LOAD_CASES_COLUMNS,None,df
+
+def _sheetName(index,title):
+    #numbered like FEM-design, truncated to the 31 characters allowed by excel
+    return f"{index}-{title}"[:31]
+
+def writeSyntheticWorkbook(model,xlsx_path,for_selected_objects=True):
+    """Writes the model as excel export from FEM-design, one sheet per table
+
+    Rows are streamed with a write only workbook, so memory does not grow with the size of the export.
+    Returns number of data rows written
+    """
+    import openpyxl
+
+    workbook=openpyxl.Workbook(write_only=True)
+    n_rows=0
+    for index,(title,columns,units,df) in enumerate(iterTables(model,for_selected_objects=for_selected_objects),start=1):
+        worksheet=workbook.create_sheet(title=_sheetName(index,title))
+        worksheet.append([title])
+        worksheet.append(list(columns))
+        if units is not None:
+            worksheet.append(list(units))
+        #column wise conversion to python values is much faster than itertuples
+        for row in zip(*(df[column].tolist() for column in columns)):
+            worksheet.append(row)
+        n_rows+=len(df)
+    workbook.save(xlsx_path)
+
+    return n_rows
+
+def writeSyntheticTextExport(model,txt_path,for_selected_objects=True):
+    """Writes the model as tab-separated list file from a FEM-design batch run
+
+    Returns number of data rows written
+    """
+    n_rows=0
+    with open(txt_path,"w",encoding="utf-8",newline="") as f:
+        for title,columns,units,df in iterTables(model,for_selected_objects=for_selected_objects):
+            f.write(title+"\n")
+            f.write("\t".join(columns)+"\n")
+            if units is not None:
+                f.write("\t".join(units)+"\n")
+            df.to_csv(f,sep="\t",header=False,index=False,lineterminator="\n")
+            f.write("\n")
+            n_rows+=len(df)
+
+    return n_rows
+
+def writeSyntheticExport(model,path,for_selected_objects=True):
+    #Excel workbook or list file, given by the extension of path
+    if str(path).lower().endswith(".txt"):
+        return writeSyntheticTextExport(model,path,for_selected_objects=for_selected_objects)
+    return writeSyntheticWorkbook(model,path,for_selected_objects=for_selected_objects)
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Write a synthetic FEM-design export (.xlsx or .txt list file)")
+    parser.add_argument("path",help="output path, .xlsx or .txt")
+    parser.add_argument("--shells",type=int,default=4,help="number of shells")
+    parser.add_argument("--elements",type=int,default=100,help="elements per shell")
+    parser.add_argument("--nodes",type=int,default=1,choices=range(1,5),help="result rows per element, 1 to 4")
+    parser.add_argument("--load-cases",type=int,default=3,help="number of load cases")
+    parser.add_argument("--seed",type=int,default=0)
+    args=parser.parse_args(argv)
+
+    model=SyntheticModel(args.shells,args.elements,nodes_per_element=args.nodes,n_load_cases=args.load_cases,seed=args.seed)
+    n_rows=writeSyntheticExport(model,args.path)
+    print(f"Wrote {n_rows} rows to {args.path}")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Crack widths according to EC2 7.3.4 from strains at the reinforcement layers
+
+Operates column-wise on the df_epsilon output of stress_approach.strainsAtRebars, so the whole
+element x node x load case table is handled in one call. Every parameter can be a scalar or an array
+with one value per row.
+
+Per face (top/bottom), with the strain profile taken as linear through the two reinforcement layers:
+hc,ef = min(2.5(h-d), (h-x)/3) with a compression zone (x>0), min(2.5(h-d), h/2) with both faces in tension (x=0)
+rho_p,eff = As/(hc,ef*b)
+k2 = (eps1+eps2)/(2*eps1), from the strains at the faces
+sr,max = k3*c + k1*k2*k4*phi/rho_p,eff, or 1.3(h-x) if the spacing exceeds 5(c+phi/2)
+eps_sm-eps_cm = max((sigma_s-kt*fct,eff/rho_p,eff*(1+alpha_e*rho_p,eff))/Es, 0.6*sigma_s/Es)
+wk = sr,max*(eps_sm-eps_cm)
+
+Strains in the x and y reinforcement directions are handled one direction at a time, see
+crackWidthsInRebarDirections.
+
+Units: lengths [mm], stresses [N/mm2], As [mm2/m], b=1000 mm
+"""
+import numpy as np
+
+if __package__:
+    from .instrumentation import stage
+else:
+    from instrumentation import stage
+
+FACES = ("top","bottom")
+#reinforcement directions, x is the outer and y the inner layer at each face
+DIRECTIONS = ("x","y")
+
+def directionValues(values):
+    """Value per reinforcement direction, {"x":..., "y":...}
+
+    values: one value for both directions, or a (x, y) tuple or list such as d_top for the outer and
+    inner reinforcement layer. Arrays are per row values and used for both directions.
+    """
+    if isinstance(values,(tuple,list)):
+        if len(values)!=len(DIRECTIONS):
+            raise ValueError(f"Expected one value per direction {DIRECTIONS}, got {values}")
+        return dict(zip(DIRECTIONS,values))
+    return {direction:values for direction in DIRECTIONS}
+
+def _faceStrains(eps_top,eps_bottom,t,a_top,d_bottom):
+    #Extrapolating linear strain profile through the rebar layers to the faces of the shell
+    #z is measured from the top face, top layer at z=a_top, bottom layer at z=d_bottom
+    slope=(eps_bottom-eps_top)/(d_bottom-a_top)
+    eps_face_top=eps_top-slope*a_top
+    eps_face_bottom=eps_top+slope*(t-a_top)
+    return eps_face_top,eps_face_bottom
+
+def _compressionZoneDepth(eps_tension_face,eps_other_face,t):
+    #Depth of compression zone at the other face when eps_tension_face is in tension, 0 if no compression
+    in_compression=(eps_tension_face>0)&(eps_other_face<0)
+    denominator=np.where(in_compression,eps_tension_face-eps_other_face,1.0)
+    return np.where(in_compression,t*-eps_other_face/denominator,0.0)
+
+def getK2(eps_face_top,eps_face_bottom):
+    #k2=0.5 for bending, 1.0 for pure tension, in between from the strains at the faces
+    eps1=np.maximum(eps_face_top,eps_face_bottom)
+    eps2=np.minimum(eps_face_top,eps_face_bottom)
+    in_tension=eps1>0
+    k2=np.where(in_tension,(eps1+eps2)/(2*np.where(in_tension,eps1,1.0)),0.5)
+    return np.clip(k2,0.5,1.0)
+
+def crackWidthArrays(eps_top,eps_bottom,t,phi,cc,d_top,d_bottom=None,
+    k1=0.8,k3=3.4,k4=0.425,kt=0.4,fct_eff=3.2,Es=200000,Ecm=34000):
+    """Crack width calculation on arrays of strains at the top and bottom reinforcement layers
+
+    eps_top, eps_bottom: strains at top and bottom reinforcement layers, tension positive
+    t: thickness [mm]
+    phi: rebar diameter [mm]
+    cc: rebar spacing [mm]
+    d_top: d_eff for reinforcement layer at top face, measured from bottom face [mm]
+    d_bottom: d_eff for reinforcement layer at bottom face, measured from top face [mm], d_top if None
+    k1: 0.8 for ribbed bars
+    k3, k4: nationally determined, 3.4 and 0.425 recommended
+    kt: 0.6 short term, 0.4 long term loading
+    fct_eff: effective tensile strength of concrete when cracks form, usually fctm [N/mm2]
+    Es, Ecm: E-modulus of reinforcement and concrete [N/mm2]
+
+    Returns a dictionary of arrays, with one entry per face for every face dependent quantity
+    """
+    if d_bottom is None:
+        d_bottom=d_top
+    eps={"top":np.asarray(eps_top,dtype=float),"bottom":np.asarray(eps_bottom,dtype=float)}
+    t,phi,cc=np.asarray(t,dtype=float),np.asarray(phi,dtype=float),np.asarray(cc,dtype=float)
+    a_dist={"top":t-np.asarray(d_top,dtype=float),"bottom":t-np.asarray(d_bottom,dtype=float)}
+
+    eps_face_top,eps_face_bottom=_faceStrains(eps["top"],eps["bottom"],t,a_dist["top"],t-a_dist["bottom"])
+    x={"top":_compressionZoneDepth(eps_face_top,eps_face_bottom,t),
+        "bottom":_compressionZoneDepth(eps_face_bottom,eps_face_top,t)}
+
+    As=phi**2/4*np.pi*1000/cc
+    alpha_e=Es/Ecm
+    k2=getK2(eps_face_top,eps_face_bottom)
+
+    result={"k2":k2}
+    for face in FACES:
+        c=a_dist[face]-phi/2
+        #EC2 figure 7.1, (h-x)/3 only applies to bending, in pure tension each face takes half the section
+        hc_ef=np.minimum(2.5*a_dist[face],np.where(x[face]>0,(t-x[face])/3,t/2))
+        rho_p_eff=As/(hc_ef*1000)
+
+        sr_max=k3*c+k1*k2*k4*phi/rho_p_eff
+        #spacing larger than 5(c+phi/2), upper bound of crack spacing
+        sr_max=np.where(cc>5*(c+phi/2),1.3*(t-x[face]),sr_max)
+
+        sigma_s=Es*np.maximum(eps[face],0.0)
+        eps_sm_cm=np.maximum((sigma_s-kt*fct_eff/rho_p_eff*(1+alpha_e*rho_p_eff))/Es,0.6*sigma_s/Es)
+
+        result[f"As_{face}"]=As
+        result[f"a_dist_{face}"]=a_dist[face]
+        result[f"x_{face}"]=x[face]
+        result[f"hc_ef_{face}"]=hc_ef
+        result[f"rho_p_eff_{face}"]=rho_p_eff
+        result[f"sr_max_{face}"]=sr_max
+        result[f"eps_sm_cm_{face}"]=eps_sm_cm
+        result[f"wk_{face}"]=sr_max*eps_sm_cm
+
+    return result
+
+def _strainColumns(direction):
+    #strain columns of one reinforcement direction from stress_approach.strainsAtRebars
+    return tuple(f"epsilon_{direction}_{face}" for face in FACES)
+
+def _assignColumns(df_epsilon,result,names,direction):
+    #k2 and <name>_<face> of result, added as k2_<direction> and <name>_<direction>_<face>
+    columns={"k2":f"k2_{direction}"}
+    for face in FACES:
+        for name in names:
+            columns[f"{name}_{face}"]=f"{name}_{direction}_{face}"
+
+    for key,column in columns.items():
+        values=result[key]
+        if np.shape(values)!=(len(df_epsilon),):
+            #scalar parameters such as As for constant phi and cc
+            values=np.full(len(df_epsilon),values)
+        df_epsilon[column]=values
+    return df_epsilon
+
+def Sr_max(df_epsilon,t,phi,cc,d_top,k1=0.8,k3=3.4,k4=0.425,d_bottom=None,direction=None):
+    """Maximum crack spacing at top and bottom reinforcement
+
+    df_epsilon: dataframe containing epsilon_<direction>_top and epsilon_<direction>_bottom
+    phi: rebar diameter [mm]
+    cc: rebar spacing [mm]
+
+    d_top: d_eff for outer and innter reinforcement layer at top face
+    d_bottom: d_eff for outer and innter reinforcement layer at bottom face
+    direction: reinforcement direction "x" or "y", both directions if None
+        phi, cc, d_top and d_bottom can then be (x, y) tuples, see directionValues
+
+    Adds As, a_dist, hc_ef, rho_p_eff, k2 and sr_max columns to df_epsilon, e.g. sr_max_x_top for direction "x"
+    """
+    if direction is None:
+        phi,cc,d_top,d_bottom=(directionValues(values) for values in (phi,cc,d_top,d_bottom))
+        for direction in DIRECTIONS:
+            Sr_max(df_epsilon,t,phi[direction],cc[direction],d_top[direction],k1=k1,k3=k3,k4=k4,
+                d_bottom=d_bottom[direction],direction=direction)
+        return df_epsilon
+
+    epsilon_top,epsilon_bottom=_strainColumns(direction)
+    result=crackWidthArrays(df_epsilon[epsilon_top].to_numpy(),df_epsilon[epsilon_bottom].to_numpy(),
+        t,phi,cc,d_top,d_bottom=d_bottom,k1=k1,k3=k3,k4=k4)
+    return _assignColumns(df_epsilon,result,("As","a_dist","hc_ef","rho_p_eff","sr_max"),direction)
+
+def crackWidths(df_epsilon,t,phi,cc,d_top,d_bottom=None,
+    k1=0.8,k3=3.4,k4=0.425,kt=0.4,fct_eff=3.2,Es=200000,Ecm=34000,direction=None):
+    """Crack widths at top and bottom reinforcement for every row of df_epsilon
+
+    df_epsilon: dataframe containing epsilon_<direction>_top and epsilon_<direction>_bottom, see stress_approach.strainsAtRebars
+    direction: reinforcement direction "x" or "y", both directions as crackWidthsInRebarDirections if None
+    See crackWidthArrays for the other parameters
+
+    Adds the crack spacing columns from Sr_max and x, eps_sm_cm and wk [mm] for each face to df_epsilon,
+    e.g. wk_x_top for direction "x"
+    """
+    if direction is None:
+        return crackWidthsInRebarDirections(df_epsilon,t,phi,cc,d_top,d_bottom=d_bottom,
+            k1=k1,k3=k3,k4=k4,kt=kt,fct_eff=fct_eff,Es=Es,Ecm=Ecm)
+
+    epsilon_top,epsilon_bottom=_strainColumns(direction)
+    result=crackWidthArrays(df_epsilon[epsilon_top].to_numpy(),df_epsilon[epsilon_bottom].to_numpy(),
+        t,phi,cc,d_top,d_bottom=d_bottom,k1=k1,k3=k3,k4=k4,kt=kt,fct_eff=fct_eff,Es=Es,Ecm=Ecm)
+    return _assignColumns(df_epsilon,result,("As","a_dist","x","hc_ef","rho_p_eff","sr_max","eps_sm_cm","wk"),direction)
+
+def crackWidthsInRebarDirections(df_epsilon,t,phi,cc,d_top,d_bottom=None,load_cases=None,**crack_width_parameters):
+    """Crack widths in both reinforcement directions at top and bottom, see crackWidths
+
+    df_epsilon: dataframe with epsilon_x_top, epsilon_x_bottom, epsilon_y_top and epsilon_y_bottom
+    phi, cc, d_top, d_bottom: one value for both directions or (x, y) tuples, see directionValues
+    load_cases: load case of every row, e.g. df_sigma["load_case"], only used to split the time of
+        the crack_widths stage by load case in a trace, see instrumentation
+
+    Adds the crackWidths columns of each direction, and wk_top and wk_bottom as the largest of both directions
+    """
+    phi,cc,d_top=directionValues(phi),directionValues(cc),directionValues(d_top)
+    d_bottom=directionValues(d_bottom)
+    with stage("crack_widths",rows=len(df_epsilon),load_cases=load_cases):
+        for direction in DIRECTIONS:
+            crackWidths(df_epsilon,t,phi[direction],cc[direction],d_top[direction],d_bottom=d_bottom[direction],
+                direction=direction,**crack_width_parameters)
+        for face in FACES:
+            df_epsilon[f"wk_{face}"]=df_epsilon[[f"wk_{direction}_{face}" for direction in DIRECTIONS]].max(axis=1)
+
+    return df_epsilon
@@ -0,0 +1,233 @@
+"""Crack widths for many FEM-design exports in parallel, from the command line
+
+Every export (excel or list file from a FEM-design batch run) is processed by its own worker process:
+stresses are read, strains at the rebars and crack widths in both reinforcement directions are
+computed, and the result table is written to the output directory. At the end a summary with the
+largest crack widths per shell of every export is written. Exports are processed in sorted order and
+results are collected in that order, so the output does not depend on which worker finishes first.
+
+usage:
+    python crack_width_batch.py "exports/*.xlsx" --parameters parameters.json --output results --workers 4
+
+The parameter file is json with the keyword arguments below, e.g.
+    {"t": 300, "Ec": 30000, "phi": 16, "cc": 200, "cover": 45,
+     "overrides": {"part_B/FD_STRESSES.xlsx": {"t": 250}}}
+where overrides gives parameters for single exports by export key.
+
+Exports are identified by their key, the path relative to the folder all exports are in, with /
+as separator, e.g. part_B/FD_STRESSES.xlsx for exports in part_A and part_B, or FD_STRESSES.xlsx
+when all exports are in one folder. Output files are named after the key, part_B__FD_STRESSES_crack_widths.csv,
+and the summary gives the key in the export column.
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DEFAULT_PARAMETERS = {"t":300,"Ec":30000,"phi":16,"cc":200,"cover":45,"v":0.15,"k_kappa_T":2,"rebar_angle":0,
+    "d_top":None,"d_bottom":None,"crack_width_parameters":{},"output_format":"csv"}
+SUMMARY_COLUMNS = ['export','Shell','wk_top','wk_bottom','wk','Elem','Node','load_case','status']
+
+def readParameters(parameter_path=None):
+    #Parameters from a json file on top of DEFAULT_PARAMETERS
+    parameters=dict(DEFAULT_PARAMETERS,overrides={})
+    if parameter_path is not None:
+        with open(parameter_path,"r") as f:
+            parameters.update(json.load(f))
+    return parameters
+
+def exportKeys(export_paths):
+    """Key of every export, its path relative to the folder all exports are in, see module docstring
+
+    Raises ValueError if two exports give the same key or output file name
+    """
+    absolute_paths=[os.path.abspath(export_path) for export_path in export_paths]
+    if not absolute_paths:
+        return []
+    root=os.path.commonpath([os.path.dirname(path) for path in absolute_paths])
+    keys=[os.path.relpath(path,root).replace(os.sep,"/") for path in absolute_paths]
+
+    for names,what in ((keys,"export"),([_outputStem(key) for key in keys],"output name")):
+        duplicates=sorted({name for name in names if names.count(name)>1})
+        if duplicates:
+            raise ValueError(f"Exports with the same {what}: {duplicates}")
+    return keys
+
+def exportParameters(parameters,export_key):
+    #Parameters for one export, with the overrides given for its key
+    export_parameters={key:value for key,value in parameters.items() if key!="overrides"}
+    export_parameters.update(parameters.get("overrides",{}).get(export_key,{}))
+    return export_parameters
+
+def rebarDepths(parameters):
+    #(d_x, d_y) of the outer x and inner y reinforcement layer from cover, unless d_top is given
+    if parameters["d_top"] is not None:
+        d_top=parameters["d_top"]
+    else:
+        phi_x,phi_y=parameters["phi"] if isinstance(parameters["phi"],list) else (parameters["phi"],parameters["phi"])
+        d_x=parameters["t"]-parameters["cover"]-phi_x/2
+        d_top=[d_x,d_x-phi_x/2-phi_y/2]
+    d_bottom=parameters["d_bottom"]
+    #json gives lists, crack_width.directionValues expects (x, y) tuples
+    return (tuple(d_top) if isinstance(d_top,list) else d_top),(tuple(d_bottom) if isinstance(d_bottom,list) else d_bottom)
+
+def _outputStem(export_key):
+    #file name of the export key without extension, folders joined by __
+    return os.path.splitext(export_key)[0].replace("/","__")
+
+def outputPath(export_key,output_dir,output_format):
+    return os.path.join(output_dir,f"{_outputStem(export_key)}_crack_widths.{output_format}")
+
+def crackWidthTable(df_sigma,parameters):
+    """Crack widths in both reinforcement directions for stresses from getTopBottomShellStressesDataFrame
+
+    Returns dataframe with Shell, Elem, Node, load_case, the strain and crack width columns of
+    crack_width.crackWidthsInRebarDirections and wk, the largest of wk_top and wk_bottom
+    """
+    if __package__:
+        from .stress_approach import strainsAtRebars
+        from .crack_width import crackWidthsInRebarDirections
+    else:
+        from stress_approach import strainsAtRebars
+        from crack_width import crackWidthsInRebarDirections
+
+    t=parameters["t"]
+    d_top,d_bottom=rebarDepths(parameters)
+    phi=tuple(parameters["phi"]) if isinstance(parameters["phi"],list) else parameters["phi"]
+    cc=tuple(parameters["cc"]) if isinstance(parameters["cc"],list) else parameters["cc"]
+
+    df_epsilon=strainsAtRebars(df_sigma,t,parameters["Ec"],d_top,v=parameters["v"],d_bottom=d_bottom,
+        k_kappa_T=parameters["k_kappa_T"],rebar_angle=parameters["rebar_angle"])
+    df_crack_widths=crackWidthsInRebarDirections(df_epsilon,t,phi,cc,d_top,d_bottom=d_bottom,load_cases=df_sigma["load_case"],
+        **parameters["crack_width_parameters"])
+
+    df_result=pd.concat([df_sigma[['Shell','Elem','Node','load_case']],df_crack_widths],axis=1)
+    df_result["wk"]=df_result[["wk_top","wk_bottom"]].max(axis=1)
+
+    return df_result
+
+def shellSummary(df_result,export_name):
+    #largest crack width per shell, and the row where it occurs, first row on ties
+    governing=df_result.sort_values(["Shell","wk"],ascending=[True,False],kind="mergesort").drop_duplicates("Shell")
+    df_summary=governing[['Shell','Elem','Node','load_case','wk']].reset_index(drop=True)
+    df_shell_max=df_result.groupby("Shell",sort=True)[["wk_top","wk_bottom"]].max().reset_index()
+    df_summary=df_shell_max.merge(df_summary,on="Shell")
+    df_summary.insert(0,"export",export_name)
+    df_summary["status"]="ok"
+
+    return df_summary[SUMMARY_COLUMNS]
+
+def processExport(export_path,parameters,output_dir,export_key=None):
+    """Reads one export, computes crack widths and writes the result table
+
+    export_key: key of the export in the batch, see exportKeys, the file name if None
+
+    Returns dataframe with the largest crack width per shell and the row where it occurs
+    """
+    if __package__:
+        from .stress_approach import getTopBottomShellStressesDataFrame
+        from .result_writers import writeDataFrame
+        from .instrumentation import stage
+    else:
+        from stress_approach import getTopBottomShellStressesDataFrame
+        from result_writers import writeDataFrame
+        from instrumentation import stage
+
+    if export_key is None:
+        export_key=os.path.basename(export_path)
+
+    with stage("process_export") as export_stage:
+        df_result=crackWidthTable(getTopBottomShellStressesDataFrame(export_path),parameters)
+        writeDataFrame(df_result,outputPath(export_key,output_dir,parameters["output_format"]),sheet_name="crack widths")
+        export_stage.rows=len(df_result)
+
+    return shellSummary(df_result,export_key)
+
+def _processExportJob(args):
+    #Worker entry point, failures are returned as a summary row so the other exports still finish
+    export_path,export_key,parameters,output_dir=args
+    try:
+        return processExport(export_path,parameters,output_dir,export_key=export_key)
+    except Exception:
+        row={column:None for column in SUMMARY_COLUMNS}
+        row.update({"export":export_key,"status":"error: "+traceback.format_exc().strip().splitlines()[-1]})
+        return pd.DataFrame([row],columns=SUMMARY_COLUMNS)
+
+def expandExportPaths(patterns):
+    #Sorted, unique export paths from file names and glob patterns
+    paths=set()
+    for pattern in patterns:
+        matches=glob.glob(pattern)
+        paths.update(os.path.normpath(path) for path in (matches if matches else ([pattern] if os.path.exists(pattern) else [])))
+    return sorted(paths)
+
+def runBatch(export_paths,parameters,output_dir="crack_width_results",max_workers=None,summary_name="summary.csv"):
+    """Crack widths for every export in a process pool, with a merged summary
+
+    export_paths: paths of excel exports or list files (.txt) from FEM-design
+    parameters: dictionary from readParameters
+    max_workers: number of processes, number of cpus if None, 1 runs serially
+
+    Returns summary dataframe with one row per export and shell, also written to output_dir/summary_name
+    Raises ValueError for exports with the same key and for overrides of exports not in export_paths
+    """
+    export_keys=exportKeys(export_paths)
+    unknown=sorted(set(parameters.get("overrides",{}))-set(export_keys))
+    if unknown:
+        raise ValueError(f"Overrides for exports not in the batch: {unknown}, exports are {export_keys}")
+
+    os.makedirs(output_dir,exist_ok=True)
+    jobs=[(export_path,export_key,exportParameters(parameters,export_key),output_dir)
+        for export_path,export_key in zip(export_paths,export_keys)]
+
+    if max_workers==1:
+        summaries=[_processExportJob(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            summaries=list(executor.map(_processExportJob,jobs))
+
+    df_summary=pd.concat(summaries,ignore_index=True) if summaries else pd.DataFrame(columns=SUMMARY_COLUMNS)
+    df_summary.to_csv(os.path.join(output_dir,summary_name),index=False)
+
+    return df_summary
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Crack widths for deformation load cases from FEM-design exports")
+    parser.add_argument("exports",nargs="+",help="export files or glob patterns, e.g. \"exports/*.xlsx\"")
+    parser.add_argument("--parameters",help="json parameter file, see module docstring")
+    parser.add_argument("--output",default="crack_width_results",help="output directory")
+    parser.add_argument("--workers",type=int,default=None,help="number of processes, number of cpus if not given")
+    parser.add_argument("--trace",help="write time, rows and memory per stage to this json or csv file, stages are only recorded with --workers 1")
+    parser.add_argument("--profile",action="store_true",help="with --trace, also write cProfile stats next to the trace")
+    parser.add_argument("--trace-memory",action="store_true",help="with --trace, record peak python allocations per stage")
+    args=parser.parse_args(argv)
+
+    export_paths=expandExportPaths(args.exports)
+    if not export_paths:
+        parser.error(f"No exports found for {args.exports}")
+
+    if args.trace is not None:
+        if __package__:
+            from .instrumentation import tracing
+        else:
+            from instrumentation import tracing
+        with tracing(args.trace,profile=args.profile,trace_memory=args.trace_memory) as trace:
+            df_summary=runBatch(export_paths,readParameters(args.parameters),output_dir=args.output,max_workers=args.workers)
+        with pd.option_context("display.max_columns",None,"display.width",200):
+            print(trace.summary())
+    else:
+        df_summary=runBatch(export_paths,readParameters(args.parameters),output_dir=args.output,max_workers=args.workers)
+    with pd.option_context("display.max_rows",None,"display.max_columns",None,"display.width",200):
+        print(df_summary)
+
+    n_failed=int((df_summary["status"]!="ok").sum())
+    print(f"Processed {len(export_paths)} exports, {n_failed} failed, summary in {os.path.join(args.output,'summary.csv')}")
+    return 1 if n_failed else 0
+
+if __name__=="__main__":
+    sys.exit(main())
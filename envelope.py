@@ -0,0 +1,78 @@
+"""Envelope over load cases, with the governing load case and alternates for every node
+
+The long result table with one row per node and load case is pivoted once to dense
+(node, load case) arrays, and the load case axis is reduced with vectorised sorts instead of grouping
+per node. The result is the governing value and load case of every node, the next top_k-1 load cases
+as alternates, and a compact index of the (node, load case) pairs that govern anywhere, which
+follow-up calculations can use to skip load cases that never govern.
+"""
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .superposition import denseLoadCaseArrays
+else:
+    from superposition import denseLoadCaseArrays
+
+ENVELOPE_KEY_COLUMNS = ['Shell','Elem','Node']
+
+def _rankedLoadCases(values,top_k):
+    #Indices of the top_k largest load cases per row, largest first, nan last, ties to the first load case
+    filled=np.where(np.isnan(values),-np.inf,values)
+    order=np.argsort(-filled,axis=1,kind="stable")[:,:top_k]
+    return order,np.take_along_axis(values,order,axis=1)
+
+def loadCaseEnvelope(df,value_columns=("wk_top","wk_bottom"),key_columns=None,top_k=1):
+    """Largest value of each column over all load cases, with governing load case, per node
+
+    df: long table with one row per node and load case, e.g. from stress_approach.crackWidths with the
+    keys of df_sigma, or superposition.combinedCrackWidths
+    value_columns: columns to envelope, each independently
+    key_columns: columns identifying a node, ENVELOPE_KEY_COLUMNS present in df if None
+    top_k: number of load cases given per node, the governing one and top_k-1 alternates
+
+    Returns (df_envelope, df_index)
+    df_envelope: one row per node with the key columns and for each value column <column> and
+    <column>_case of the governing load case, and <column>_<k> and <column>_case_<k> of alternate k=2..top_k
+    df_index: the distinct (key columns, load_case) pairs among the top_k of any value column
+    """
+    if key_columns is None:
+        key_columns=[column for column in ENVELOPE_KEY_COLUMNS if column in df.columns]
+    value_columns=list(value_columns)
+    df_keys,load_cases,values=denseLoadCaseArrays(df,key_columns,value_columns)
+    load_cases=np.asarray(load_cases,dtype=object)
+    top_k=min(top_k,len(load_cases))
+
+    df_envelope=df_keys.copy()
+    governing=np.zeros((len(df_keys),len(load_cases)),dtype=bool)
+    for i,column in enumerate(value_columns):
+        order,ranked=_rankedLoadCases(values[:,:,i],top_k)
+        ranked_cases=np.where(np.isnan(ranked),None,load_cases[order])
+        for k in range(top_k):
+            suffix="" if k==0 else f"_{k+1}"
+            df_envelope[f"{column}{suffix}"]=ranked[:,k]
+            df_envelope[f"{column}_case{suffix}"]=ranked_cases[:,k]
+        governing[np.arange(len(df_keys))[:,None],order]|=~np.isnan(ranked)
+
+    #compact index of governing pairs, load case stored as categorical
+    node_index,load_case_index=np.nonzero(governing)
+    df_index=df_keys.iloc[node_index].reset_index(drop=True)
+    df_index["load_case"]=pd.Categorical.from_codes(load_case_index,categories=pd.Index(load_cases))
+
+    return df_envelope,df_index
+
+def selectGoverningRows(df,df_index):
+    """Rows of a long table with one row per node and load case that are in the index from loadCaseEnvelope
+
+    Allows follow-up calculations, e.g. with more output or other parameters, to run only for the
+    load cases governing at each node
+    """
+    key_columns=[column for column in df_index.columns if column!="load_case"]
+    rows=pd.MultiIndex.from_frame(df[key_columns+["load_case"]].astype({"load_case":object}))
+    governing=pd.MultiIndex.from_frame(df_index.astype({"load_case":object}))
+
+    return df[rows.isin(governing)]
+
+def governingLoadCases(df_index):
+    #Load cases governing at least one node, others can be skipped entirely
+    return list(df_index["load_case"].unique())
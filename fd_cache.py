@@ -0,0 +1,250 @@
+"""Parquet cache of tables parsed from FEM-design exports
+
+Parsing an export with openpyxl is by far the slowest step when the same export is post-processed
+many times with different parameters. The tables returned by fd_loader.readFemDesignWorkbook are
+therefore stored as parquet files, one per kind of table, in a cache directory.
+
+Cache entries are keyed by path, size, modification time and content hash of the export:
+- same path, size and mtime: the cached tables are used without reading the export at all
+- size or mtime changed: the export is hashed, tables are reused if the content is unchanged
+- content changed: old entries for the path are removed and the export is parsed again
+
+The total size of the cache is bounded, least recently used entries are evicted first.
+Requires pyarrow, without it the export is parsed on every call.
+
+Several processes can share a cache directory, e.g. the workers of crack_width_batch. The manifest is
+only read, changed and written while holding a lock file, and exports are parsed outside the lock, so
+processes parsing different exports do not wait for each other.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import contextlib
+
+import pandas as pd
+
+if __package__:
+    from .instrumentation import stage
+else:
+    from instrumentation import stage
+
+#cache directory, relative paths are relative to the folder of the export
+DEFAULT_CACHE_DIR = os.environ.get("FD_CACHE_DIR",".fd_cache")
+DEFAULT_MAX_CACHE_BYTES = int(os.environ.get("FD_CACHE_MAX_BYTES",2*1024**3))
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+
+def fileContentHash(file_path,block_size=2**20):
+    #sha256 of file content, read in blocks to keep memory constant
+    sha256=hashlib.sha256()
+    with open(file_path,"rb") as f:
+        for block in iter(lambda: f.read(block_size),b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def getCacheDir(xlsx_path,cache_dir=None):
+    if cache_dir is None:
+        cache_dir=DEFAULT_CACHE_DIR
+    if not os.path.isabs(cache_dir):
+        cache_dir=os.path.join(os.path.dirname(os.path.abspath(xlsx_path)),cache_dir)
+    return cache_dir
+
+def _readManifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir,MANIFEST_NAME),"r") as f:
+            return json.load(f)
+    except (OSError,ValueError):
+        return {"entries":{}}
+
+def _writeManifest(cache_dir,manifest):
+    #writing to a temporary file first so an interrupted run never leaves a broken manifest
+    manifest_path=os.path.join(cache_dir,MANIFEST_NAME)
+    tmp_path=manifest_path+f".{os.getpid()}.tmp"
+    with open(tmp_path,"w") as f:
+        json.dump(manifest,f,indent=2)
+    os.replace(tmp_path,manifest_path)
+
+@contextlib.contextmanager
+def _manifestLock(cache_dir):
+    #Exclusive lock of the manifest across processes, held while it is read, changed and written
+    with open(os.path.join(cache_dir,LOCK_NAME),"a+b") as f:
+        if os.name=="nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(),msvcrt.LK_LOCK,1)
+                    break
+                except OSError:
+                    #LK_LOCK gives up after 10 seconds while another process holds the lock, waiting again
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(),msvcrt.LK_UNLCK,1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(),fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(),fcntl.LOCK_UN)
+
+def _removeEntry(cache_dir,manifest,key):
+    shutil.rmtree(os.path.join(cache_dir,key),ignore_errors=True)
+    del manifest["entries"][key]
+
+def _findEntry(cache_dir,manifest,file_path):
+    #Returns key of the cache entry matching the export, removes entries of older versions of it
+    stat=os.stat(file_path)
+    path_entries={key:entry for key,entry in manifest["entries"].items() if entry["path"]==file_path}
+
+    for key,entry in path_entries.items():
+        if entry["size"]==stat.st_size and entry["mtime_ns"]==stat.st_mtime_ns:
+            return key,None
+
+    content_hash=fileContentHash(file_path)
+    key=None
+    for entry_key,entry in path_entries.items():
+        if entry["sha256"]==content_hash:
+            #file touched or copied, but content is unchanged
+            entry["size"]=stat.st_size
+            entry["mtime_ns"]=stat.st_mtime_ns
+            key=entry_key
+        else:
+            _removeEntry(cache_dir,manifest,entry_key)
+
+    return key,content_hash
+
+def evictCache(cache_dir,manifest,max_cache_bytes,keep=()):
+    #Removing least recently used entries until the cache is smaller than max_cache_bytes
+    #must be called holding the manifest lock
+    total_bytes=sum(entry["nbytes"] for entry in manifest["entries"].values())
+    for key,entry in sorted(manifest["entries"].items(),key=lambda item: item[1]["last_access"]):
+        if total_bytes<=max_cache_bytes:
+            break
+        if key in keep:
+            continue
+        total_bytes-=entry["nbytes"]
+        _removeEntry(cache_dir,manifest,key)
+
+    #entry directories no manifest entry points to, e.g. left by an interrupted run, are not counted above
+    for name in os.listdir(cache_dir):
+        if name not in manifest["entries"] and os.path.isdir(os.path.join(cache_dir,name)):
+            shutil.rmtree(os.path.join(cache_dir,name),ignore_errors=True)
+
+def clearCache(xlsx_path,cache_dir=None):
+    #Removes the cache directory used for xlsx_path
+    shutil.rmtree(getCacheDir(xlsx_path,cache_dir),ignore_errors=True)
+
+def readFemDesignWorkbookCached(xlsx_path,kinds=None,cache_dir=None,max_cache_bytes=None):
+    """Same as fd_loader.readFemDesignWorkbook, but tables are read from and written to a parquet cache
+
+    xlsx_path: path to excel file exported from FEM-design
+    kinds: iterable of keys in fd_loader.SHEET_KINDS to read, all kinds if None
+    cache_dir: cache directory, DEFAULT_CACHE_DIR next to the export if None
+    max_cache_bytes: size limit of the cache directory, DEFAULT_MAX_CACHE_BYTES if None
+    """
+    if __package__:
+        from .fd_loader import SHEET_KINDS
+    else:
+        from fd_loader import SHEET_KINDS
+
+    try:
+        import pyarrow
+    except ImportError:
+        if __package__:
+            from .fd_loader import readFemDesignWorkbook
+        else:
+            from fd_loader import readFemDesignWorkbook
+        return readFemDesignWorkbook(xlsx_path,kinds=kinds)
+
+    if kinds is None:
+        kinds=tuple(SHEET_KINDS)
+    if max_cache_bytes is None:
+        max_cache_bytes=DEFAULT_MAX_CACHE_BYTES
+
+    file_path=os.path.abspath(xlsx_path)
+    cache_dir=getCacheDir(file_path,cache_dir)
+    os.makedirs(cache_dir,exist_ok=True)
+
+    #finding or registering the entry of the export, marked as used so other processes do not evict it
+    with _manifestLock(cache_dir):
+        manifest=_readManifest(cache_dir)
+        key,content_hash=_findEntry(cache_dir,manifest,file_path)
+        if key is None:
+            stat=os.stat(file_path)
+            key=hashlib.sha256((file_path+content_hash).encode()).hexdigest()[:32]
+            manifest["entries"][key]={"path":file_path,"size":stat.st_size,"mtime_ns":stat.st_mtime_ns,
+                "sha256":content_hash,"kinds":{},"nbytes":0,"last_access":0.0}
+        entry=manifest["entries"][key]
+        entry["last_access"]=time.time()
+        _writeManifest(cache_dir,manifest)
+    entry_dir=os.path.join(cache_dir,key)
+
+    frames={}
+    with stage("read_cache") as cache_stage:
+        for kind in kinds:
+            if entry["kinds"].get(kind) is None:
+                continue
+            try:
+                frames[kind]=pd.read_parquet(os.path.join(entry_dir,entry["kinds"][kind]))
+            except OSError:
+                #removed by another process since the manifest was read, parsed again below
+                pass
+        cache_stage.rows=sum(len(df) for df in frames.values())
+
+    #kinds that have not been parsed for this version of the export yet, parsed without holding the lock
+    missing_kinds=[kind for kind in kinds if kind not in frames and not (kind in entry["kinds"] and entry["kinds"][kind] is None)]
+    new_kinds={}
+    if missing_kinds:
+        if __package__:
+            from .fd_loader import readFemDesignWorkbook
+        else:
+            from fd_loader import readFemDesignWorkbook
+
+        parsed=readFemDesignWorkbook(xlsx_path,kinds=missing_kinds)
+        os.makedirs(entry_dir,exist_ok=True)
+        for kind in missing_kinds:
+            if kind not in parsed:
+                #kind is not present in the export, stored so the export is not parsed again for it
+                new_kinds[kind]=None
+                continue
+            frames[kind]=parsed[kind]
+            parquet_path=os.path.join(entry_dir,kind+".parquet")
+            tmp_path=parquet_path+f".{os.getpid()}.tmp"
+            try:
+                parsed[kind].to_parquet(tmp_path,index=False)
+            except (pyarrow.ArrowException,ValueError,TypeError):
+                #columns with mixed types can not be stored, the kind is parsed again next time
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            os.replace(tmp_path,parquet_path)
+            new_kinds[kind]=kind+".parquet"
+
+    #merging the parsed kinds into the manifest as it is now, other processes may have changed it meanwhile
+    with _manifestLock(cache_dir):
+        manifest=_readManifest(cache_dir)
+        if key not in manifest["entries"]:
+            #entry removed by another process, registered again with the kinds parsed here
+            manifest["entries"][key]=dict(entry,kinds={},nbytes=0)
+        current=manifest["entries"][key]
+        for kind,name in new_kinds.items():
+            if kind in current["kinds"]:
+                continue
+            if name is not None:
+                parquet_path=os.path.join(entry_dir,name)
+                if not os.path.exists(parquet_path):
+                    continue
+                current["nbytes"]+=os.path.getsize(parquet_path)
+            current["kinds"][kind]=name
+        current["last_access"]=time.time()
+        evictCache(cache_dir,manifest,max_cache_bytes,keep=(key,))
+        _writeManifest(cache_dir,manifest)
+
+    return {kind:frames[kind] for kind in kinds if kind in frames}
@@ -0,0 +1,204 @@
+"""Shared single-pass reader for excel exports from FEM-design
+
+The workbook is opened once in read-only mode. For every sheet whose name matches one of the known
+result tables the load case header in A1 and the table body are read in the same pass, sheets that
+do not match are never parsed.
+
+Sheet layout in FEM-design exports:
+A1: "Shells, Stresses, top, Ultimate - Load case: Svinn - for selected objects"
+row 2: column names
+row 3: units, e.g. [-], [N/mm2] (not present in all tables)
+row 4->: data
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .instrumentation import stage
+else:
+    from instrumentation import stage
+
+#kind of table -> substring of sheet name in FEM-design export
+#sheet names are truncated to 31 characters by excel, so only the start of the table name is used
+SHEET_KINDS = {
+    "stresses_top":"Shells, Stresses, top",
+    "stresses_bottom":"Shells, Stresses, bottom",
+    "internal_forces":"Shells, Internal forces",
+    "applied_reinforcement":"Applied reinforce",
+    "walls_and_plates":("Plates","Walls"),
+    "load_cases":"Load cases",
+}
+
+#tables where the load case is given in A1 and is added as a "load_case" column
+LOAD_CASE_KINDS = ("stresses_top","stresses_bottom","internal_forces")
+
+#numeric column used to drop unit rows, headers repeated for each shell and other text rows
+KEY_COLUMNS = {
+    "stresses_top":"Elem",
+    "stresses_bottom":"Elem",
+    "internal_forces":"Elem",
+    "applied_reinforcement":"Elem",
+    "walls_and_plates":"t1",
+}
+
+def getSheetKind(sheet):
+    #Returns kind of FEM-design table from sheet name, None if the sheet is not recognized
+    for kind,names in SHEET_KINDS.items():
+        if isinstance(names,str):
+            names=(names,)
+        if any(name in sheet for name in names):
+            return kind
+    return None
+
+def getLoadCaseNameFromHeader(header):
+    #Get name of load case from the string in cell A1 in FEM-design export
+    load_case_string_raw=str(header)
+    load_case=load_case_string_raw.split(": ")[-1]
+
+    return load_case
+
+def fillMissingStringsInDataFrame(df,column_name):
+    #A function that fills inn empty rows in dataframe columns after occuring string values
+    #For instance, when "fill all cells" is not selected in FEM-design export
+
+    #The column is stored as a categorical and the last string is carried forward on the integer codes,
+    #rows before the first string are left empty
+    column=df[column_name]
+    try:
+        is_string=column.str.len().notnull().to_numpy()
+    except AttributeError:
+        #column without any strings, e.g. all cells empty
+        is_string=np.zeros(len(column),dtype=bool)
+
+    categorical=pd.Categorical(column.where(is_string))
+    codes=categorical.codes
+    last_string_row=np.where(codes>=0,np.arange(len(codes)),0)
+    np.maximum.accumulate(last_string_row,out=last_string_row)
+
+    df[column_name]=pd.Categorical.from_codes(codes[last_string_row],categories=categorical.categories)
+    return df
+
+def _typedDataFrame(rows,columns,key_column=None):
+    #Builds dataframe from rows of a sheet and converts every numeric column to numbers
+
+    #dropping empty trailing columns, read only worksheets pads rows to the widest row in the sheet
+    n_columns=len(columns)
+    while n_columns>0 and columns[n_columns-1] is None:
+        n_columns-=1
+    columns=list(columns[:n_columns])
+
+    records=[row[:n_columns] for row in rows if any(value is not None for value in row)]
+    df=pd.DataFrame.from_records(records,columns=columns) if records else pd.DataFrame(columns=columns)
+
+    #Removing rows where the key column is not a number (unit rows etc.)
+    if key_column is not None and key_column in df.columns:
+        df=df[pd.to_numeric(df[key_column],errors="coerce").notnull()]
+    df=df.reset_index(drop=True)
+
+    for column in df.columns:
+        if df[column].dtype!=object:
+            continue
+        try:
+            df[column]=pd.to_numeric(df[column])
+        except (ValueError,TypeError):
+            #text columns such as Shell/ID are kept as they are
+            pass
+
+    return df
+
+def readFemDesignWorkbook(xlsx_path,kinds=None):
+    """Reads all recognized tables of a FEM-design export in one pass over the workbook
+
+    xlsx_path: path to excel file exported from FEM-design
+    kinds: iterable of keys in SHEET_KINDS to read, all kinds if None
+
+    Returns a dictionary kind -> dataframe with all sheets of that kind concatenated.
+    Kinds without any matching sheet are not included in the dictionary.
+    """
+    #openpyxl is only needed when a workbook is parsed, not when tables are read from cache
+    import openpyxl
+
+    if kinds is None:
+        kinds=tuple(SHEET_KINDS)
+    frames={kind:[] for kind in kinds}
+
+    with stage("parse_workbook") as workbook_stage:
+        workbook=openpyxl.load_workbook(xlsx_path,read_only=True,data_only=True)
+        try:
+            for sheet in workbook.sheetnames:
+                kind=getSheetKind(sheet)
+                if kind not in frames:
+                    continue
+
+                with stage(f"parse_sheet {kind}") as sheet_stage:
+                    rows=workbook[sheet].iter_rows(values_only=True)
+                    header=next(rows,None)
+                    columns=next(rows,None)
+                    if header is None or columns is None:
+                        continue
+
+                    df_sheet=_typedDataFrame(rows,columns,key_column=KEY_COLUMNS.get(kind))
+                    if kind in LOAD_CASE_KINDS:
+                        df_sheet["load_case"]=sheet_stage.load_case=getLoadCaseNameFromHeader(header[0])
+                    sheet_stage.rows=len(df_sheet)
+                frames[kind].append(df_sheet)
+        finally:
+            workbook.close()
+
+        tables={kind:pd.concat(frame_list,ignore_index=True,sort=False) for kind,frame_list in frames.items() if frame_list}
+        workbook_stage.rows=sum(len(df) for df in tables.values())
+
+    return tables
+
+def iterFemDesignWorkbookChunks(xlsx_path,kind,chunk_rows=50000):
+    """Streams one kind of table from a FEM-design export in chunks of rows
+
+    xlsx_path: path to excel file exported from FEM-design
+    kind: key in SHEET_KINDS
+    chunk_rows: maximum number of rows read from the workbook per chunk
+
+    Yields typed dataframes like readFemDesignWorkbook, but never holds more than chunk_rows rows
+    of the workbook in memory. Sheets are streamed in the order they appear in the workbook.
+    """
+    import openpyxl
+
+    workbook=openpyxl.load_workbook(xlsx_path,read_only=True,data_only=True)
+    try:
+        for sheet in workbook.sheetnames:
+            if getSheetKind(sheet)!=kind:
+                continue
+
+            rows=workbook[sheet].iter_rows(values_only=True)
+            header=next(rows,None)
+            columns=next(rows,None)
+            if header is None or columns is None:
+                continue
+            load_case=getLoadCaseNameFromHeader(header[0]) if kind in LOAD_CASE_KINDS else None
+
+            while True:
+                chunk=list(itertools.islice(rows,chunk_rows))
+                if not chunk:
+                    break
+                df_chunk=_typedDataFrame(chunk,columns,key_column=KEY_COLUMNS.get(kind))
+                if len(df_chunk)==0:
+                    continue
+                if load_case is not None:
+                    df_chunk["load_case"]=load_case
+                yield df_chunk
+    finally:
+        workbook.close()
+
+def getLoadCaseName(xlsx_path,sheet):
+    #Get name of load case from cell A1 of a single sheet in FEM-design export
+    import openpyxl
+
+    with stage("get_load_case_name"):
+        workbook=openpyxl.load_workbook(xlsx_path,read_only=True)
+        try:
+            header=next(workbook[sheet].iter_rows(min_row=1,max_row=1,max_col=1,values_only=True))[0]
+        finally:
+            workbook.close()
+
+    return getLoadCaseNameFromHeader(header)
@@ -0,0 +1,203 @@
+"""Reading tab-separated list output from FEM-design and generating the batch scripts producing it
+
+Reading the list files written by a FEM-design batch run avoids excel and openpyxl completely.
+Files are streamed table by table, so only one table is held as text at a time, and every table is
+converted to a dataframe with fixed dtypes by the C parser of pandas.
+
+Layout of a list file, tables are separated by blank lines:
+Shells, Stresses, top, Ultimate - Load case: Svinn
+Shell	Elem	Node	Sigma x'	...
+[-]	[-]	[-]	[N/mm2]	...
+W.4.1	674	4085	0.048	...
+	675	439	0.050	...
+
+The tables returned are the same as from fd_loader.readFemDesignWorkbook, so the text export can be used
+wherever the excel export is used.
+"""
+import io
+import os
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .fd_loader import KEY_COLUMNS,LOAD_CASE_KINDS,getLoadCaseNameFromHeader,getSheetKind
+    from .instrumentation import stage
+else:
+    from fd_loader import KEY_COLUMNS,LOAD_CASE_KINDS,getLoadCaseNameFromHeader,getSheetKind
+    from instrumentation import stage
+
+#columns kept as text, every other column is numeric
+STRING_COLUMNS = ("Shell","ID","Material","Name","Type","Duration","Load case","Comment")
+#numeric columns with integer values
+INTEGER_COLUMNS = ("Elem","Node","No.")
+
+def _columnDtypes(columns,float_dtype):
+    dtypes={}
+    for column in columns:
+        if column in STRING_COLUMNS:
+            dtypes[column]=object
+        elif column in INTEGER_COLUMNS:
+            dtypes[column]=np.int64
+        else:
+            dtypes[column]=float_dtype
+    return dtypes
+
+def _parseTable(kind,title,columns,lines,float_dtype):
+    #Converts lines of one table to a dataframe with fixed dtypes
+    with stage(f"parse_table {kind}",rows=len(lines),load_case=getLoadCaseNameFromHeader(title) if kind in LOAD_CASE_KINDS else None):
+        return _parseTableLines(kind,title,columns,lines,float_dtype)
+
+def _parseTableLines(kind,title,columns,lines,float_dtype):
+    dtypes=_columnDtypes(columns,float_dtype)
+    df=pd.read_csv(io.StringIO("".join(lines)),sep="\t",header=None,names=columns,usecols=range(len(columns)),
+        dtype={column:object for column in columns},keep_default_na=False,na_values=[""],engine="c")
+
+    #Removing rows where the key column is not a number (sum rows, repeated headers etc.)
+    key_column=KEY_COLUMNS.get(kind)
+    if key_column is not None and key_column in df.columns:
+        df=df[pd.to_numeric(df[key_column],errors="coerce").notnull()].reset_index(drop=True)
+
+    for column,dtype in dtypes.items():
+        if dtype is object:
+            #default string dtype of pandas, as from read_excel
+            df[column]=df[column].infer_objects()
+            continue
+        values=pd.to_numeric(df[column],errors="coerce")
+        if dtype is np.int64 and values.isnull().any():
+            #integer columns with missing values can not be stored as integers
+            dtype=float_dtype
+        df[column]=values.astype(dtype)
+
+    if kind in LOAD_CASE_KINDS:
+        df["load_case"]=getLoadCaseNameFromHeader(title)
+    return df
+
+def iterFemDesignTextTables(txt_path,kinds=None,float_dtype=np.float64,encoding="utf-8-sig",chunk_rows=None):
+    """Streams the tables of a FEM-design list file
+
+    txt_path: path to tab-separated list file written by FEM-design
+    kinds: iterable of keys in fd_loader.SHEET_KINDS to read, all kinds if None
+    float_dtype: dtype of numeric columns, np.float32 halves memory for large models
+    chunk_rows: if given, tables are yielded in parts of at most chunk_rows rows
+
+    Yields (kind, dataframe) for every table in the file. Tables of other kinds are skipped without parsing.
+    """
+    title=None
+    columns=None
+    kind=None
+    lines=[]
+    n_rows=0
+
+    with open(txt_path,"r",encoding=encoding) as f:
+        for line in f:
+            if not line.strip():
+                if kind is not None and lines:
+                    yield kind,_parseTable(kind,title,columns,lines,float_dtype)
+                title,columns,kind,lines,n_rows=None,None,None,[],0
+                continue
+
+            if title is None:
+                title=line.strip()
+                kind=getSheetKind(title)
+                if kinds is not None and kind not in kinds:
+                    kind=None
+            elif columns is None:
+                columns=line.rstrip("\r\n").split("\t")
+                #dropping empty trailing columns
+                while columns and not columns[-1].strip():
+                    columns.pop()
+            elif kind is None:
+                continue
+            elif n_rows==0 and line.lstrip().startswith("["):
+                #units row
+                continue
+            else:
+                lines.append(line)
+                n_rows+=1
+                if chunk_rows is not None and len(lines)>=chunk_rows:
+                    yield kind,_parseTable(kind,title,columns,lines,float_dtype)
+                    lines=[]
+
+    if kind is not None and lines:
+        yield kind,_parseTable(kind,title,columns,lines,float_dtype)
+
+def readFemDesignTextExport(txt_paths,kinds=None,float_dtype=np.float64,encoding="utf-8-sig"):
+    """Reads all tables of one or more FEM-design list files
+
+    txt_paths: path or list of paths to list files, e.g. one file per batch script
+    kinds: iterable of keys in fd_loader.SHEET_KINDS to read, all kinds if None
+
+    Returns a dictionary kind -> dataframe like fd_loader.readFemDesignWorkbook
+    """
+    if isinstance(txt_paths,(str,os.PathLike)):
+        txt_paths=[txt_paths]
+
+    with stage("parse_text_export") as text_stage:
+        frames={}
+        for txt_path in txt_paths:
+            for kind,df in iterFemDesignTextTables(txt_path,kinds=kinds,float_dtype=float_dtype,encoding=encoding):
+                frames.setdefault(kind,[]).append(df)
+
+        tables={kind:pd.concat(frame_list,ignore_index=True,sort=False) for kind,frame_list in frames.items()}
+        text_stage.rows=sum(len(df) for df in tables.values())
+
+    return tables
+
+#FEM-design list procedures for each result type, as in stress_output_batch.bsc saved from FEM-design
+#only the stress tables are generated, other result types need their procedure names and column
+#formats taken from a batch template saved from FEM-design before they are added here
+RESULT_LISTPROCS = {
+    "stresses":("frCaseStrsTopShell_ListProc","frCaseStrsBotShell_ListProc"),
+}
+
+#column formats of the stress tables in stress_output_batch.bsc: Shell, Elem, Node, 9 stresses and load case
+STRESS_COLUMN_FORMATS = ["%s","%s","%ld"]+["%.3f"]*9+["%s"]
+
+#units as set up in stress_output_batch.bsc, num: unit
+BSC_UNITS = {2:3,3:2,7:4}
+
+def _docTable(listproc,suffix,column_formats):
+    font = "<font><name>Tahoma</name><type>DEFAULT_CHARSET</type><size>0.003</size><width>1</width><slant>0</slant></font>"
+    coldata = ""
+    for num,column_format in enumerate(column_formats):
+        flags = 1 if num==len(column_formats)-1 else 0
+        coldata += f"<coldata><num>{num}</num><format>{column_format}</format><width>{12 if num==0 else 15}</width><flags>{flags}</flags></coldata>"
+    units = "".join(f"<units><num>{num}</num><unit>{BSC_UNITS.get(num,0)}</unit></units>" for num in range(64))
+
+    return f"<cmddoctable command=\"\"><doctable><listdll></listdll><listproc>{listproc}</listproc>{font}" \
+        f"<version>1900</version><index>458752</index><suffix>{escape(suffix)}</suffix>{coldata}{units}" \
+        f"<options><surface>0</surface></options><restype>1</restype></doctable></cmddoctable>"
+
+def batchScriptString(load_cases,result_types=("stresses",),analysis="Ultimate",title="FEM-Design Batch template",
+    logfile="batchtable.log"):
+    """Returns a FEM-design batch script (.bsc) listing the given result types for every load case
+
+    load_cases: names of load cases, e.g. ["Svinn","Temp"]
+    result_types: keys in RESULT_LISTPROCS
+    analysis: prefix of the load case suffix in FEM-design, e.g. "Ultimate - Load case: Svinn"
+    """
+    if isinstance(load_cases,str):
+        load_cases=[load_cases]
+    for result_type in result_types:
+        if result_type not in RESULT_LISTPROCS:
+            raise ValueError(f"Unknown result type {result_type}, expected one of {list(RESULT_LISTPROCS)}")
+
+    header = "<?xml version=\"1.0\" encoding=\"UTF-8\"?><fdscript xmlns:xsi=\"http://www.w3.org/2001/XMLSchema-instance\" " \
+        "xsi:noNamespaceSchemaLocation=\"fdscript.xsd\"><fdscriptheader>" \
+        f"<title>{escape(title)}</title><version>1900</version><module>sframe</module><logfile>{escape(logfile)}</logfile></fdscriptheader>"
+
+    doctables = ""
+    for result_type in result_types:
+        for listproc in RESULT_LISTPROCS[result_type]:
+            for load_case in load_cases:
+                doctables += _docTable(listproc,f"{analysis} - Load case: {load_case}",STRESS_COLUMN_FORMATS)
+
+    return header+doctables+"<cmdendsession/></fdscript>"
+
+def writeBatchScript(bsc_path,load_cases,result_types=("stresses",),analysis="Ultimate"):
+    #Writes batch script in the same format as stress_output_batch.bsc
+    with open(bsc_path,"w",encoding="utf-8") as f:
+        f.write(batchScriptString(load_cases,result_types=result_types,analysis=analysis))
+    return bsc_path
@@ -0,0 +1,71 @@
+"""Selecting the n rows with largest value per group without per-group Python callbacks
+
+nLargestPerGroup gives the same rows in the same order as
+df.groupby(group_column).apply(lambda x: x.nlargest(n,value_column)), but with one lexsort over the
+whole table. RunningNLargestPerGroup does the same incrementally over chunks, e.g. one load case at
+a time, keeping at most n rows per group between chunks.
+"""
+import numpy as np
+import pandas as pd
+
+def _nLargestOrder(group_values,values,positions,n):
+    #Row order of the n largest values per group, groups sorted, ties and missing values kept in order of positions
+    codes,_=pd.factorize(group_values,sort=True)
+    values=np.asarray(values,dtype=float)
+
+    #rows with missing group are dropped as by groupby, missing values come last in their group as
+    #with nlargest, which only returns them for groups with fewer than n values
+    valid=np.flatnonzero(codes>=0)
+    missing=np.isnan(values[valid])
+    order=valid[np.lexsort((positions[valid],-np.where(missing,0.0,values[valid]),missing,codes[valid]))]
+
+    #rank within each group from the start of the group in the sorted order
+    sorted_codes=codes[order]
+    group_start=np.ones(len(order),dtype=bool)
+    group_start[1:]=sorted_codes[1:]!=sorted_codes[:-1]
+    start_index=np.maximum.accumulate(np.where(group_start,np.arange(len(order)),0))
+    rank=np.arange(len(order))-start_index
+
+    return order[rank<n]
+
+def nLargestPerGroup(df,group_column,value_column,n=1):
+    """n rows with largest value_column for each group in group_column
+
+    Same result as df.groupby(group_column).apply(lambda x: x.nlargest(n,value_column)) with the
+    group level dropped from the index: groups in sorted order, largest first within a group and
+    ties in the order they appear in df. Rows with missing value_column come after the other rows of
+    their group, so they are only selected for groups with fewer than n values, as by nlargest.
+    """
+    order=_nLargestOrder(df[group_column],df[value_column].to_numpy(dtype=float),np.arange(len(df)),n)
+    return df.iloc[order]
+
+class RunningNLargestPerGroup:
+    """n rows with largest value per group, updated chunk by chunk
+
+    Only the current n largest rows of each group are kept between updates, so memory is bounded by
+    n times the number of groups plus one chunk. result() equals nLargestPerGroup on all chunks concatenated.
+    """
+    def __init__(self,group_column,value_column,n=1):
+        self.group_column=group_column
+        self.value_column=value_column
+        self.n=n
+        self._df=None
+        self._positions=np.zeros(0,dtype=np.int64)
+        self._n_rows=0
+
+    def update(self,df_chunk):
+        positions=np.arange(self._n_rows,self._n_rows+len(df_chunk))
+        self._n_rows+=len(df_chunk)
+        if self._df is not None:
+            df_chunk=pd.concat([self._df,df_chunk],ignore_index=True,sort=False)
+            positions=np.concatenate([self._positions,positions])
+
+        order=_nLargestOrder(df_chunk[self.group_column],df_chunk[self.value_column].to_numpy(dtype=float),positions,self.n)
+        self._df=df_chunk.iloc[order].reset_index(drop=True)
+        self._positions=positions[order]
+        return self
+
+    def result(self):
+        if self._df is None:
+            return None
+        return self._df.copy()
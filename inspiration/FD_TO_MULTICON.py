@@ -1,13 +1,21 @@
 import os
 import re
 import json
-import numpy as np
 import pandas as pd
 import sys
-import importlib.util
-import subprocess
-import openpyxl
-import docx
+
+#shared modules in the root of the repository, and excel2mult_runner next to this file, also when
+#imported from another folder, e.g. as inspiration.FD_TO_MULTICON
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fd_loader import fillMissingStringsInDataFrame
+from fd_cache import readFemDesignWorkbookCached
+from group_selection import nLargestPerGroup
+from reinforcement import proposeRebars
+from excel2mult_runner import buildSettingsPayloads,runExcel2MultJobs
+from result_writers import writeDataFrameToXlsx,writeGroupedFiles,writeGroupedWorkbook
+from result_table import compactDataFrame
+from instrumentation import stage
 
 
 #This script converts output from FEM-design to a .xlsx adapted
@@ -15,81 +23,35 @@ import docx
 
 #Merging of dataframes are passed sort=False to deal with future behaviour of dataframes
 
-def getLoadCasesDataFrame(xlsx_path):
+def getLoadCasesDataFrame(xlsx_path,fd_workbook=None):
     #Getting dataframe containing names of load cases
-    pd_xlsx=pd.ExcelFile(xlsx_path)
+    #fd_workbook: tables already read by readFemDesignWorkbook, the workbook is read if None
+    if fd_workbook is None:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("load_cases",))
 
-    for sheet in pd_xlsx.sheet_names:
-        if "Load cases" in sheet:
-            df_load_cases = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
+    df_load_cases = fd_workbook["load_cases"]
 
     #renameing "Name" column to "load_case" to match output of other functions
     df_load_cases=df_load_cases.rename(columns={"Name":"load_case"})
 
     return df_load_cases
 
-def getLoadCaseName(xlsx_path,sheet):
-    #Get name of load case from cell A1 in FEM-design export
-
-    ####OLD CODE, xlrd is outdated
-    #workbook=xlrd.open_workbook(xlsx_path)
-    #worksheet=workbook.sheet_by_name(sheet)
-    #load_case_string_raw=str(worksheet.cell(0,0).value)
-
-
-    ####NEW CODE
-    workbook=openpyxl.load_workbook(xlsx_path)
-    worksheet=workbook[sheet]
-    load_case_string_raw=str(worksheet["A1"].value)
-    load_case=load_case_string_raw.split(": ")[-1]
-
-    return load_case
-
-def fillMissingStringsInDataFrame(df,column_name):
-    #A function that fills inn empty rows in dataframe columns after occuring string values
-    #For instance, when "fill all cells" is not selected in FEM-design export
-
-    #converting column to list
-    id_list = df[column_name].tolist()
-    for idx,item in enumerate(id_list):
-        if isinstance(item,str):
-            id_string = item
-        else:
-            id_list[idx]=id_string
-    
-    df[column_name]=id_list
-    return df
-
 def getNLargestSigma1(df_sigma_1,n=1):
     #Returning n largest sigma 1 of each shell
     df_sigma_1["Sigma 1"] = df_sigma_1["Sigma 1"].astype(float)
 
-    df_sigma_1_largest=df_sigma_1.groupby("ID").apply(lambda x: x.nlargest(n,"Sigma 1")).reset_index(drop=True)
+    df_sigma_1_largest=nLargestPerGroup(df_sigma_1,"ID","Sigma 1",n=n).reset_index(drop=True)
 
     #sorting dataframe by largest to smallest value of Sigma 1
     df_sigma_1_largest=df_sigma_1_largest.sort_values(by=["Sigma 1"])
 
     return df_sigma_1_largest
 
-def getShellStressesDataFrame(xlsx_path,n_largest=1):
-    #Reading entire workbook by xlsx_path into 
-    pd_xlsx=pd.ExcelFile(xlsx_path)
-    sigma_1_list=[]
-    
-
-    for sheet in pd_xlsx.sheet_names:
-        df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-        
-        if "Shells, Stresses, top" in sheet:
-            #Getting sheet into a dataframe
-            load_case = getLoadCaseName(xlsx_path,sheet)    
-            df_sheet["load_case"]=load_case
-            sigma_1_list.append(df_sheet)
-            
-        elif "Shells, Stresses, bottom" in sheet:
-            load_case = getLoadCaseName(xlsx_path,sheet)
-            df_sheet["load_case"]=load_case
-            sigma_1_list.append(df_sheet)
+def getShellStressesDataFrame(xlsx_path,n_largest=1,fd_workbook=None):
+    #Reading top and bottom stresses with load case names in a single pass over the workbook
+    if fd_workbook is None:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("stresses_top","stresses_bottom"))
+    sigma_1_list=[fd_workbook[kind] for kind in ("stresses_top","stresses_bottom") if kind in fd_workbook]
 
     df_sigma_1 = pd.concat(sigma_1_list,ignore_index=True,sort=False)
     #Removing rows where Sigma 1 is not a number
@@ -101,42 +63,26 @@ def getShellStressesDataFrame(xlsx_path,n_largest=1):
     #Filtering out n largest sigma 1 if specified
     if n_largest is not None:
         df_sigma_1 = getNLargestSigma1(df_sigma_1,n=n_largest)
-    del df_sheet
 
     return df_sigma_1
 
-def getShellInternalForcesDataFrame(xlsx_path):
-    #Reading entire workbook by xlsx_path into 
-    pd_xlsx=pd.ExcelFile(xlsx_path)
-    internal_forces_list=[]
+def getShellInternalForcesDataFrame(xlsx_path,fd_workbook=None):
+    #Reading internal forces with load case names in a single pass over the workbook
+    if fd_workbook is None:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("internal_forces",))
 
-    for sheet in pd_xlsx.sheet_names:
-        df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-        
-        if "Shells, Internal forces" in sheet:
-            #Getting sheet into a dataframe
-            load_case = getLoadCaseName(xlsx_path,sheet)
-            df_sheet["load_case"]=load_case
-            internal_forces_list.append(df_sheet)
-        
-    df_shell_internal_forces = pd.concat(internal_forces_list,ignore_index=True,sort=False)
+    df_shell_internal_forces = fd_workbook["internal_forces"]
     #Removing rows where Elem is not a number
     df_shell_internal_forces = df_shell_internal_forces[pd.to_numeric(df_shell_internal_forces["Elem"], errors = "coerce").notnull()]
     
     df_shell_internal_forces=fillMissingStringsInDataFrame(df_shell_internal_forces,"ID")
     return df_shell_internal_forces
 
-def getAppliedReinforcement(xlsx_path):
-    pd_xlsx=pd.ExcelFile(xlsx_path)
-    applied_reinforcement_list=[]
+def getAppliedReinforcement(xlsx_path,fd_workbook=None):
+    if fd_workbook is None:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("applied_reinforcement",))
 
-    for sheet in pd_xlsx.sheet_names:
-        df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-        
-        if "Applied reinforce" in sheet:
-            applied_reinforcement_list.append(df_sheet)
-            
-    df_applied_reinforcement = pd.concat(applied_reinforcement_list,ignore_index=True,sort=False)
+    df_applied_reinforcement = fd_workbook["applied_reinforcement"]
     df_applied_reinforcement = df_applied_reinforcement[pd.to_numeric(df_applied_reinforcement["Elem"], errors = "coerce").notnull()]
 
     
@@ -146,59 +92,26 @@ def getAppliedReinforcement(xlsx_path):
 
     return df_applied_reinforcement
 
-def proposeRebarDiameter(As,area_unit=r'cm2/m',test_diameters_list=None,test_cc_list=None):
+def proposeRebarDiameter(As,area_unit=r'cm2/m',test_diameters_list=None,test_cc_list=None,return_spacing=False):
     #As: Applied reinfocement area [mm2/m]
     #This function attempts to return rebar diameter given As
+    #return_spacing: return (diameter, spacing) of the closest match instead of only the diameter
 
-    if test_diameters_list ==None:
-        D=[12,16,20,25,32]
-    else:
-        D=test_diameters_list
-    
-    if test_cc_list == None:
-        S=[100,150,200,250]
-    else:
-        S=test_cc_list
-
-    if area_unit==r'cm2/m':
-        scale_area=0.01
-    elif area_unit==r'mm2/m':
-        scale_area=1
-    else:
-        scale_area = area_unit
-        print(f"Scaling area mm2/m by a factor of {scale_area}")
-    
-    #initialize error
-    error = None
-
-    #loop through possible rebar size combinatinos
-    for d in D:
-        for s in S:
-            Asi=np.pi*d**2/4*1000/s*scale_area
-            if error == None:
-                error = abs(As-Asi)
-                candidate_diameter = d
-                #candidate_cc=s
-            elif abs(As-Asi)<error:
-                error = abs(As-Asi) 
-                candidate_diameter = d
-                #candidate_cc=s
+    diameters,spacings=proposeRebars(As,area_unit=area_unit,test_diameters_list=test_diameters_list,test_cc_list=test_cc_list)
+    candidate_diameter=diameters.item()
+    candidate_cc=spacings.item()
 
     #print(f"candidate_diameter:{candidate_diameter}")
+    if return_spacing:
+        return candidate_diameter,candidate_cc
 
     return candidate_diameter
 
-def getWallsAndPlatesDataFrame(xlsx_path):
-    pd_xlsx=pd.ExcelFile(xlsx_path)
-    walls_and_plates_list=[]
-
-    for sheet in pd_xlsx.sheet_names:
-        df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-
-        if "Plates" in sheet or "Walls" in sheet:
-            walls_and_plates_list.append(df_sheet)
+def getWallsAndPlatesDataFrame(xlsx_path,fd_workbook=None):
+    if fd_workbook is None:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("walls_and_plates",))
 
-    df_walls_and_plates = pd.concat(walls_and_plates_list,ignore_index=True,sort=False)
+    df_walls_and_plates = fd_workbook["walls_and_plates"]
     #dropping rows with non-numeric thickness
     df_walls_and_plates = df_walls_and_plates[pd.to_numeric(df_walls_and_plates["t1"], errors = "coerce").notnull()]
 
@@ -207,25 +120,30 @@ def getWallsAndPlatesDataFrame(xlsx_path):
     
     return df_walls_and_plates
         
-def mergeDataFrames(df_load_cases,df_sigma_1,df_shell_internal_forces,df_applied_reinforcement,df_walls_and_plates):
-    #Merging df_sigma_1 and df_shell_internal_forces
-    common_columns_stresses_forces = list(set(df_sigma_1.columns) & set(df_shell_internal_forces.columns))
-    df = pd.merge(df_sigma_1,df_shell_internal_forces,on=["Elem"].append(common_columns_stresses_forces.remove("Elem")))
-
-    #Merging df of stresses and forces with df_applied_reinforcement
-    common_columns_df_applied_reinforcement = list(set(df.columns) & set(df_applied_reinforcement.columns))
-    df = pd.merge(df,df_applied_reinforcement,on=["Elem"])#.append(common_columns_df_applied_reinforcement))#.remove("Elem")))
+def mergeDataFrames(df_load_cases,df_sigma_1,df_shell_internal_forces,df_applied_reinforcement,df_walls_and_plates,compact=False):
+    #compact: categorical ID and load case columns and downcast integers, see result_table.compactDataFrame
+    with stage("merge_dataframes") as merge_stage:
+        #Merging df_sigma_1 and df_shell_internal_forces
+        common_columns_stresses_forces = list(set(df_sigma_1.columns) & set(df_shell_internal_forces.columns))
+        df = pd.merge(df_sigma_1,df_shell_internal_forces,on=["Elem"].append(common_columns_stresses_forces.remove("Elem")))
+
+        #Merging df of stresses and forces with df_applied_reinforcement
+        common_columns_df_applied_reinforcement = list(set(df.columns) & set(df_applied_reinforcement.columns))
+        df = pd.merge(df,df_applied_reinforcement,on=["Elem"])#.append(common_columns_df_applied_reinforcement))#.remove("Elem")))
     
-    #Merging df of stresses, forces and reinforcement with dataframe containting thickness
-    df = pd.merge(df,df_walls_and_plates,on=["ID"])
-    try:
-        #if export from FEM-design was for selected objects, load_cases contains a 
-        # - for selected objects, which has to be removed when merging with df_load_cases
-        df["load_case"]=df["load_case"].str.replace(r' - for selected objects','')
-    except:
-        print("Was not able to assign correct load case name to each load case")
+        #Merging df of stresses, forces and reinforcement with dataframe containting thickness
+        df = pd.merge(df,df_walls_and_plates,on=["ID"])
+        try:
+            #if export from FEM-design was for selected objects, load_cases contains a 
+            # - for selected objects, which has to be removed when merging with df_load_cases
+            df["load_case"]=df["load_case"].str.replace(r' - for selected objects','')
+        except:
+            print("Was not able to assign correct load case name to each load case")
     
-    df = pd.merge(df,df_load_cases,on=["load_case"])
+        df = pd.merge(df,df_load_cases,on=["load_case"])
+        merge_stage.rows=len(df)
+    if compact:
+        df = compactDataFrame(df)
     return df
 
 def mapFDColumnsToMCColumns(df_from_FD):
@@ -256,31 +174,36 @@ def mapFDColumnsToMCColumns(df_from_FD):
     return df_mapped
 
 def proposeElementwiseRebarDiameters(df_mapped,to_excel=False,\
-    ouput_xlsx_path="proposed_rebar_diameters.xlsx",ouput_sheet_name="proposed_rebar_diameters"):
-    #This function updates df_mapped with proposed rebar diameters
+    ouput_xlsx_path="proposed_rebar_diameters.xlsx",ouput_sheet_name="proposed_rebar_diameters",\
+        test_diameters_list=None,test_cc_list=None):
+    #This function updates df_mapped with proposed rebar diameters and spacings
     print("___________________________\n\
             Running rebar proposal")
-    test_diameters_list=[12,16,20,25,32]
-    test_cc_list=[100,150,200,250]
+    if test_diameters_list is None:
+        test_diameters_list=[12,16,20,25,32]
+    if test_cc_list is None:
+        test_cc_list=[100,150,200,250]
     print(f"Finding closest match to\ndiameters={test_diameters_list}\nc/c={test_cc_list}\n")
 
     #Finding columns in df_mapped to propose rebar diameters
     rebar_re = r'AS\w+ \[cm2/m\]' #matching pattern
     rebar_area_names_list = [r for r in df_mapped.columns if re.match(rebar_re,r)] #generating list of ASO [cm2/m] and so on
     
-    #Initializing columns in dataframe containing rebar diameters for each element
+    #Initializing columns in dataframe containing rebar diameters and spacings for each element
     diameter_names = ["phi_SO","phi_SOQ","phi_SU","phi_SUQ"]
+    spacing_names = ["cc_SO","cc_SOQ","cc_SU","cc_SUQ"]
     id_nr=["ID","NR "]
-    df_proposed_rebar_diameters_columns = id_nr+diameter_names
-    
-    #Initializing dataframe containing rebar diamters
-    df_proposed_rebar_diameters=pd.DataFrame(columns=df_proposed_rebar_diameters_columns)
-    df_proposed_rebar_diameters[id_nr]=df_mapped[id_nr]
 
-    #Elementwise proposing rebar diameters from df_mapped to df_proposed_rebar_diameters
-    df_proposed_rebar_diameters[diameter_names]=\
-        df_mapped[rebar_area_names_list].applymap(lambda x: \
-            proposeRebarDiameter(x,test_diameters_list=test_diameters_list,test_cc_list=test_cc_list))
+    #Initializing dataframe containing rebar diamters
+    df_proposed_rebar_diameters=df_mapped[id_nr].copy()
+
+    #Proposing rebar diameters and spacings for all cells at once from a precomputed table of areas
+    with stage("propose_rebar_diameters",rows=len(df_mapped)):
+        diameters,spacings=proposeRebars(df_mapped[rebar_area_names_list].to_numpy(dtype=float),\
+            test_diameters_list=test_diameters_list,test_cc_list=test_cc_list)
+    for idx,(diameter_name,spacing_name) in enumerate(zip(diameter_names,spacing_names)):
+        df_proposed_rebar_diameters[diameter_name]=diameters[:,idx]
+        df_proposed_rebar_diameters[spacing_name]=spacings[:,idx]
     
     #Save proposed rebar diameters to xlsx 
     if to_excel == True:
@@ -292,60 +215,38 @@ def proposeElementwiseRebarDiameters(df_mapped,to_excel=False,\
     
     return df_mapped
 
-def splitMappedDataFrameAndSaveToXlsx(df_mapped,sheet_name,keep_unsplit=True,unsplit_xlsx_path="FD_TO_MULTICON_ALL_SHELLS.xlsx"):
+def splitMappedDataFrameAndSaveToXlsx(df_mapped,sheet_name,keep_unsplit=True,unsplit_xlsx_path="FD_TO_MULTICON_ALL_SHELLS.xlsx",\
+    output_dir=".",output_format="xlsx",single_workbook=False,grouped_xlsx_path="FD_TO_MULTICON_BY_SHELL.xlsx",max_workers=1):
+    #output_format: "xlsx", "csv" or "parquet" for the files per shell ID
+    #single_workbook: write one workbook with a sheet per shell ID to grouped_xlsx_path instead of one file per shell ID
+    #max_workers: number of processes writing files per shell ID, 1 writes them one after another,
+    #None uses all cpus, which only pays off for many large shells
     if keep_unsplit==True:
-        df_mapped.to_excel(unsplit_xlsx_path,sheet_name=sheet_name,index=False)
-    
-    df_mapped_grouped = df_mapped.groupby("ID")
-    for name,group in df_mapped_grouped:
-        df_grouped = group
+        writeDataFrameToXlsx(df_mapped,unsplit_xlsx_path,sheet_name=sheet_name)
 
-        df_grouped.drop(columns=["ID"])
-        df_grouped.to_excel(name+".xlsx",sheet_name=sheet_name,index=False)
+    #ID is given by the file or sheet name
+    if single_workbook==True:
+        writeGroupedWorkbook(df_mapped,grouped_xlsx_path,group_column="ID",drop_group_column=True)
+    else:
+        writeGroupedFiles(df_mapped,output_dir=output_dir,group_column="ID",file_format=output_format,\
+            sheet_name=sheet_name,drop_group_column=True,max_workers=max_workers)
 
 def modifyJsonSettingsByXlsxRowAndRunExcel2Mult(xlsx_path="FD_TO_MULTICON_ALL_SHELLS.xlsx",json_path="settings.json"\
-    ,proposeRebars=True):
+    ,proposeRebars=True,command=None,work_root="excel2mult_jobs",max_workers=None,timeout=600,retries=1):
     #xlsx_path: path to xlsx converted from FEM-design to input for Multicon
-    #json_path: path to settings.json
+    #json_path: path to settings.json, used as template and not modified
+    #command: command running excel2mult, excel2mult_runner.DEFAULT_COMMAND if None
+    #each row is run as a separate excel2mult process in its own directory under work_root
     df = pd.read_excel(xlsx_path)
 
-    for index,row in df.iterrows():
-        #values for excel_ouputfile
-        xlsx_filename = row["ID"]+".xlsx"
-        LC = row["LC "]
-        
-        #values for multicon inputfile
-        phi_SO = row["phi_SO"]
-        phi_SOQ = row["phi_SOQ"]
-        phi_SU = row["phi_SU"]
-        phi_SUQ = row["phi_SUQ"]
-        
-        docx_filename=row["ID"]
+    with open(json_path,"r") as f:
+        base_settings = json.load(f)
 
-        with open(json_path,"r") as f:
-            data = json.load(f)
+    payloads=buildSettingsPayloads(df,base_settings,proposeRebars=proposeRebars)
+    print(f"Running excel2mult for {len(payloads)} rows of {xlsx_path}")
 
-        #Hard coding changes in dictionary of json-file
-        data["excel_outputfile"]["filename"]=xlsx_filename
-        data["excel_outputfile"]["LC"]=LC
-        
-        if proposeRebars == True:
-            data["multicon_inputfile"]["phi_SO"] = phi_SO
-            data["multicon_inputfile"]["phi_SOQ"] = phi_SOQ
-            data["multicon_inputfile"]["phi_SU"] = phi_SU
-            data["multicon_inputfile"]["phi_SUQ"] = phi_SUQ
-
-        data["report_outputfile"]["filename"] = docx_filename
-
-        with open(json_path,'w') as f:
-            json.dump(data, f, indent=2)
-        
-        print(f"Running excel2mult with data from {xlsx_filename}")
-        try:
-            import excel2mult
-        except SystemExit:
-            continue
-            
+    return runExcel2MultJobs(payloads,command=command,work_root=work_root,input_dir=os.path.dirname(os.path.abspath(xlsx_path)),\
+        max_workers=max_workers,timeout=timeout,retries=retries)
 
 def runFD_TO_MULTICON(xlsx_path,sheet_name = "XLSX-Export",run_excel2mult=False,\
     n_largest=1,proposeRebars=False,createAllReports=False):
@@ -354,11 +255,13 @@ def runFD_TO_MULTICON(xlsx_path,sheet_name = "XLSX-Export",run_excel2mult=False,
     #n_largest: the n number of elements with highest sigma 1 from analysis in FEM-design
     
     print(f"Gathering all data into one dataframe where n={n_largest} largest sigma 1 occurs")
-    df_load_cases=getLoadCasesDataFrame(xlsx_path)
-    df_sigma_1=getShellStressesDataFrame(xlsx_path,n_largest=n_largest)
-    df_shell_internal_forces=getShellInternalForcesDataFrame(xlsx_path)
-    df_applied_reinforcement=getAppliedReinforcement(xlsx_path)
-    df_walls_and_plates = getWallsAndPlatesDataFrame(xlsx_path)
+    #reading every table of the export in one pass over the workbook, or from cache if read before
+    fd_workbook=readFemDesignWorkbookCached(xlsx_path)
+    df_load_cases=getLoadCasesDataFrame(xlsx_path,fd_workbook=fd_workbook)
+    df_sigma_1=getShellStressesDataFrame(xlsx_path,n_largest=n_largest,fd_workbook=fd_workbook)
+    df_shell_internal_forces=getShellInternalForcesDataFrame(xlsx_path,fd_workbook=fd_workbook)
+    df_applied_reinforcement=getAppliedReinforcement(xlsx_path,fd_workbook=fd_workbook)
+    df_walls_and_plates = getWallsAndPlatesDataFrame(xlsx_path,fd_workbook=fd_workbook)
     
     print("Merging dataframes")
     df = mergeDataFrames(df_load_cases,df_sigma_1,df_shell_internal_forces,df_applied_reinforcement,df_walls_and_plates)
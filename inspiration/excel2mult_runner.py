@@ -0,0 +1,137 @@
+"""Running excel2mult for many shells in parallel, each job isolated in its own working directory
+
+Importing excel2mult in a loop only runs it once per process because of the module cache, and
+rewriting one settings.json between runs makes the jobs depend on each other. Here one settings
+payload is built per row in memory, and every job gets its own directory with its own settings.json
+and input workbook, and runs the design tool as a subprocess. A bounded number of jobs run at the
+same time, each with a timeout and retries, and the outcome of every job is written to a manifest.
+
+Any executable reading settings.json from its working directory can be used as command, which makes
+the runner testable against a local stand-in, e.g. command=[sys.executable,"tests/fake_excel2mult.py"].
+"""
+import os
+import re
+import sys
+import copy
+import json
+import time
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+#imported from another folder, e.g. as inspiration.excel2mult_runner
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from result_writers import groupFileName
+
+DEFAULT_COMMAND = ["excel2mult.exe"]
+
+def buildSettingsPayloads(df,base_settings,proposeRebars=True):
+    """One settings payload per row of the FD_TO_MULTICON_ALL_SHELLS workbook
+
+    df: dataframe with ID, LC and phi_SO, phi_SOQ, phi_SU, phi_SUQ columns
+    base_settings: contents of settings.json, not modified
+
+    Input files are named as written by result_writers.writeGroupedFiles for the ID.
+    Returns list of (job_name, input_xlsx_filename, settings) tuples
+    """
+    payloads=[]
+    for index,row in df.iterrows():
+        #values for excel_ouputfile
+        xlsx_filename = groupFileName(row["ID"],"xlsx")
+        LC = row["LC "]
+
+        data=copy.deepcopy(base_settings)
+        data["excel_outputfile"]["filename"]=xlsx_filename
+        data["excel_outputfile"]["LC"]=_jsonValue(LC)
+
+        if proposeRebars == True:
+            for name in ("phi_SO","phi_SOQ","phi_SU","phi_SUQ"):
+                data["multicon_inputfile"][name] = _jsonValue(row[name])
+
+        data["report_outputfile"]["filename"] = os.path.splitext(xlsx_filename)[0]
+
+        job_name=re.sub(r'[^\w.-]','_',f"{len(payloads):05d}_{row['ID']}_LC{LC}")
+        payloads.append((job_name,xlsx_filename,data))
+
+    return payloads
+
+def _jsonValue(value):
+    #numpy scalars from dataframes are not json serializable
+    return value.item() if hasattr(value,"item") else value
+
+def _runJob(job_name,xlsx_filename,settings,command,work_root,input_dir,shared_files,timeout,retries):
+    job_dir=os.path.join(work_root,job_name)
+    os.makedirs(job_dir,exist_ok=True)
+
+    with open(os.path.join(job_dir,"settings.json"),"w") as f:
+        json.dump(settings,f,indent=2)
+    shutil.copy2(os.path.join(input_dir,xlsx_filename),job_dir)
+    for shared_file in shared_files:
+        shutil.copy2(shared_file,job_dir)
+
+    record={"job":job_name,"input":xlsx_filename,"work_dir":job_dir,"status":"failed","returncode":None,"attempts":0}
+    start=time.time()
+    for attempt in range(1,retries+2):
+        record["attempts"]=attempt
+        with open(os.path.join(job_dir,"stdout.txt"),"w") as stdout,open(os.path.join(job_dir,"stderr.txt"),"w") as stderr:
+            try:
+                completed=subprocess.run(command,cwd=job_dir,stdout=stdout,stderr=stderr,timeout=timeout)
+            except subprocess.TimeoutExpired:
+                record["status"]="timeout"
+                record["returncode"]=None
+                continue
+            except OSError as e:
+                #executable missing or not runnable, retrying does not help
+                record["status"]="error"
+                record["error"]=str(e)
+                break
+        record["returncode"]=completed.returncode
+        if completed.returncode==0:
+            record["status"]="ok"
+            break
+        record["status"]="failed"
+
+    record["duration_s"]=round(time.time()-start,3)
+    return record
+
+def runExcel2MultJobs(payloads,command=None,work_root="excel2mult_jobs",input_dir=".",shared_files=(),
+    max_workers=None,timeout=600,retries=1,manifest_path=None):
+    """Runs excel2mult once per payload in parallel
+
+    payloads: output of buildSettingsPayloads
+    command: command running the design tool in the job directory, DEFAULT_COMMAND if None
+    work_root: directory where one working directory per job is created
+    input_dir: directory containing the per shell .xlsx files, copied into each job directory
+    shared_files: other files needed by the design tool in its working directory, e.g. templates
+    max_workers: maximum number of simultaneous jobs, number of cpus if None
+    timeout: seconds before a job is stopped
+    retries: number of reruns of a job after a failure or timeout
+    manifest_path: json file with one record per job, work_root/manifest.json if None
+
+    Returns list of job records in the order of payloads
+    Raises FileNotFoundError before any job is started if input files of payloads are missing in input_dir
+    """
+    if command is None:
+        command=DEFAULT_COMMAND
+    if max_workers is None:
+        max_workers=os.cpu_count() or 1
+    if manifest_path is None:
+        manifest_path=os.path.join(work_root,"manifest.json")
+    missing=[xlsx_filename for _,xlsx_filename,_ in payloads if not os.path.isfile(os.path.join(input_dir,xlsx_filename))]
+    if missing:
+        raise FileNotFoundError(f"{len(missing)} input files not found in {os.path.abspath(input_dir)}: {missing[:10]}")
+    os.makedirs(work_root,exist_ok=True)
+
+    #threads only wait for the subprocesses, so max_workers bounds the number of design tool processes
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures=[executor.submit(_runJob,job_name,xlsx_filename,settings,command,os.path.abspath(work_root),
+            input_dir,shared_files,timeout,retries) for job_name,xlsx_filename,settings in payloads]
+        records=[future.result() for future in futures]
+
+    with open(manifest_path,"w") as f:
+        json.dump(records,f,indent=2)
+
+    n_ok=sum(record["status"]=="ok" for record in records)
+    print(f"excel2mult finished {n_ok} of {len(records)} jobs, see {manifest_path}")
+
+    return records
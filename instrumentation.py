@@ -0,0 +1,234 @@
+"""Per-stage timing of the post-processing pipeline
+
+The loader, merge, strain, crack width and writer functions wrap their work in stage(...). Without an
+active trace stage returns a shared no-op context, so the hooks cost a function call and nothing else.
+Inside tracing(...) every stage records:
+
+    name, load_case      stage and, for stages run per load case, the load case
+    load_case_rows       rows per load case of stages processing all load cases at once, e.g. crack_widths
+    parent, depth        enclosing stage, stages are nested e.g. parse_workbook > parse_sheet
+    start_s, wall_s      start relative to the trace and wall time [s]
+    rows, rows_per_s     rows processed, when the stage knows them
+    rss_growth_mb        increase of the peak resident memory of the process during the stage [MB], 0 if the
+                         stage stayed below the peak of earlier stages, so it is not the memory the stage used
+    rss_high_water_mb    peak resident memory of the process so far, at the end of the stage [MB]
+    peak_traced_mb       peak memory allocated by python during the stage [MB], only with trace_memory,
+                         the per stage peak
+
+usage:
+    with tracing("trace.json",profile=True) as trace:
+        df_sigma=getTopBottomShellStressesDataFrame("FD_STRESSES.xlsx")
+        ...
+    print(trace.summary())
+
+summary(by_load_case=True) splits the wall time of stages with load_case_rows over the load cases in
+proportion to their rows, an estimate for the vectorised stages whose cost is linear in the rows.
+
+Stages run in worker processes, e.g. crack_width_batch with several workers, are not recorded.
+"""
+import os
+import sys
+import json
+import time
+import contextlib
+
+TRACE_COLUMNS = ['name','load_case','load_case_rows','parent','depth','start_s','wall_s','rows','rows_per_s',
+    'rss_growth_mb','rss_high_water_mb','peak_traced_mb']
+
+#trace recording the stages, None when tracing is off
+_active_trace = None
+
+def maxRssMb():
+    #Peak resident memory of this process so far [MB], None where resource is not available (windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #kilobytes on linux, bytes on macos
+    return max_rss/1024**2 if sys.platform=="darwin" else max_rss/1024
+
+class _NullStage:
+    #Stage used when tracing is off, rows and load cases set on it are ignored
+    rows=None
+    load_cases=None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class Stage:
+    """One timed stage of a Trace, set rows or load_cases inside the with block if they are only known there"""
+    def __init__(self,trace,name,rows=None,load_case=None,load_cases=None):
+        self.trace=trace
+        self.name=name
+        self.rows=rows
+        self.load_case=load_case
+        self.load_cases=load_cases
+        self.parent=None
+        self._peak_traced=0
+
+    def __enter__(self):
+        trace=self.trace
+        self.parent=trace._stack[-1] if trace._stack else None
+        if trace.trace_memory:
+            import tracemalloc
+            #the peak of the enclosing stage so far is kept before the peak is reset for this stage
+            if self.parent is not None:
+                self.parent._peak_traced=max(self.parent._peak_traced,tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        trace._stack.append(self)
+        self._start_rss=maxRssMb()
+        self._start=time.perf_counter()
+        return self
+
+    def __exit__(self,*exc_info):
+        wall=time.perf_counter()-self._start
+        trace=self.trace
+        trace._stack.pop()
+
+        peak_traced_mb=None
+        if trace.trace_memory:
+            import tracemalloc
+            self._peak_traced=max(self._peak_traced,tracemalloc.get_traced_memory()[1])
+            if self.parent is not None:
+                self.parent._peak_traced=max(self.parent._peak_traced,self._peak_traced)
+            peak_traced_mb=self._peak_traced/1024**2
+
+        rows=None if self.rows is None else int(self.rows)
+        rss=maxRssMb()
+        load_case_rows=None
+        if self.load_cases is not None:
+            #counted after the stage is timed
+            import pandas as pd
+            counts=pd.Series(self.load_cases).astype(str).value_counts(sort=False)
+            load_case_rows={load_case:int(count) for load_case,count in counts.items()}
+        trace.records.append({"name":self.name,"load_case":None if self.load_case is None else str(self.load_case),
+            "load_case_rows":load_case_rows,"parent":None if self.parent is None else self.parent.name,
+            "depth":len(trace._stack),"start_s":self._start-trace.start,"wall_s":wall,"rows":rows,
+            "rows_per_s":rows/wall if rows is not None and wall>0 else None,
+            "rss_growth_mb":None if rss is None else rss-self._start_rss,"rss_high_water_mb":rss,
+            "peak_traced_mb":peak_traced_mb})
+        return False
+
+class Trace:
+    """Stages recorded while the trace is active, see tracing
+
+    profile: run cProfile over the traced code, stats in self.profiler
+    trace_memory: record the peak python allocations of every stage with tracemalloc, slows down pure python code
+    """
+    def __init__(self,profile=False,trace_memory=False):
+        self.profile=profile
+        self.trace_memory=trace_memory
+        self.records=[]
+        self.profiler=None
+        self._stack=[]
+        self.start=time.perf_counter()
+
+    def stage(self,name,rows=None,load_case=None,load_cases=None):
+        return Stage(self,name,rows=rows,load_case=load_case,load_cases=load_cases)
+
+    def toDataFrame(self):
+        #One row per stage in the order the stages ended
+        import pandas as pd
+        return pd.DataFrame(self.records,columns=TRACE_COLUMNS)
+
+    def summary(self,by_load_case=False):
+        """Calls, total wall time, rows and rows per second per stage name, and per load case if by_load_case
+
+        With by_load_case, stages with load_case_rows are split into one row per load case, with the
+        rows of the load case and the wall time in proportion to them
+        """
+        import pandas as pd
+        df=self.toDataFrame()
+        if by_load_case:
+            df=pd.DataFrame([split for record in df.to_dict(orient="records") for split in _splitByLoadCase(record)],columns=df.columns)
+        by=["name","load_case"] if by_load_case else ["name"]
+        df_summary=df.groupby(by,sort=False,dropna=False).agg(calls=("name","size"),wall_s=("wall_s","sum"),
+            rows=("rows","sum"),rss_growth_mb=("rss_growth_mb","sum"),rss_high_water_mb=("rss_high_water_mb","max"),
+            peak_traced_mb=("peak_traced_mb","max"))
+        df_summary["rows_per_s"]=df_summary["rows"]/df_summary["wall_s"]
+        return df_summary.reset_index()
+
+    def write(self,path):
+        """Writes the stages as json, or csv if path ends with .csv
+
+        With profile the cProfile stats are written next to it as <path without extension>.prof,
+        readable with pstats or snakeviz.
+        """
+        if str(path).lower().endswith(".csv"):
+            self.toDataFrame().to_csv(path,index=False)
+        else:
+            with open(path,"w") as f:
+                json.dump({"stages":self.records,"summary":self.summary().to_dict(orient="records")},f,indent=2,default=str)
+        if self.profiler is not None:
+            self.profiler.dump_stats(os.path.splitext(str(path))[0]+".prof")
+        return path
+
+def _splitByLoadCase(record):
+    #record of a stage over several load cases as one record per load case, time split by rows
+    load_case_rows=record["load_case_rows"]
+    if not isinstance(load_case_rows,dict) or not load_case_rows:
+        return [record]
+    total=sum(load_case_rows.values())
+    return [dict(record,load_case=load_case,rows=rows,wall_s=record["wall_s"]*rows/total,
+        rss_growth_mb=None if record["rss_growth_mb"] is None else record["rss_growth_mb"]*rows/total)
+        for load_case,rows in load_case_rows.items()]
+
+def stage(name,rows=None,load_case=None,load_cases=None):
+    """Context manager timing a stage of the active trace, a no-op when tracing is off
+
+    name: name of the stage, e.g. "parse_workbook"
+    rows: rows processed, can also be set as attribute on the returned stage inside the with block
+    load_case: load case of stages run per load case
+    load_cases: load case of every row of stages processing several load cases at once, e.g. a
+        load_case column, counted at the end of the stage, can also be set inside the with block
+    """
+    if _active_trace is None:
+        return _NULL_STAGE
+    return _active_trace.stage(name,rows=rows,load_case=load_case,load_cases=load_cases)
+
+def activeTrace():
+    return _active_trace
+
+@contextlib.contextmanager
+def tracing(path=None,profile=False,trace_memory=False):
+    """Records the stages run inside the with block
+
+    path: json or csv file the trace is written to at the end, not written if None
+    profile: also run cProfile, stats written to <path without extension>.prof
+    trace_memory: record peak python allocations per stage with tracemalloc
+
+    Yields the Trace
+    """
+    global _active_trace
+    if _active_trace is not None:
+        raise RuntimeError("A trace is already active")
+
+    trace=Trace(profile=profile,trace_memory=trace_memory)
+    started_tracemalloc=False
+    if trace_memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracemalloc=True
+    if profile:
+        import cProfile
+        trace.profiler=cProfile.Profile()
+        trace.profiler.enable()
+
+    _active_trace=trace
+    try:
+        yield trace
+    finally:
+        _active_trace=None
+        if trace.profiler is not None:
+            trace.profiler.disable()
+        if started_tracemalloc:
+            tracemalloc.stop()
+        if path is not None:
+            trace.write(path)
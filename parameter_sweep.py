@@ -0,0 +1,110 @@
+"""Crack widths for a grid of reinforcement and material parameters in one vectorised evaluation
+
+The stresses are read once, and every combination of rebar diameter, spacing, cover, k_kappa_T, Ec
+and poissons ratio is evaluated by broadcasting stresses of shape (n,1) against parameters of shape
+(1,m). Rows are processed in blocks so that no intermediate array is larger than max_cells.
+
+Strains and crack widths are computed in both reinforcement directions, see
+stress_approach.strainsAtRebars, and the crack width of a face is the largest of the two directions.
+The x reinforcement is the outer layer with d = t - cover - phi/2, and the y reinforcement the inner
+layer inner_offset diameters further in, so cover is the cover to the outer reinforcement layer.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .crack_width import FACES,DIRECTIONS,crackWidthArrays
+    from .stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+else:
+    from crack_width import FACES,DIRECTIONS,crackWidthArrays
+    from stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+
+GRID_PARAMETERS = ("phi","cc","cover","k_kappa_T","Ec","v")
+INDEX_COLUMNS = ['Shell','Elem','Node','load_case']
+
+def parameterGrid(phi=(16,),cc=(200,),cover=(45,),k_kappa_T=(2,),Ec=(30000,),v=(0.15,)):
+    #All combinations of the given parameter values, one row per parameter set
+    values=[np.atleast_1d(value) for value in (phi,cc,cover,k_kappa_T,Ec,v)]
+    return pd.DataFrame(list(itertools.product(*values)),columns=list(GRID_PARAMETERS))
+
+def sweepFaceCrackWidths(df_sigma,grid,t,max_cells=2*10**7,inner_offset=1,**crack_width_parameters):
+    """Crack widths at both faces for every row of df_sigma and every parameter set in grid
+
+    df_sigma: dataframe from getTopBottomShellStressesDataFrame
+    grid: dataframe with columns GRID_PARAMETERS, e.g. from parameterGrid
+    t: thickness [mm], scalar or one value per row of df_sigma
+    max_cells: maximum number of rows times parameter sets evaluated at once
+    inner_offset: distance from the outer to the inner layer in rebar diameters, 1 for layers in contact
+        as in crack_width_batch.rebarDepths, 1.25 as in shell_calculations.initReinforcementParameters
+    crack_width_parameters: k1, k3, k4, kt, fct_eff, Es, Ecm passed to crack_width.crackWidthArrays
+
+    Returns dictionary with (n,m) numpy arrays of wk [mm] for each face, wk_top and wk_bottom, largest of both directions
+    """
+    parameters={name:grid[name].to_numpy(dtype=float)[None,:] for name in GRID_PARAMETERS}
+    d=np.asarray(t,dtype=float).reshape(-1,1)-parameters["cover"]-parameters["phi"]/2
+    t=np.broadcast_to(np.asarray(t,dtype=float).reshape(-1,1),(len(df_sigma),1))
+    d=np.broadcast_to(d,(len(df_sigma),len(grid)))
+
+    d_layers={"x":d,"y":d-inner_offset*parameters["phi"]}
+
+    stresses=[df_sigma[column].to_numpy(dtype=float)[:,None] for column in SIGMA_COLUMNS]
+
+    wk={f"wk_{face}":np.empty((len(df_sigma),len(grid))) for face in FACES}
+    block_rows=max(1,max_cells//max(1,len(grid)))
+    for start in range(0,len(df_sigma),block_rows):
+        rows=slice(start,start+block_rows)
+        d_rows=tuple(d_layers[direction][rows] for direction in DIRECTIONS)
+        epsilon=strainsAtRebarsArrays(*(values[rows] for values in stresses),t[rows],parameters["Ec"],d_rows,
+            v=parameters["v"],k_kappa_T=parameters["k_kappa_T"])
+        for direction,d_direction in zip(DIRECTIONS,d_rows):
+            result=crackWidthArrays(epsilon[f"epsilon_{direction}_top"],epsilon[f"epsilon_{direction}_bottom"],t[rows],
+                parameters["phi"],parameters["cc"],d_direction,**crack_width_parameters)
+            for face in FACES:
+                wk_face=wk[f"wk_{face}"][rows]
+                wk_face[...]=result[f"wk_{face}"] if direction==DIRECTIONS[0] else np.fmax(wk_face,result[f"wk_{face}"])
+
+    return wk
+
+def sweepCrackWidthArray(df_sigma,grid,t,face="max",max_cells=2*10**7,**crack_width_parameters):
+    """Crack widths for every row of df_sigma and every parameter set in grid, see sweepFaceCrackWidths
+
+    face: "top", "bottom" or "max" of both faces
+
+    Returns (n,m) numpy array of wk [mm]
+    """
+    if face not in ("top","bottom","max"):
+        raise ValueError(f"face must be top, bottom or max, not {face}")
+
+    wk=sweepFaceCrackWidths(df_sigma,grid,t,max_cells=max_cells,**crack_width_parameters)
+    if face=="max":
+        return np.maximum(wk["wk_top"],wk["wk_bottom"])
+    return wk[f"wk_{face}"]
+
+def sweepCrackWidths(df_sigma,grid,t,face="max",as_xarray=None,max_cells=2*10**7,**crack_width_parameters):
+    """Labelled crack widths per row of df_sigma and parameter set, see sweepCrackWidthArray
+
+    as_xarray: return xarray.DataArray with dims (row, parameter_set) and the parameters and
+    Shell/Elem/Node/load_case as coordinates. If False, or None and xarray is not installed, a
+    dataframe with the rows as index and the parameter sets as column MultiIndex is returned.
+    """
+    wk=sweepCrackWidthArray(df_sigma,grid,t,face=face,max_cells=max_cells,**crack_width_parameters)
+    index_columns=[column for column in INDEX_COLUMNS if column in df_sigma.columns]
+
+    if as_xarray is None:
+        try:
+            import xarray
+            as_xarray=True
+        except ImportError:
+            as_xarray=False
+
+    if as_xarray:
+        import xarray
+
+        coords={column:("row",df_sigma[column].to_numpy()) for column in index_columns}
+        coords.update({name:("parameter_set",grid[name].to_numpy()) for name in GRID_PARAMETERS})
+        return xarray.DataArray(wk,dims=("row","parameter_set"),coords=coords,name=f"wk_{face}")
+
+    return pd.DataFrame(wk,index=pd.MultiIndex.from_frame(df_sigma[index_columns]),
+        columns=pd.MultiIndex.from_frame(grid[list(GRID_PARAMETERS)]))
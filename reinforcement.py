@@ -0,0 +1,173 @@
+"""Candidate rebar layouts and lookup of the layout closest to a reinforcement area
+
+The reinforcement area of every candidate diameter/spacing pair is computed once into a table,
+and all cells are then resolved with one searchsorted on the sorted table instead of looping over
+the candidates for every cell. The same table is used to find the smallest layout meeting a crack
+width limit, evaluating all candidates for all elements at once.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_DIAMETERS = [12,16,20,25,32]
+DEFAULT_SPACINGS = [100,150,200,250]
+
+def getAreaScale(area_unit):
+    #Scale from mm2/m to area_unit
+    if area_unit==r'cm2/m':
+        scale_area=0.01
+    elif area_unit==r'mm2/m':
+        scale_area=1
+    else:
+        scale_area = area_unit
+        print(f"Scaling area mm2/m by a factor of {scale_area}")
+    return scale_area
+
+def rebarAreaTable(test_diameters_list=None,test_cc_list=None,scale_area=1):
+    """Reinforcement area of every diameter/spacing pair
+
+    test_diameters_list: candidate diameters [mm], DEFAULT_DIAMETERS if None
+    test_cc_list: candidate spacings [mm], DEFAULT_SPACINGS if None
+    scale_area: scale from mm2/m, 0.01 gives cm2/m
+
+    Returns dataframe with columns phi, cc and As, ordered by diameter first and then spacing
+    """
+    D=DEFAULT_DIAMETERS if test_diameters_list is None else list(test_diameters_list)
+    S=DEFAULT_SPACINGS if test_cc_list is None else list(test_cc_list)
+
+    phi=np.repeat(np.asarray(D),len(S))
+    cc=np.tile(np.asarray(S),len(D))
+    As=np.pi*phi.astype(float)**2/4*1000/cc*scale_area
+
+    return pd.DataFrame({"phi":phi,"cc":cc,"As":As})
+
+def nearestRebarIndex(As,As_table):
+    """Index in As_table of the candidate closest to each value in As
+
+    Ties are resolved to the candidate first in As_table, and missing values get the first candidate,
+    the same as looping over the candidates and keeping the first strictly better match.
+    """
+    As=np.asarray(As,dtype=float)
+    As_table=np.asarray(As_table,dtype=float)
+
+    order=np.argsort(As_table,kind="stable")
+    As_sorted=As_table[order]
+    #first position of each run of equal areas, which has the lowest index in As_table of the run
+    run_start=np.maximum.accumulate(np.where(np.r_[True,As_sorted[1:]!=As_sorted[:-1]],np.arange(len(As_sorted)),0))
+
+    position=np.searchsorted(As_sorted,As,side="left")
+    right=np.minimum(position,len(As_sorted)-1)
+    left=run_start[np.maximum(position-1,0)]
+
+    error_left=np.abs(As-As_sorted[left])
+    error_right=np.abs(As_sorted[right]-As)
+    index_left=order[left]
+    index_right=order[right]
+
+    index=np.where(error_left<error_right,index_left,index_right)
+    index=np.where(error_left==error_right,np.minimum(index_left,index_right),index)
+    #values that can not be compared get the first candidate
+    index=np.where(np.isnan(As),0,index)
+
+    return index
+
+def proposeRebars(As,area_unit=r'cm2/m',test_diameters_list=None,test_cc_list=None):
+    """Rebar diameter and spacing with reinforcement area closest to As
+
+    As: applied reinforcement area in area_unit, scalar or array of any shape
+    area_unit: 'cm2/m', 'mm2/m' or a scale factor from mm2/m
+
+    Returns (diameters, spacings) with the same shape as As
+    """
+    table=rebarAreaTable(test_diameters_list,test_cc_list,scale_area=getAreaScale(area_unit))
+    index=nearestRebarIndex(As,table["As"].to_numpy())
+
+    return table["phi"].to_numpy()[index],table["cc"].to_numpy()[index]
+
+def _groupReduce(ufunc,values,codes):
+    #ufunc.reduceat over the rows of each group, groups given by integer codes
+    order=np.argsort(codes,kind="stable")
+    starts=np.flatnonzero(np.r_[True,np.diff(codes[order])!=0])
+    #every group has rows since codes come from factorize, so there is one start per group
+    return ufunc.reduceat(values[order],starts,axis=0)
+
+LAYOUT_COLUMNS = ['t','c','phi_xu','cc_xu','phi_yu','cc_yu','phi_xo','cc_xo','phi_yo','cc_yo']
+CHECK_COLUMNS = ['As_top','As_bottom','wk_top','wk_bottom','ok_top','ok_bottom']
+
+def minimumReinforcementLayout(df_sigma,t,wk_limit,cover,test_diameters_list=None,test_cc_list=None,
+    group_column="Elem",Ec=30000,v=0.15,k_kappa_T=2,max_cells=2*10**7,return_checks=False,**crack_width_parameters):
+    """Smallest reinforcement area per element or shell keeping wk below wk_limit at each face
+
+    The crack width of every candidate diameter/spacing pair is evaluated for all rows at once, see
+    parameter_sweep.sweepFaceCrackWidths, and the candidate with the smallest area among those meeting
+    the limit in every row of the group is selected. The top and bottom faces are selected separately,
+    each evaluated with the candidate at both faces. The layers are placed as in
+    shell_calculations.initReinforcementParameters, x outer with cover c and y inner with cover c+1.25*phi.
+
+    df_sigma: dataframe from stress_approach.getTopBottomShellStressesDataFrame
+    t: thickness [mm], scalar or one value per row of df_sigma
+    wk_limit: crack width limit [mm], e.g. 0.2 or 0.3
+    cover: cover to outer reinforcement layer [mm], d = t-cover-phi/2
+    test_diameters_list, test_cc_list: candidates as for rebarAreaTable
+    group_column: column the layout is selected for, e.g. "Elem" or "Shell", every row if None
+    return_checks: also return the dataframe of checks described below
+    crack_width_parameters: k1, k3, k4, kt, fct_eff, Es, Ecm passed to crack_width.crackWidthArrays
+
+    Returns dataframe indexed by group_column, or by Shell/Elem/Node/load_case if group_column is None,
+    with columns LAYOUT_COLUMNS, so each row can be passed on as initReinforcementParameters(**row).
+    With return_checks, (layout, checks) where checks has the same index and columns CHECK_COLUMNS: the
+    resulting As_top, As_bottom [mm2/m], wk_top, wk_bottom [mm], and ok_top, ok_bottom which are False
+    where not even the largest candidate meets the limit, in which case the largest candidate is given.
+    """
+    if __package__:
+        from .parameter_sweep import sweepFaceCrackWidths
+    else:
+        from parameter_sweep import sweepFaceCrackWidths
+
+    #candidates sorted by area, so the first candidate meeting the limit is the smallest
+    table=rebarAreaTable(test_diameters_list,test_cc_list)
+    table=table.iloc[np.argsort(table["As"].to_numpy(),kind="stable")].reset_index(drop=True)
+    grid=pd.DataFrame({"phi":table["phi"],"cc":table["cc"],"cover":cover,"k_kappa_T":k_kappa_T,"Ec":Ec,"v":v})
+
+    wk=sweepFaceCrackWidths(df_sigma,grid,t,max_cells=max_cells,inner_offset=1.25,**crack_width_parameters)
+
+    if group_column is None:
+        codes=np.arange(len(df_sigma))
+        index=pd.MultiIndex.from_frame(df_sigma[[column for column in ('Shell','Elem','Node','load_case') if column in df_sigma.columns]])
+    else:
+        codes,groups=pd.factorize(df_sigma[group_column],sort=True)
+        index=pd.Index(groups,name=group_column)
+
+    t_rows=np.broadcast_to(np.asarray(t,dtype=float),(len(df_sigma),))
+    df_layout=pd.DataFrame(index=index)
+    df_layout["t"]=_groupReduce(np.maximum,t_rows,codes)
+    df_layout["c"]=cover
+    df_checks=pd.DataFrame(index=index)
+
+    for face,suffix in (("bottom","u"),("top","o")):
+        wk_face=wk[f"wk_{face}"]
+        #missing stresses do not govern the layout
+        feasible=_groupReduce(np.logical_and,(wk_face<=wk_limit)|np.isnan(wk_face),codes)
+        ok=feasible.any(axis=1)
+        candidate=np.where(ok,feasible.argmax(axis=1),len(table)-1)
+
+        wk_selected=wk_face[np.arange(len(df_sigma)),candidate[codes]]
+        wk_selected=np.where(np.isnan(wk_selected),-np.inf,wk_selected)
+
+        for direction in ("x","y"):
+            df_layout[f"phi_{direction}{suffix}"]=table["phi"].to_numpy()[candidate]
+            df_layout[f"cc_{direction}{suffix}"]=table["cc"].to_numpy()[candidate]
+        df_checks[f"As_{face}"]=table["As"].to_numpy()[candidate]
+        df_checks[f"wk_{face}"]=_groupReduce(np.maximum,wk_selected,codes)
+        df_checks[f"ok_{face}"]=ok
+
+    df_layout=df_layout[LAYOUT_COLUMNS]
+    df_checks=df_checks[CHECK_COLUMNS]
+    df_checks[["wk_top","wk_bottom"]]=df_checks[["wk_top","wk_bottom"]].replace(-np.inf,np.nan)
+
+    n_failed=int((~(df_checks["ok_top"]&df_checks["ok_bottom"])).sum())
+    if n_failed:
+        print(f"{n_failed} of {len(df_layout)} groups exceed wk_limit={wk_limit} with the largest candidate")
+
+    if return_checks:
+        return df_layout,df_checks
+    return df_layout
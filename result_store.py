@@ -0,0 +1,257 @@
+"""On-disk result store of node x load case arrays, chunked by load case and read memory-mapped
+
+For models where the stress, strain and crack width arrays of all load cases do not fit in memory,
+the pipeline writes every result column as one .npy file per load case in a store directory:
+
+    store_dir/store.json            load cases, columns and dtype
+    store_dir/keys/<key>.npy        Shell codes, Elem and Node of every node, in the same order for all load cases
+    store_dir/<column>/<i>.npy      values of load case i for every node
+
+Files are opened with numpy memory mapping, so a query only reads the load cases and columns it
+needs, e.g. the envelope of one column over all load cases holds one load case in memory at a time.
+"""
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+else:
+    from crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+
+STORE_FILE = "store.json"
+KEY_COLUMNS = ['Shell','Elem','Node']
+
+class ResultStore:
+    """Result store in store_dir, see module docstring
+
+    Use ResultStore.create to make a new store and ResultStore(store_dir) to open an existing one.
+    """
+    def __init__(self,store_dir):
+        self.store_dir=store_dir
+        with open(os.path.join(store_dir,STORE_FILE),"r") as f:
+            self.metadata=json.load(f)
+        self._keys=None
+
+    @classmethod
+    def create(cls,store_dir,df_keys,columns,dtype="float64"):
+        """New empty store for the nodes in df_keys
+
+        df_keys: dataframe with Shell, Elem and Node, one row per node
+        columns: names of the result columns stored for every load case
+        dtype: dtype of stored results, e.g. "float32" to halve the size
+        """
+        os.makedirs(os.path.join(store_dir,"keys"),exist_ok=True)
+        shell_codes,shells=pd.factorize(df_keys["Shell"])
+        np.save(os.path.join(store_dir,"keys","Shell.npy"),shell_codes.astype(np.int32))
+        for column in ("Elem","Node"):
+            np.save(os.path.join(store_dir,"keys",f"{column}.npy"),df_keys[column].to_numpy(dtype=np.int64))
+        for column in columns:
+            os.makedirs(os.path.join(store_dir,column),exist_ok=True)
+
+        metadata={"shells":[str(shell) for shell in shells],"n_nodes":len(df_keys),"columns":list(columns),
+            "dtype":str(np.dtype(dtype)),"load_cases":[]}
+        _writeMetadata(store_dir,metadata)
+
+        return cls(store_dir)
+
+    @property
+    def load_cases(self):
+        return list(self.metadata["load_cases"])
+
+    @property
+    def columns(self):
+        return list(self.metadata["columns"])
+
+    def keys(self):
+        #Dataframe with Shell, Elem and Node of every node
+        if self._keys is None:
+            keys_dir=os.path.join(self.store_dir,"keys")
+            shells=np.asarray(self.metadata["shells"],dtype=object)
+            self._keys=pd.DataFrame({"Shell":shells[np.load(os.path.join(keys_dir,"Shell.npy"))],
+                "Elem":np.load(os.path.join(keys_dir,"Elem.npy")),"Node":np.load(os.path.join(keys_dir,"Node.npy"))})
+        return self._keys
+
+    def appendLoadCase(self,load_case,values):
+        """Writes the results of one load case
+
+        values: dictionary with an array of n_nodes values for every column of the store
+        """
+        index=len(self.metadata["load_cases"])
+        for column in self.metadata["columns"]:
+            array=np.asarray(values[column],dtype=self.metadata["dtype"])
+            if array.shape!=(self.metadata["n_nodes"],):
+                raise ValueError(f"Expected {self.metadata['n_nodes']} values of {column} for {load_case}, got {array.shape}")
+            np.save(self._path(column,index),array)
+        self.metadata["load_cases"].append(str(load_case))
+        _writeMetadata(self.store_dir,self.metadata)
+
+    def _path(self,column,index):
+        return os.path.join(self.store_dir,column,f"{index:05d}.npy")
+
+    def _index(self,load_case):
+        try:
+            return self.metadata["load_cases"].index(str(load_case))
+        except ValueError:
+            raise KeyError(f"Load case {load_case} is not in the store") from None
+
+    def loadCaseArray(self,column,load_case):
+        #Memory-mapped (n_nodes,) array of column for one load case, read from disk only when used
+        if column not in self.metadata["columns"]:
+            raise KeyError(f"Column {column} is not in the store")
+        return np.load(self._path(column,self._index(load_case)),mmap_mode="r")
+
+    def iterLoadCases(self,column,load_cases=None):
+        #(load case, memory-mapped array) for the given load cases, all if None
+        for load_case in (self.load_cases if load_cases is None else load_cases):
+            yield load_case,self.loadCaseArray(column,load_case)
+
+    def array(self,column,load_cases=None):
+        #(n_nodes, n_load_cases) array of column for the given load cases, all if None
+        arrays=[values for _,values in self.iterLoadCases(column,load_cases)]
+        return np.stack(arrays,axis=1) if arrays else np.empty((self.metadata["n_nodes"],0))
+
+    def envelope(self,column,load_cases=None):
+        """Maximum of column over load cases per node and the governing load case
+
+        Reads one load case at a time. Returns dataframe with the node keys, <column> and <column>_case
+        """
+        maximum=np.full(self.metadata["n_nodes"],np.nan)
+        governing=np.full(self.metadata["n_nodes"],-1)
+        names=[]
+        for i,(load_case,values) in enumerate(self.iterLoadCases(column,load_cases)):
+            names.append(load_case)
+            larger=(values>maximum)|(np.isnan(maximum)&~np.isnan(values))
+            maximum=np.where(larger,values,maximum)
+            governing=np.where(larger,i,governing)
+
+        df_envelope=self.keys().copy()
+        df_envelope[column]=maximum
+        df_envelope[f"{column}_case"]=np.where(governing>=0,np.asarray(names+[None],dtype=object)[governing],None)
+        return df_envelope
+
+    def shellMaxima(self,column,load_cases=None):
+        #Maximum of column per shell over the given load cases, one load case read at a time
+        shell_codes=np.load(os.path.join(self.store_dir,"keys","Shell.npy"))
+        maximum=np.full(len(self.metadata["shells"]),np.nan)
+        for _,values in self.iterLoadCases(column,load_cases):
+            load_case_maximum=pd.Series(np.asarray(values,dtype=float)).groupby(shell_codes).max()
+            maximum[load_case_maximum.index]=np.fmax(maximum[load_case_maximum.index],load_case_maximum.to_numpy())
+        return pd.DataFrame({"Shell":self.metadata["shells"],column:maximum})
+
+    def toDataFrame(self,columns=None,load_cases=None):
+        #Long table with one row per node and load case, as from getTopBottomShellStressesDataFrame
+        columns=self.columns if columns is None else columns
+        load_cases=self.load_cases if load_cases is None else load_cases
+        frames=[]
+        for load_case in load_cases:
+            df=self.keys().copy()
+            df["load_case"]=load_case
+            for column in columns:
+                df[column]=np.asarray(self.loadCaseArray(column,load_case))
+            frames.append(df)
+        return pd.concat(frames,ignore_index=True) if frames else pd.DataFrame(columns=KEY_COLUMNS+["load_case"]+list(columns))
+
+def _writeMetadata(store_dir,metadata):
+    #written to a temporary file first, so an interrupted write leaves the previous metadata
+    path=os.path.join(store_dir,STORE_FILE)
+    tmp_path=path+".tmp"
+    with open(tmp_path,"w") as f:
+        json.dump(metadata,f,indent=2)
+    os.replace(tmp_path,path)
+
+def _crackWidthColumns(df_sigma,t,Ec,d_top,phi,cc,v,d_bottom,k_kappa_T,rebar_angle,crack_width_parameters):
+    #Strains and crack widths of a chunk of stresses as dictionary of arrays
+    if __package__:
+        from .stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+    else:
+        from stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+
+    values={column:df_sigma[column].to_numpy(dtype=float) for column in SIGMA_COLUMNS}
+    values.update(strainsAtRebarsArrays(*(values[column] for column in SIGMA_COLUMNS),t,Ec,d_top,
+        v=v,d_bottom=d_bottom,k_kappa_T=k_kappa_T,rebar_angle=rebar_angle))
+    phi,cc,d_top,d_bottom=directionValues(phi),directionValues(cc),directionValues(d_top),directionValues(d_bottom)
+    for direction in DIRECTIONS:
+        result=crackWidthArrays(values[f"epsilon_{direction}_top"],values[f"epsilon_{direction}_bottom"],t,
+            phi[direction],cc[direction],d_top[direction],d_bottom=d_bottom[direction],**crack_width_parameters)
+        for face in FACES:
+            values[f"wk_{direction}_{face}"]=np.broadcast_to(result[f"wk_{face}"],(len(df_sigma),))
+    for face in FACES:
+        values[f"wk_{face}"]=np.fmax(*(values[f"wk_{direction}_{face}"] for direction in DIRECTIONS))
+    return values
+
+def writeCrackWidthStore(export_path,store_dir,t,Ec,d_top,phi,cc,v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0,
+    dtype="float64",chunk_rows=50000,**crack_width_parameters):
+    """Stresses, strains and crack widths of an export of any size written to a ResultStore
+
+    The export is read in chunks with streaming.iterTopBottomStressChunks, and the results of each
+    load case are written as soon as the load case is complete, so memory is bounded by chunk_rows and
+    the number of nodes. The nodes and their order are taken from the first load case, nodes missing
+    in a later load case are stored as nan.
+
+    Raises ValueError if a later load case has nodes that are not in the first load case, or if the
+    rows of a load case are not consecutive in the export, i.e. the load case would be stored twice.
+
+    export_path: excel export or list file (.txt) from FEM-design
+    t, Ec, d_top, v, d_bottom, k_kappa_T, rebar_angle: see stress_approach.strainsAtRebars
+    phi, cc: rebar diameter and spacing [mm], one value or (x, y) tuple
+    dtype: dtype of stored results
+
+    Returns the ResultStore
+    """
+    if __package__:
+        from .streaming import iterTopBottomStressChunks
+    else:
+        from streaming import iterTopBottomStressChunks
+
+    store=None
+    node_index=None
+    pending=[]
+    current=None
+    stored=set()
+
+    def flush():
+        #writing the load case collected in pending
+        nonlocal store,node_index
+        if current in stored:
+            raise ValueError(f"Load case {current} occurs in separate runs of rows in {export_path}, "
+                "the rows of every load case must be consecutive")
+        df_load_case=pd.concat([df for df,_ in pending],ignore_index=True)
+        columns=list(pending[0][1])
+        if store is None:
+            df_keys=df_load_case[KEY_COLUMNS]
+            store=ResultStore.create(store_dir,df_keys,columns,dtype=dtype)
+            node_index=pd.MultiIndex.from_frame(df_keys[['Elem','Node']])
+        rows=node_index.get_indexer(pd.MultiIndex.from_frame(df_load_case[['Elem','Node']]))
+        unknown=rows<0
+        if unknown.any():
+            unknown_nodes=list(df_load_case.loc[unknown,['Elem','Node']].itertuples(index=False,name=None))
+            raise ValueError(f"Load case {current} has {len(unknown_nodes)} nodes (Elem, Node) that are not in "
+                f"load case {store.load_cases[0]}, e.g. {unknown_nodes[:5]}")
+        values={}
+        for column in columns:
+            array=np.full(len(node_index),np.nan)
+            array[rows]=np.concatenate([chunk_values[column] for _,chunk_values in pending])
+            values[column]=array
+        store.appendLoadCase(current,values)
+        stored.add(current)
+
+    for df_sigma in iterTopBottomStressChunks(export_path,chunk_rows=chunk_rows):
+        chunk_values=_crackWidthColumns(df_sigma,t,Ec,d_top,phi,cc,v,d_bottom,k_kappa_T,rebar_angle,crack_width_parameters)
+        load_cases=df_sigma["load_case"].to_numpy()
+        #start of every run of rows with the same load case
+        starts=np.flatnonzero(np.r_[True,load_cases[1:]!=load_cases[:-1]])
+        for start,end in zip(starts,np.r_[starts[1:],len(df_sigma)]):
+            if current is not None and load_cases[start]!=current:
+                flush()
+                pending=[]
+            current=load_cases[start]
+            pending.append((df_sigma.iloc[start:end][KEY_COLUMNS],{column:values[start:end] for column,values in chunk_values.items()}))
+
+    if not pending:
+        raise ValueError(f"No shell stresses found in {export_path}")
+    flush()
+
+    return store
@@ -0,0 +1,130 @@
+"""Compact in-memory result tables with categorical keys, optional float32 and lazy derived columns
+
+Tables from FEM-design exports repeat the same shell IDs and load case names on every row, and all
+results are float64. compactDataFrame stores text keys as categoricals (integer codes and one copy of
+each name), element and node numbers as the smallest integer type and, optionally, results as float32,
+which makes rows several times smaller and groupby/merge on the keys faster.
+
+ResultTable keeps such a frame and computes derived quantities, e.g. strains at the rebars and crack
+widths, only when a column is first accessed, instead of adding every intermediate column up front.
+"""
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .fd_text_export import STRING_COLUMNS,INTEGER_COLUMNS
+else:
+    from fd_text_export import STRING_COLUMNS,INTEGER_COLUMNS
+
+CATEGORICAL_COLUMNS = STRING_COLUMNS+("load_case",)
+
+def compactDataFrame(df,float32=False):
+    """Copy of df with categorical text keys, downcast integer columns and optionally float32 results
+
+    df: dataframe with columns as from the FEM-design readers, e.g. getTopBottomShellStressesDataFrame
+    float32: store float columns as float32, about 7 significant digits
+    """
+    columns={}
+    for column in df.columns:
+        values=df[column]
+        if column in CATEGORICAL_COLUMNS:
+            values=values.astype("category")
+        elif column in INTEGER_COLUMNS and pd.api.types.is_numeric_dtype(values) and values.notna().all():
+            values=pd.to_numeric(values,downcast="integer")
+        elif float32 and pd.api.types.is_float_dtype(values):
+            values=values.astype(np.float32)
+        columns[column]=values
+    return pd.DataFrame(columns,index=df.index)
+
+class ResultTable:
+    """Compact result table with derived columns computed on first access
+
+    df: result table, e.g. from getTopBottomShellStressesDataFrame, stored with compactDataFrame
+    float32: store float columns, including derived columns, as float32
+    """
+    def __init__(self,df,float32=False):
+        self.float32=float32
+        self.frame=compactDataFrame(df.reset_index(drop=True),float32=float32)
+        self._derived={}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self,column):
+        return column in self.frame.columns or column in self._derived
+
+    def __getitem__(self,column):
+        if column not in self.frame.columns:
+            if column not in self._derived:
+                raise KeyError(column)
+            self._compute(column)
+        return self.frame[column]
+
+    def _compute(self,column):
+        names,function=self._derived[column]
+        values=function(self)
+        for name in names:
+            array=np.asarray(values[name],dtype=np.float32 if self.float32 else float)
+            self.frame[name]=np.broadcast_to(array,(len(self.frame),)).copy()
+            self._derived.pop(name,None)
+
+    def derive(self,names,function):
+        """Registers columns computed together on first access of any of them
+
+        names: names of the derived columns
+        function: function(table) returning a dictionary with an array for every name, may access
+        other columns and derived columns of the table
+        """
+        for name in names:
+            self.frame.drop(columns=name,errors="ignore",inplace=True)
+            self._derived[name]=(tuple(names),function)
+        return self
+
+    def addRebarStrains(self,t,Ec,d_top,v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0):
+        #Lazy epsilon_<direction>_<face> columns, see stress_approach.strainsAtRebars
+        if __package__:
+            from .stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+            from .crack_width import FACES,DIRECTIONS
+        else:
+            from stress_approach import SIGMA_COLUMNS,strainsAtRebarsArrays
+            from crack_width import FACES,DIRECTIONS
+
+        def strains(table):
+            return strainsAtRebarsArrays(*(table[column].to_numpy(dtype=float) for column in SIGMA_COLUMNS),t,Ec,d_top,
+                v=v,d_bottom=d_bottom,k_kappa_T=k_kappa_T,rebar_angle=rebar_angle)
+
+        return self.derive([f"epsilon_{direction}_{face}" for direction in DIRECTIONS for face in FACES],strains)
+
+    def addCrackWidths(self,t,phi,cc,d_top,d_bottom=None,**crack_width_parameters):
+        #Lazy wk_<direction>_<face>, wk_top and wk_bottom columns from the rebar strains, see crack_width.crackWidthsInRebarDirections
+        if __package__:
+            from .crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+        else:
+            from crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+
+        def crackWidths(table):
+            phi_layers,cc_layers=directionValues(phi),directionValues(cc)
+            d_top_layers,d_bottom_layers=directionValues(d_top),directionValues(d_bottom)
+            wk={}
+            for direction in DIRECTIONS:
+                result=crackWidthArrays(table[f"epsilon_{direction}_top"].to_numpy(dtype=float),
+                    table[f"epsilon_{direction}_bottom"].to_numpy(dtype=float),t,phi_layers[direction],cc_layers[direction],
+                    d_top_layers[direction],d_bottom=d_bottom_layers[direction],**crack_width_parameters)
+                for face in FACES:
+                    wk[f"wk_{direction}_{face}"]=result[f"wk_{face}"]
+            for face in FACES:
+                wk[f"wk_{face}"]=np.fmax(*(wk[f"wk_{direction}_{face}"] for direction in DIRECTIONS))
+            return wk
+
+        names=[f"wk_{direction}_{face}" for direction in DIRECTIONS for face in FACES]+[f"wk_{face}" for face in FACES]
+        return self.derive(names,crackWidths)
+
+    def toDataFrame(self,columns=None):
+        #Dataframe of the stored columns, or of the given columns, computing derived columns as needed
+        if columns is None:
+            return self.frame.copy()
+        return pd.DataFrame({column:self[column] for column in columns})
+
+    def memoryUsage(self):
+        #Bytes used by the stored columns
+        return int(self.frame.memory_usage(index=True,deep=True).sum())
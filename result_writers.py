@@ -0,0 +1,132 @@
+"""Writing result tables split by shell ID
+
+Excel output uses openpyxl write-only workbooks, which stream rows to disk instead of building the
+whole workbook in memory, so memory stays constant no matter how many rows are written. Groups can be
+written as one workbook with a sheet per shell, or as one file per shell in parallel processes, in
+xlsx, csv or parquet format.
+"""
+import os
+import re
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+if __package__:
+    from .instrumentation import stage
+else:
+    from instrumentation import stage
+
+FILE_FORMATS = ("xlsx","csv","parquet")
+
+#characters excel does not allow in sheet names, and the maximum length of a sheet name
+INVALID_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+MAX_SHEET_NAME_LENGTH = 31
+#characters not allowed in file names on windows
+INVALID_FILE_CHARACTERS = re.compile(r'[<>:"/\\|?*]')
+
+def _excelValue(value):
+    #numpy scalars are converted to python types, missing values to empty cells
+    if hasattr(value,"item"):
+        value=value.item()
+    if isinstance(value,float) and math.isnan(value):
+        return None
+    return value
+
+def _appendDataFrame(worksheet,df):
+    worksheet.append([str(column) for column in df.columns])
+    for row in df.itertuples(index=False,name=None):
+        worksheet.append([_excelValue(value) for value in row])
+
+def getSheetName(name,used_names=()):
+    #Valid and unique excel sheet name from a shell ID
+    sheet_name=INVALID_SHEET_CHARACTERS.sub("_",str(name))[:MAX_SHEET_NAME_LENGTH] or "_"
+    suffix=1
+    while sheet_name in used_names:
+        suffix_string=f"~{suffix}"
+        sheet_name=sheet_name[:MAX_SHEET_NAME_LENGTH-len(suffix_string)]+suffix_string
+        suffix+=1
+    return sheet_name
+
+def writeDataFrameToXlsx(df,xlsx_path,sheet_name="Sheet1"):
+    #Same as df.to_excel(xlsx_path,sheet_name=sheet_name,index=False) with a streaming writer
+    import openpyxl
+
+    with stage("write_xlsx",rows=len(df)):
+        workbook=openpyxl.Workbook(write_only=True)
+        _appendDataFrame(workbook.create_sheet(title=getSheetName(sheet_name)),df)
+        workbook.save(xlsx_path)
+    return xlsx_path
+
+def _groups(df,group_column):
+    #(name, rows) of each group in sorted order, as by df.groupby(group_column)
+    for name,index in sorted(df.groupby(group_column,observed=True).indices.items(),key=lambda item: str(item[0])):
+        yield name,index
+
+def writeGroupedWorkbook(df,xlsx_path,group_column="ID",drop_group_column=True):
+    """One workbook with one sheet per group, e.g. per shell ID, written in a single streaming pass
+
+    df: dataframe containing group_column
+    drop_group_column: the group column is not written, since it is given by the sheet name
+    """
+    import openpyxl
+
+    columns=[column for column in df.columns if not (drop_group_column and column==group_column)]
+    df_output=df[columns]
+    with stage("write_grouped_workbook",rows=len(df)):
+        workbook=openpyxl.Workbook(write_only=True)
+        used_names=set()
+        for name,index in _groups(df,group_column):
+            sheet_name=getSheetName(name,used_names)
+            used_names.add(sheet_name)
+            _appendDataFrame(workbook.create_sheet(title=sheet_name),df_output.iloc[index])
+        workbook.save(xlsx_path)
+
+    return xlsx_path
+
+def writeDataFrame(df,output_path,file_format=None,sheet_name="Sheet1"):
+    #Writes a dataframe as xlsx, csv or parquet, format given by the file extension if None
+    if file_format is None:
+        file_format=os.path.splitext(str(output_path))[1].lstrip(".").lower()
+    if file_format=="xlsx":
+        writeDataFrameToXlsx(df,output_path,sheet_name=sheet_name)
+    elif file_format=="csv":
+        with stage("write_csv",rows=len(df)):
+            df.to_csv(output_path,index=False)
+    elif file_format=="parquet":
+        with stage("write_parquet",rows=len(df)):
+            df.to_parquet(output_path,index=False)
+    else:
+        raise ValueError(f"Unknown file format {file_format}, expected one of {FILE_FORMATS}")
+    return output_path
+
+def _writeGroupFile(args):
+    df_group,output_path,file_format,sheet_name=args
+    return writeDataFrame(df_group,output_path,file_format=file_format,sheet_name=sheet_name)
+
+def groupFileName(name,file_format):
+    #File name of a group in writeGroupedFiles, characters not allowed on windows replaced by _
+    return INVALID_FILE_CHARACTERS.sub("_",f"{name}.{file_format}")
+
+def writeGroupedFiles(df,output_dir=".",group_column="ID",file_format="xlsx",sheet_name="XLSX-Export",
+    drop_group_column=True,max_workers=None):
+    """One file per group, e.g. <shell ID>.xlsx, written by parallel processes
+
+    file_format: "xlsx", "csv" or "parquet"
+    sheet_name: sheet name in xlsx files
+    max_workers: number of processes, number of cpus if None, 1 writes serially
+
+    Returns list of paths written
+    """
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format {file_format}, expected one of {FILE_FORMATS}")
+    os.makedirs(output_dir,exist_ok=True)
+
+    columns=[column for column in df.columns if not (drop_group_column and column==group_column)]
+    df_output=df[columns]
+    jobs=((df_output.iloc[index],os.path.join(output_dir,groupFileName(name,file_format)),file_format,sheet_name)
+        for name,index in _groups(df,group_column))
+
+    with stage("write_grouped_files",rows=len(df)):
+        if max_workers==1:
+            return [_writeGroupFile(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_writeGroupFile,jobs))
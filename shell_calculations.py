@@ -82,8 +82,6 @@ def initReinforcementParameters(t,c,phi_xu,cc_xu,\
 
     return rebar_dict
 
-print(initReinforcementParameters(300,35,16,200))
-
 def getEPS_0_N(t,N=np.matrix([[0],[0],[0]]),materialModel=initConcreteCracking,t_unit="mm"):
     #t: thickness [mm]
     #N: column vector of [[Nx, Ny and Nxy]] [kN/m] or [N/mm]
@@ -165,6 +163,122 @@ def strainAtZ(eps_0_N,kappa,z,z_unit="mm"):
 
     return eps_z
 
+### Batch versions of getEPS_0_N, getKappa_M and strainAtZ ###
+#operating on (n,3) arrays with one row per element/node/load case instead of one (3,1) matrix at a time
+
+def _asRows(values,n):
+    #Broadcasting scalar or (n,) input such as thickness and z to a float array of shape (n,)
+    return np.broadcast_to(np.asarray(values,dtype=float),(n,))
+
+def getEPS_0_NBatch(t,N,materialModel=initConcreteCracking,t_unit="mm",material=None):
+    """Strains in middle plane of shells from axial forces, one row per element
+
+    t: thickness [mm], scalar or (n,) array
+    N: (n,3) array of [Nx, Ny, Nxy] [kN/m] or [N/mm]
+    material: (E,v) tuple, materialModel() is called once if None
+
+    returns (n,3) array of [eps_0_x, eps_0_y, gamma_0_xy]
+    """
+    N=np.asarray(N,dtype=float).reshape(-1,3)*1000 #scaling to N from kN
+    t=_asRows(t,len(N))
+
+    if t_unit=="mm":
+        t=t/1000
+
+    E,v = material if material is not None else materialModel()
+    #constiutive matrix for getting strains in middle plane of shell from axial forces, without 1/(E*t)
+    C_N=np.array([[1,-v,0],[-v,1,0],[0,0,2*(1+v)]])
+
+    eps_0_N=np.einsum("ij,nj->ni",C_N,N)/(E*t)[:,None]
+
+    return eps_0_N
+
+def getKappa_MBatch(t,M,materialModel=initConcreteCracking,t_unit="mm",material=None):
+    """Curvatures of shells from applied moments, one row per element
+
+    t: thickness [mm], scalar or (n,) array
+    M: (n,3) array of [Mx, My, Mxy] [kNm/m]
+    material: (E,v) tuple, materialModel() is called once if None
+
+    returns (n,3) array of [kappa_x, kappa_y, kappa_xy] [1/m]
+    """
+    M=np.asarray(M,dtype=float).reshape(-1,3)*1000 #scaling to Nm from kNm
+    t=_asRows(t,len(M))
+
+    if t_unit=="mm":
+        t=t/1000
+
+    E,v = material if material is not None else materialModel()
+    #constiutive matrix for getting curvature of shell from applied moments, without 12/(E*t**3)
+    C_M=np.array([[1,-v,0],[-v,1,0],[0,0,(1+v)]])
+
+    kappa=np.einsum("ij,nj->ni",C_M,M)*(12/(E*t**3))[:,None]
+
+    return kappa
+
+def strainAtZBatch(eps_0_N,kappa,z,z_unit="mm"):
+    """Strains at distance z from middle plane, one row per element
+
+    eps_0_N: (n,3) array from getEPS_0_NBatch
+    kappa: (n,3) array from getKappa_MBatch
+    z: [mm], scalar or (n,) array
+
+    returns (n,3) array of [eps_x, eps_y, gamma_xy], with doubled bending contribution where
+    eps_x or eps_y is in tension, as in strainAtZ
+    """
+    eps_0_N=np.asarray(eps_0_N,dtype=float).reshape(-1,3)
+    kappa=np.asarray(kappa,dtype=float).reshape(-1,3)
+    z=_asRows(z,len(eps_0_N))[:,None]
+
+    if z_unit == "mm":
+        z=z/1000
+
+    bending=kappa*z
+    eps_z=eps_0_N-bending
+    #when section cracks, the strains jump to bigger values
+    #offshore practice in norway, multiply bending contribution by factor of two
+    cracked=eps_z[:,:2]>0
+    eps_z[:,:2]=np.where(cracked,eps_0_N[:,:2]-bending[:,:2]*2,eps_z[:,:2])
+
+    return eps_z
+
+def strainAtZFromForcesBatch(t,N,M,z,materialModel=initConcreteCracking,t_unit="mm",z_unit="mm"):
+    #Strains at z directly from (n,3) arrays of axial forces and moments, material model called once
+    material=materialModel()
+    eps_0_N=getEPS_0_NBatch(t,N,t_unit=t_unit,material=material)
+    kappa=getKappa_MBatch(t,M,t_unit=t_unit,material=material)
+
+    return strainAtZBatch(eps_0_N,kappa,z,z_unit=z_unit)
+
+
+def principalToComponents(sigma_1,sigma_2,alpha):
+    """Stress components in the local x', y' system from principal stresses, vectorised
+
+    alpha: angle from x' to the direction of sigma_1 [rad], as in FEM-design stress output
+
+    returns (sigma_x, sigma_y, tau_xy)
+    """
+    sigma_1,sigma_2,alpha=np.asarray(sigma_1,dtype=float),np.asarray(sigma_2,dtype=float),np.asarray(alpha,dtype=float)
+    mean=(sigma_1+sigma_2)/2
+    radius=(sigma_1-sigma_2)/2
+    return mean+radius*np.cos(2*alpha),mean-radius*np.cos(2*alpha),radius*np.sin(2*alpha)
+
+def rebarDirectionStresses(sigma_1,sigma_2,alpha,rebar_angle=0):
+    """Stresses in the reinforcement directions from principal stresses, vectorised
+
+    rebar_angle: angle from x' to the x reinforcement [rad], y reinforcement perpendicular to it
+
+    returns (sigma_x, sigma_y, tau_xy) in the reinforcement directions
+    """
+    return principalToComponents(sigma_1,sigma_2,np.asarray(alpha,dtype=float)-rebar_angle)
+
+def componentsToPrincipal(sigma_x,sigma_y,tau_xy):
+    #Principal stresses and angle of sigma_1 from x' [rad], inverse of principalToComponents
+    sigma_x,sigma_y,tau_xy=np.asarray(sigma_x,dtype=float),np.asarray(sigma_y,dtype=float),np.asarray(tau_xy,dtype=float)
+    mean=(sigma_x+sigma_y)/2
+    radius=np.hypot((sigma_x-sigma_y)/2,tau_xy)
+    return mean+radius,mean-radius,np.arctan2(2*tau_xy,sigma_x-sigma_y)/2
+
 
 def initCrackWidthParameters(t,rebar_dict,kappa,k1=0.8,k3=3.4,k4=0.425,t_unit = "mm"):
     
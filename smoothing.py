@@ -0,0 +1,139 @@
+"""Nodal smoothing of shell stresses over the elements sharing a node
+
+FEM-design gives stresses per element and node, so the elements around a node give different values
+and the raw maximum is governed by the most extreme element at peaks and singularities. Here the
+element-node incidence is built once as a sparse (node, element-node) matrix, which the caller can
+keep and pass on for further exports of the same mesh, and the stresses of all load cases are averaged
+per node with one sparse matrix product. Stresses are averaged as x', y' components, since principal
+stresses of adjacent elements have different directions, and converted back to principal stresses
+afterwards. Nodes at known singularities, e.g. column corners and point supports, can be excluded
+from the result.
+
+scipy.sparse is used when installed, otherwise the same sums are made with numpy.
+"""
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .shell_calculations import principalToComponents,componentsToPrincipal
+else:
+    from shell_calculations import principalToComponents,componentsToPrincipal
+
+FACES = ("top","bottom")
+
+class NodeIncidence:
+    """Sparse incidence between nodes and element-node pairs
+
+    node_codes: node index of every element-node pair
+    n_nodes: number of nodes
+    weights: weight of every element-node pair in the average, e.g. element area, 1 if None
+    pairs: MultiIndex of the element-node pairs, node columns and Elem, see nodeIncidence
+    node_columns: columns of pairs identifying a node
+    """
+    def __init__(self,node_codes,n_nodes,weights=None,pairs=None,node_columns=None):
+        self.node_codes=np.asarray(node_codes)
+        self.n_nodes=n_nodes
+        self.pairs=pairs
+        self.node_columns=node_columns
+        self.weights=np.ones(len(self.node_codes)) if weights is None else np.asarray(weights,dtype=float)
+        try:
+            import scipy.sparse
+            self.matrix=scipy.sparse.csr_matrix((self.weights,(self.node_codes,np.arange(len(self.node_codes)))),
+                shape=(n_nodes,len(self.node_codes)))
+        except ImportError:
+            self.matrix=None
+
+    def sum(self,values):
+        #Weighted sum per node of (n_pairs, n_columns) values
+        if self.matrix is not None:
+            return np.asarray(self.matrix@values)
+        sums=np.zeros((self.n_nodes,values.shape[1]))
+        np.add.at(sums,self.node_codes,self.weights[:,None]*values)
+        return sums
+
+    def mean(self,values):
+        #Weighted average per node of (n_pairs, n_columns) values, nan values are left out
+        missing=np.isnan(values)
+        #nodes without values, e.g. singular nodes left out, get nan
+        with np.errstate(invalid="ignore",divide="ignore"):
+            return self.sum(np.where(missing,0.0,values))/self.sum((~missing).astype(float))
+
+def _nodeColumns(df_sigma,node_columns):
+    #Shell and Node if Shell is in df_sigma, so stresses of different shells meeting at a node are not averaged together
+    if node_columns is None:
+        return ['Shell','Node'] if 'Shell' in df_sigma.columns else ['Node']
+    return list(node_columns)
+
+def nodeIncidence(df_sigma,node_columns=None,element_weights=None):
+    """NodeIncidence of the element-node pairs in df_sigma
+
+    The result only depends on the mesh, so it can be built once, e.g. from the first load case, and
+    passed to smoothNodalStresses for all exports of the same mesh.
+
+    df_sigma: dataframe with one row per element-node pair, or per element-node pair and load case
+    node_columns: columns identifying a node, see smoothNodalStresses
+    element_weights: dictionary or series of weight per Elem, equal weights if None
+    """
+    node_columns=_nodeColumns(df_sigma,node_columns)
+    pair_columns=node_columns+[column for column in ['Elem'] if column not in node_columns]
+
+    pairs=pd.MultiIndex.from_frame(df_sigma[pair_columns]).unique()
+    df_pairs=pairs.to_frame(index=False)
+    node_codes,nodes=pd.MultiIndex.from_frame(df_pairs[node_columns]).factorize()
+    weights=None if element_weights is None else df_pairs["Elem"].map(element_weights).to_numpy(dtype=float)
+
+    return NodeIncidence(node_codes,len(nodes),weights,pairs=pairs,node_columns=node_columns)
+
+def smoothNodalStresses(df_sigma,singular_nodes=(),element_weights=None,node_columns=None,per_node=False,incidence=None):
+    """Top and bottom stresses averaged over the elements sharing each node, for all load cases
+
+    df_sigma: dataframe from stress_approach.getTopBottomShellStressesDataFrame
+    singular_nodes: Node numbers excluded from the result, e.g. at column corners and point supports
+    element_weights: dictionary or series of weight per Elem, e.g. element area, equal weights if None
+    node_columns: columns identifying a node, Shell and Node if Shell is in df_sigma, so stresses of
+    different shells meeting at a node are not averaged together
+    per_node: return one row per node and load case instead of one row per element, node and load case
+    incidence: NodeIncidence from nodeIncidence to reuse, built from df_sigma if None. When given,
+    element_weights and node_columns are taken from incidence instead. Element-node pairs of incidence
+    missing from df_sigma, e.g. at singular nodes, are left out of the averages.
+
+    Returns dataframe with the columns of df_sigma and smoothed sigma_1, sigma_2 and alpha of each face
+    """
+    df_sigma=df_sigma[~df_sigma["Node"].isin(list(singular_nodes))].reset_index(drop=True)
+    if incidence is None:
+        incidence=nodeIncidence(df_sigma,node_columns,element_weights)
+    node_columns=incidence.node_columns
+
+    pair_codes=incidence.pairs.get_indexer(pd.MultiIndex.from_frame(df_sigma[list(incidence.pairs.names)]))
+    if (pair_codes<0).any():
+        raise ValueError(f"{(pair_codes<0).sum()} rows of df_sigma have element-node pairs not in incidence")
+    load_case_codes,load_cases=pd.factorize(df_sigma["load_case"],sort=False)
+
+    #x', y' components of both faces, as (element-node pair, load case, component) array
+    component_columns=[]
+    df_components=pd.DataFrame(index=df_sigma.index)
+    for face in FACES:
+        components=principalToComponents(df_sigma[f'sigma_1_{face}'],df_sigma[f'sigma_2_{face}'],df_sigma[f'alpha_{face}'])
+        for name,values in zip(("sigma_x","sigma_y","tau_xy"),components):
+            df_components[f"{name}_{face}"]=values
+            component_columns.append(f"{name}_{face}")
+    values=np.full((len(incidence.pairs),len(load_cases),len(component_columns)),np.nan)
+    values[pair_codes,load_case_codes]=df_components[component_columns].to_numpy()
+
+    nodal=incidence.mean(values.reshape(len(incidence.pairs),-1)).reshape(incidence.n_nodes,len(load_cases),len(component_columns))
+
+    if per_node:
+        #first row of every node and load case
+        node_codes=incidence.node_codes[pair_codes]
+        rows=np.unique(node_codes*len(load_cases)+load_case_codes,return_index=True)[1]
+        df_smoothed=df_sigma.iloc[rows][node_columns+['load_case']].reset_index(drop=True)
+        smoothed=nodal[node_codes[rows],load_case_codes[rows]]
+    else:
+        df_smoothed=df_sigma.copy()
+        smoothed=nodal[incidence.node_codes[pair_codes],load_case_codes]
+
+    for i,face in enumerate(FACES):
+        sigma_1,sigma_2,alpha=componentsToPrincipal(*smoothed[:,3*i:3*i+3].T)
+        df_smoothed[f'sigma_1_{face}'],df_smoothed[f'sigma_2_{face}'],df_smoothed[f'alpha_{face}']=sigma_1,sigma_2,alpha
+
+    return df_smoothed
@@ -0,0 +1,138 @@
+"""Streaming post-processing of FEM-design exports larger than memory
+
+Top and bottom stresses are read in chunks of rows, either from an excel export in openpyxl read-only
+mode or from a list file (.txt) from a FEM-design batch run. Each chunk is pushed through
+strainsAtRebars and the crack width calculation, and only running per-shell maxima and the n rows
+with largest crack width per shell are kept. Peak memory is therefore set by chunk_rows and the number
+of shells, not by the size of the model.
+"""
+import pandas as pd
+
+if __package__:
+    from .fd_loader import iterFemDesignWorkbookChunks
+    from .fd_text_export import iterFemDesignTextTables
+    from .crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+    from .group_selection import RunningNLargestPerGroup
+    from .stress_approach import strainsAtRebars
+else:
+    from fd_loader import iterFemDesignWorkbookChunks
+    from fd_text_export import iterFemDesignTextTables
+    from crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+    from group_selection import RunningNLargestPerGroup
+    from stress_approach import strainsAtRebars
+
+SIGMA_COLUMNS = ['Shell','Elem','Node','load_case','sigma_1_top','sigma_2_top','alpha_top','sigma_1_bottom','sigma_2_bottom','alpha_bottom']
+KEY_COLUMNS = ['Elem','Node','load_case']
+
+def _stressChunks(export_path,kind,chunk_rows):
+    if str(export_path).lower().endswith(".txt"):
+        for _,df_chunk in iterFemDesignTextTables(export_path,kinds=(kind,),chunk_rows=chunk_rows):
+            yield df_chunk
+    else:
+        yield from iterFemDesignWorkbookChunks(export_path,kind,chunk_rows=chunk_rows)
+
+def _fillBuffer(df_buffer,chunks,chunk_rows):
+    #Reading chunks until the buffer holds at least chunk_rows rows or the table is exhausted
+    frames=[df_buffer]
+    n_rows=len(df_buffer)
+    while n_rows<chunk_rows:
+        df_chunk=next(chunks,None)
+        if df_chunk is None:
+            break
+        frames.append(df_chunk)
+        n_rows+=len(df_chunk)
+    return pd.concat(frames,ignore_index=True,sort=False) if len(frames)>1 else df_buffer
+
+def iterTopBottomStressChunks(export_path,chunk_rows=50000):
+    """Yields chunks of paired top and bottom stresses
+
+    export_path: excel export or list file (.txt) from FEM-design
+    chunk_rows: largest number of rows per chunk
+
+    Chunks have the columns of getTopBottomShellStressesDataFrame, with missing shell names filled in.
+    Top and bottom tables must list elements, nodes and load cases in the same order, as FEM-design does.
+    """
+    top_chunks=_stressChunks(export_path,"stresses_top",chunk_rows)
+    bottom_chunks=_stressChunks(export_path,"stresses_bottom",chunk_rows)
+    df_top=pd.DataFrame()
+    df_bottom=pd.DataFrame()
+    last_shell=None
+
+    while True:
+        df_top=_fillBuffer(df_top,top_chunks,chunk_rows)
+        df_bottom=_fillBuffer(df_bottom,bottom_chunks,chunk_rows)
+        #rows beyond chunk_rows stay in the buffers for the next chunk
+        n_rows=min(len(df_top),len(df_bottom),chunk_rows)
+        if n_rows==0:
+            if len(df_top) or len(df_bottom):
+                raise ValueError("Top and bottom stresses do not have the same number of rows")
+            return
+
+        top,df_top=df_top.iloc[:n_rows].reset_index(drop=True),df_top.iloc[n_rows:].reset_index(drop=True)
+        bottom,df_bottom=df_bottom.iloc[:n_rows].reset_index(drop=True),df_bottom.iloc[n_rows:].reset_index(drop=True)
+        if not top[KEY_COLUMNS].equals(bottom[KEY_COLUMNS]):
+            raise ValueError("Top and bottom stresses are not listed in the same order of Elem, Node and load_case")
+
+        df_sigma=pd.DataFrame({
+            'Shell':top["Shell"],'Elem':top["Elem"],'Node':top["Node"],'load_case':top["load_case"],
+            'sigma_1_top':top["Sigma 1"],'sigma_2_top':top["Sigma 2"],'alpha_top':top["alpha"],
+            'sigma_1_bottom':bottom["Sigma 1"],'sigma_2_bottom':bottom["Sigma 2"],'alpha_bottom':bottom["alpha"]})
+
+        #Inserting missing shell names, carrying the last name over from the previous chunk
+        df_sigma["Shell"]=df_sigma["Shell"].ffill()
+        if last_shell is not None:
+            df_sigma["Shell"]=df_sigma["Shell"].fillna(last_shell)
+        last_shell=df_sigma["Shell"].iloc[-1]
+
+        yield df_sigma
+
+def streamCrackWidths(export_path,t,Ec,d_top,phi,cc,v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0,n_largest=1,
+    chunk_rows=50000,**crack_width_parameters):
+    """Crack widths for an export of any size, processed in chunks of rows
+
+    export_path: excel export or list file (.txt) from FEM-design
+    t, Ec, d_top, v, d_bottom, k_kappa_T, rebar_angle: see stress_approach.strainsAtRebars
+    phi, cc: rebar diameter and spacing [mm], one value or (x, y) tuple, see crack_width.crackWidthArrays
+    n_largest: number of rows with largest crack width kept per shell
+    crack_width_parameters: k1, k3, k4, kt, fct_eff, Es, Ecm passed to crack_width.crackWidthArrays
+
+    Returns (df_shell_max, df_largest):
+    df_shell_max: maximum wk_top, wk_bottom and wk per shell, largest of both reinforcement directions
+    df_largest: the n_largest rows per shell with largest wk=max(wk_top,wk_bottom), sorted by wk
+    """
+    phi_layers,cc_layers=directionValues(phi),directionValues(cc)
+    d_top_layers,d_bottom_layers=directionValues(d_top),directionValues(d_bottom)
+    df_shell_max=None
+    largest=RunningNLargestPerGroup("Shell","wk",n=n_largest)
+
+    for df_sigma in iterTopBottomStressChunks(export_path,chunk_rows=chunk_rows):
+        df_epsilon=strainsAtRebars(df_sigma,t,Ec,d_top,v=v,d_bottom=d_bottom,k_kappa_T=k_kappa_T,rebar_angle=rebar_angle)
+
+        df_chunk=df_sigma[SIGMA_COLUMNS].copy()
+        for direction in DIRECTIONS:
+            result=crackWidthArrays(df_epsilon[f"epsilon_{direction}_top"].to_numpy(),df_epsilon[f"epsilon_{direction}_bottom"].to_numpy(),
+                t,phi_layers[direction],cc_layers[direction],d_top_layers[direction],d_bottom=d_bottom_layers[direction],**crack_width_parameters)
+            for face in FACES:
+                df_chunk[f"epsilon_{direction}_{face}"]=df_epsilon[f"epsilon_{direction}_{face}"]
+                df_chunk[f"wk_{direction}_{face}"]=result[f"wk_{face}"]
+        for face in FACES:
+            df_chunk[f"wk_{face}"]=df_chunk[[f"wk_{direction}_{face}" for direction in DIRECTIONS]].max(axis=1)
+        df_chunk["wk"]=df_chunk[["wk_top","wk_bottom"]].max(axis=1)
+
+        #running maxima per shell
+        df_chunk_max=df_chunk.groupby("Shell",sort=False)[["wk_top","wk_bottom","wk"]].max()
+        if df_shell_max is None:
+            df_shell_max=df_chunk_max
+        else:
+            df_shell_max=pd.concat([df_shell_max,df_chunk_max]).groupby(level=0,sort=False).max()
+
+        #running n largest rows per shell
+        largest.update(df_chunk)
+
+    if df_shell_max is None:
+        raise ValueError(f"No shell stresses found in {export_path}")
+
+    df_shell_max=df_shell_max.reset_index()
+    df_largest=largest.result().sort_values(by=["wk"],ascending=False,kind="mergesort").reset_index(drop=True)
+
+    return df_shell_max,df_largest
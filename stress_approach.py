@@ -7,217 +7,174 @@ Shells, Stresses, bottom
 
 """
 import pandas as pd
-import openpyxl
-import math
-
-### NB, should operate with stresses in coordinate system because pricipal stresses may have different direction at top and bottom! ###
-
-def getLoadCaseName(xlsx_path,sheet):
-    #Get name of load case from cell A1 in FEM-design export
-
-    ####NEW CODE
-    workbook=openpyxl.load_workbook(xlsx_path)
-    worksheet=workbook[sheet]
-    load_case_string_raw=str(worksheet["A1"].value)
-    load_case=load_case_string_raw.split(": ")[-1]
-
-    return load_case
-
-def fillMissingStringsInDataFrame(df,column_name):
-    #A function that fills inn empty rows in dataframe columns after occuring string values
-    #For instance, when "fill all cells" is not selected in FEM-design export
-
-    #converting column to list
-    id_list = df[column_name].tolist()
-    for idx,item in enumerate(id_list):
-        if isinstance(item,str):
-            id_string = item
-        else:
-            id_list[idx]=id_string
-    
-    df[column_name]=id_list
-    return df
 
+if __package__:
+    from .fd_loader import fillMissingStringsInDataFrame
+    from .fd_cache import readFemDesignWorkbookCached
+    from .fd_text_export import readFemDesignTextExport
+    from .crack_width import FACES,DIRECTIONS,directionValues,crackWidthsInRebarDirections
+    from .shell_calculations import rebarDirectionStresses
+    from .group_selection import nLargestPerGroup
+    from .result_table import compactDataFrame
+    from .instrumentation import stage
+else:
+    from fd_loader import fillMissingStringsInDataFrame
+    from fd_cache import readFemDesignWorkbookCached
+    from fd_text_export import readFemDesignTextExport
+    from crack_width import FACES,DIRECTIONS,directionValues,crackWidthsInRebarDirections
+    from shell_calculations import rebarDirectionStresses
+    from group_selection import nLargestPerGroup
+    from result_table import compactDataFrame
+    from instrumentation import stage
+
+#Principal stresses may have different direction at top and bottom, strainsAtRebars therefore
+#rotates the stresses of each face into the reinforcement directions before combining them
+
+SIGMA_COLUMNS = ['sigma_1_top','sigma_2_top','alpha_top','sigma_1_bottom','sigma_2_bottom','alpha_bottom']
 
 def getNLargestSigma1(df_sigma_1,n=1):
     #Returning n largest sigma 1 of each shell
     df_sigma_1["Sigma 1"] = df_sigma_1["Sigma 1"].astype(float)
 
-    df_sigma_1_largest=df_sigma_1.groupby("ID").apply(lambda x: x.nlargest(n,"Sigma 1")).reset_index(drop=True)
+    df_sigma_1_largest=nLargestPerGroup(df_sigma_1,"ID","Sigma 1",n=n).reset_index(drop=True)
 
     #sorting dataframe by largest to smallest value of Sigma 1
     df_sigma_1_largest=df_sigma_1_largest.sort_values(by=["Sigma 1"])
 
     return df_sigma_1_largest
 
-# def getShellStressesDataFrame(xlsx_path,n_largest=1):
-#     #Reading entire workbook by xlsx_path into 
-#     pd_xlsx=pd.ExcelFile(xlsx_path)
-#     sigma_1_list=[]
-    
-
-#     for sheet in pd_xlsx.sheet_names:
-#         df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-        
-#         if "Shells, Stresses, top" in sheet:
-#             #Getting sheet into a dataframe
-#             load_case = getLoadCaseName(xlsx_path,sheet)    
-#             df_sheet["load_case"]=load_case
-
-#             sigma_1_list.append(df_sheet)
-            
-#         elif "Shells, Stresses, bottom" in sheet:
-#             load_case = getLoadCaseName(xlsx_path,sheet)
-#             df_sheet["load_case"]=load_case
-#             sigma_1_list.append(df_sheet)
-
-#     df_sigma_1 = pd.concat(sigma_1_list,ignore_index=True,sort=False)
-#     #Removing rows where Sigma 1 is not a number
-#     df_sigma_1 = df_sigma_1[pd.to_numeric(df_sigma_1["Sigma 1"], errors = "coerce").notnull()]
-#     df_sigma_1=df_sigma_1.rename({"Shell":"ID"},axis=1)
-
-#     #Inserting missing ID-values
-#     df_sigma_1=fillMissingStringsInDataFrame(df_sigma_1,"ID")
-#     #Filtering out n largest sigma 1 if specified
-#     if n_largest is not None:
-#         df_sigma_1 = getNLargestSigma1(df_sigma_1,n=n_largest)
-#     del df_sheet
-
-#     return df_sigma_1
-
-
-def getTopBottomShellStressesDataFrame(xlsx_path,n_largest=1):
-    #Reading entire workbook by xlsx_path into 
-    pd_xlsx=pd.ExcelFile(xlsx_path)
-    sigma_top_list=[]
-    sigma_bottom_list=[]
-    
-    for sheet in pd_xlsx.sheet_names:
-        df_sheet = pd.ExcelFile.parse(pd_xlsx,sheet,skiprows=1)
-        
-        if "Shells, Stresses, top" in sheet:
-            #Getting sheet into a dataframe
-            load_case = getLoadCaseName(xlsx_path,sheet)    
-            df_sheet["load_case"]=load_case
-
-            sigma_top_list.append(df_sheet)
-            
-        elif "Shells, Stresses, bottom" in sheet:
-            load_case = getLoadCaseName(xlsx_path,sheet)
-            df_sheet["load_case"]=load_case
-            sigma_bottom_list.append(df_sheet)
-
-    df_sigma_top = pd.concat(sigma_top_list,ignore_index=True,sort=False)
+def getTopBottomShellStressesDataFrame(xlsx_path,compact=False,float32=False):
+    #Reading top and bottom stresses with load case names in a single pass over the workbook
+    #or from the parquet cache if the export has been read before
+    #list files from a FEM-design batch run (.txt) are read directly without excel
+    #compact: categorical Shell and load_case and downcast Elem and Node, see result_table.compactDataFrame
+    #float32: stresses as float32, implies compact
+    if str(xlsx_path).lower().endswith(".txt"):
+        fd_workbook=readFemDesignTextExport(xlsx_path,kinds=("stresses_top","stresses_bottom"))
+    else:
+        fd_workbook=readFemDesignWorkbookCached(xlsx_path,kinds=("stresses_top","stresses_bottom"))
+
+    df_sigma_top = fd_workbook["stresses_top"]
     df_sigma_top=df_sigma_top.rename(columns={"Sigma 1":"sigma_1_top","Sigma 2":"sigma_2_top","alpha":"alpha_top"})
     
-    df_sigma_bottom = pd.concat(sigma_bottom_list,ignore_index=True,sort=False)
+    df_sigma_bottom = fd_workbook["stresses_bottom"]
     df_sigma_bottom=df_sigma_bottom.rename(columns={"Sigma 1":"sigma_1_bottom","Sigma 2":"sigma_2_bottom","alpha":"alpha_bottom"})
 
-    #merging dataframes
-    common_columns_top_bottom = list(set(df_sigma_top.columns).union(set(df_sigma_bottom.columns)))
+    #Inserting missing shell names before sorting, blank cells refer to the rows above
+    df_sigma_top=fillMissingStringsInDataFrame(df_sigma_top,"Shell")
+
+    #Pairing top and bottom stresses as an aligned join on sorted (Elem, Node, load_case)
+    #each key occurs once on each face, so the join is linear in the number of rows
+    key_columns=['Elem','Node','load_case']
+    with stage("pair_top_bottom") as pair_stage:
+        df_sigma_top=df_sigma_top[['Shell']+key_columns+['sigma_1_top','sigma_2_top','alpha_top']].set_index(key_columns).sort_index()
+        df_sigma_bottom=df_sigma_bottom[key_columns+['sigma_1_bottom','sigma_2_bottom','alpha_bottom']].set_index(key_columns).sort_index()
+        df_sigma=df_sigma_top.join(df_sigma_bottom,how="inner").reset_index()
+        pair_stage.rows=len(df_sigma)
+        pair_stage.load_cases=df_sigma["load_case"]
 
-    # print(common_columns_top_bottom)
-    df_sigma = pd.merge(df_sigma_top,df_sigma_bottom,on=["Elem"]).append(common_columns_top_bottom.remove("Elem"))
-    
     # #Removing rows where Sigma 1 is not a number
-    df_sigma_temp = df_sigma[pd.to_numeric(df_sigma["sigma_1_bottom"], errors = "coerce").notnull()]
-    
-    # #keeping only necessary columns
-    df_sigma=pd.DataFrame(columns=['Shell', 'Elem', 'Node', 'load_case','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom'])
-    df_sigma[['Shell', 'Elem', 'Node', 'load_case','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom']]=\
-        df_sigma_temp[['Shell_x', 'Elem', 'Node_x', 'load_case_x','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom']]
+    df_sigma = df_sigma[pd.to_numeric(df_sigma["sigma_1_bottom"], errors = "coerce").notnull()]
 
-    return df_sigma
+    # #keeping only necessary columns
+    df_sigma=df_sigma[['Shell', 'Elem', 'Node', 'load_case','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom']].reset_index(drop=True)
 
-def strainsAtRebars(df_sigma,t,Ec,d_top,v=0.15,d_bottom=None,k_kappa_T=2):
-    """Converts linearly elastic stresses to strains
-    
-    df_sigma: dataframe containing ['Shell', 'Elem', 'Node', 'load_case','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom']
-    t: thickness [mm]
-    Ec: E-modulus of concrete [N/mm2], usually 30 000 N/mm2 for B35 when considering cracking
-    v: poissons ratio
-    k_kappa_T: factor for increasing curvature when cross section cracks. 2.0 is considered conservative after cracks have stabilized
+    if compact or float32:
+        df_sigma=compactDataFrame(df_sigma,float32=float32)
 
-    d_top: d_eff for outer and innter reinforcement layer at top face
-    d_bottom: d_eff for outer and innter reinforcement layer at bottom face
+    return df_sigma
 
-    """
-    if d_bottom == None:
+def _rebarLayerStresses(sigma_1_top,sigma_2_top,alpha_top,sigma_1_bottom,sigma_2_bottom,alpha_bottom,t,Ec,d_top,
+    v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0):
+    #Stresses in reinforcement directions, curvatures, stresses at rebar layers and strains, as dictionary of arrays
+    if d_bottom is None:
         d_bottom = d_top
-   
-    #Curvatures after cracking, including k_kappa_T
-    df_sigma['kappa_1_T']=(df_sigma['sigma_1_top']-df_sigma['sigma_1_bottom'])/t*k_kappa_T
-    df_sigma['kappa_2_T']=(df_sigma['sigma_2_top']-df_sigma['sigma_2_bottom'])/t*k_kappa_T
-
-    #Average stress in plate:
-    df_sigma['sigma_1_mid']=(df_sigma['sigma_1_top']+df_sigma['sigma_1_bottom'])/2
-    df_sigma['sigma_2_mid']=(df_sigma['sigma_2_top']+df_sigma['sigma_2_bottom'])/2
+    d_top,d_bottom=directionValues(d_top),directionValues(d_bottom)
 
-    #Linear elastic plate stress at rebar layers
-    
-    df_sigma['sigma_1_top_at_rebars']=df_sigma['sigma_1_mid']+df_sigma['kappa_1_T']*(d_top-t/2)
-    df_sigma['sigma_1_bottom_at_rebars']=df_sigma['sigma_1_mid']+df_sigma['kappa_1_T']*-(d_top-t/2)
+    #Rotating principal stresses at each face into the reinforcement directions
+    values={}
+    for face,(sigma_1,sigma_2,alpha) in (("top",(sigma_1_top,sigma_2_top,alpha_top)),("bottom",(sigma_1_bottom,sigma_2_bottom,alpha_bottom))):
+        sigma_x,sigma_y,tau_xy=rebarDirectionStresses(sigma_1,sigma_2,alpha,rebar_angle=rebar_angle)
+        values[f'sigma_x_{face}'],values[f'sigma_y_{face}'],values[f'tau_xy_{face}']=sigma_x,sigma_y,tau_xy
 
-    df_sigma['sigma_2_top_at_rebars']=df_sigma['sigma_2_mid']+df_sigma['kappa_2_T']*(d_top-t/2)
-    df_sigma['sigma_2_bottom_at_rebars']=df_sigma['sigma_2_mid']+df_sigma['kappa_2_T']*-(d_top-t/2)
+    for direction in DIRECTIONS:
+        #Curvatures after cracking, including k_kappa_T
+        values[f'kappa_{direction}_T']=(values[f'sigma_{direction}_top']-values[f'sigma_{direction}_bottom'])/t*k_kappa_T
+        #Average stress in plate:
+        values[f'sigma_{direction}_mid']=(values[f'sigma_{direction}_top']+values[f'sigma_{direction}_bottom'])/2
 
-    df_epsilon=pd.DataFrame(columns=['epsilon_1_top','epsilon_1_bottom'])
-    df_epsilon['epsilon_1_top']=(df_sigma['sigma_1_top_at_rebars']-v*df_sigma['sigma_2_top_at_rebars'])
-    df_epsilon['epsilon_1_bottom']=(df_sigma['sigma_1_bottom_at_rebars']-v*df_sigma['sigma_2_bottom_at_rebars'])
-    
-    return df_epsilon
+    #Linear elastic plate stress in both directions at the rebar layer of each direction
+    for direction in DIRECTIONS:
+        for face,z in (("top",d_top[direction]-t/2),("bottom",-(d_bottom[direction]-t/2))):
+            sigma={other:values[f'sigma_{other}_mid']+values[f'kappa_{other}_T']*z for other in DIRECTIONS}
+            other="y" if direction=="x" else "x"
+            values[f'sigma_{direction}_{face}_at_rebars']=sigma[direction]
+            values[f'epsilon_{direction}_{face}']=(sigma[direction]-v*sigma[other])/Ec
 
+    return values
 
-def Sr_max(df_epsilon,t,phi,cc,d_top,k1=0.8,k3=3.4,k4=0.425,d_bottom=None):
-    """
-    This function should be adapted to different reinforcement in different direction. For now, it does not.
-
-    df_epsilon: dataframe containing epsilon_1_top and epsilon_1_bottom
-    phi: rebar diameter [mm]
-    c: rebar cover
-
-    d_top: d_eff for outer and innter reinforcement layer at top face
-    d_bottom: d_eff for outer and innter reinforcement layer at bottom face
-    """
-
-    df_epsilon['As_top']=phi**2/4*math.pi*1000/cc
-    df_epsilon['As_bottom']=phi**2/4*math.pi*1000/cc
+def strainsAtRebars(df_sigma,t,Ec,d_top,v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0):
+    """Converts linearly elastic stresses to strains in the reinforcement directions
 
+    The principal stresses of each face are rotated into the x and y reinforcement directions using
+    alpha_top and alpha_bottom, so faces with different principal directions are combined correctly.
 
-    df_epsilon['a_dist_top']=t-d_top #a better formula could be (cx+phi_x_ekv/2)*cos(theta)**2+(cy+phi_y_ekv/2)*sin(theta)**2
-    df_epsilon['a_dist_bottom']=t-d_bottom
-
-    # Building dataframe to get hef for each element
-    hef_dict = {'hef1_top':2.5*df_epsilon['a_dist_top']}
-
-    df_hef=[2.5*df_epsilon['a_dist_top'],]
-    df_epsilon['hc_ef_top']=df_hef.min(axis=1)
+    df_sigma: dataframe containing ['Shell', 'Elem', 'Node', 'load_case','sigma_1_top', 'sigma_2_top', 'alpha_top','sigma_1_bottom', 'sigma_2_bottom', 'alpha_bottom']
+    t: thickness [mm]
+    Ec: E-modulus of concrete [N/mm2], usually 30 000 N/mm2 for B35 when considering cracking
+    v: poissons ratio
+    k_kappa_T: factor for increasing curvature when cross section cracks. 2.0 is considered conservative after cracks have stabilized
+    rebar_angle: angle from x' to the x reinforcement [rad]
 
-    print(df_epsilon)
+    d_top: d_eff for outer and innter reinforcement layer at top face, one value or (x, y) tuple
+    d_bottom: d_eff for outer and innter reinforcement layer at bottom face, one value or (x, y) tuple
 
-    return None
+    Adds stresses in the reinforcement directions, curvatures and stresses at the rebar layers to df_sigma
+    Returns df_epsilon with epsilon_x_top, epsilon_x_bottom, epsilon_y_top and epsilon_y_bottom
+    """
+    with stage("strains_at_rebars",rows=len(df_sigma),load_cases=df_sigma.get("load_case")):
+        values=_rebarLayerStresses(*(df_sigma[column].to_numpy(dtype=float) for column in SIGMA_COLUMNS),
+            t,Ec,d_top,v=v,d_bottom=d_bottom,k_kappa_T=k_kappa_T,rebar_angle=rebar_angle)
 
-xlsx_path = "FD_STRESSES.xlsx"
+    epsilon_columns=[f'epsilon_{direction}_{face}' for direction in DIRECTIONS for face in FACES]
+    for column,column_values in values.items():
+        if column not in epsilon_columns:
+            df_sigma[column]=column_values
 
-# #Getting stresses
-df_sigma = getTopBottomShellStressesDataFrame(xlsx_path,n_largest=1)
+    df_epsilon=pd.DataFrame({column:values[column] for column in epsilon_columns},index=df_sigma.index)
 
-#Getting stresses at rebars from stresses
+    return df_epsilon
 
-t=300
-Ec=30000
-d_top = t-45-16
-df_epsilon = strainsAtRebars(df_sigma,t,Ec,d_top,v=0.15,d_bottom=None,k_kappa_T=2)
+def strainsAtRebarsArrays(sigma_1_top,sigma_2_top,alpha_top,sigma_1_bottom,sigma_2_bottom,alpha_bottom,t,Ec,d_top,
+    v=0.15,d_bottom=None,k_kappa_T=2,rebar_angle=0):
+    """Same calculation as strainsAtRebars on arrays, without adding intermediate columns
 
-phi=16
-cc=200
+    All arguments are broadcast against each other, so stresses of shape (n,1) and parameters of
+    shape (1,m) give strains for every row and parameter set in one evaluation.
 
-Srmax=Sr_max(df_epsilon,phi,cc,d_top)
-print(Srmax)
+    Returns dictionary with epsilon_x_top, epsilon_x_bottom, epsilon_y_top and epsilon_y_bottom
+    """
+    values=_rebarLayerStresses(sigma_1_top,sigma_2_top,alpha_top,sigma_1_bottom,sigma_2_bottom,alpha_bottom,t,Ec,d_top,
+        v=v,d_bottom=d_bottom,k_kappa_T=k_kappa_T,rebar_angle=rebar_angle)
 
+    return {f'epsilon_{direction}_{face}':values[f'epsilon_{direction}_{face}'] for direction in DIRECTIONS for face in FACES}
 
 
+if __name__=="__main__":
+    xlsx_path = "FD_STRESSES.xlsx"
 
+    # #Getting stresses
+    df_sigma = getTopBottomShellStressesDataFrame(xlsx_path)
 
+    #Getting stresses at rebars from stresses
 
+    t=300
+    Ec=30000
+    phi=16
+    cc=200
+    #outer x and inner y reinforcement layer
+    d_top = (t-45-phi/2,t-45-phi*3/2)
+    df_epsilon = strainsAtRebars(df_sigma,t,Ec,d_top,v=0.15,d_bottom=None,k_kappa_T=2)
 
+    df_crack_widths=crackWidthsInRebarDirections(df_epsilon,t,phi,cc,d_top)
+    print(df_crack_widths)
@@ -0,0 +1,205 @@
+"""Load combinations of deformation load cases by superposition of cached unit load case fields
+
+Shrinkage, temperature gradients and uniform temperature are linear elastic, so the stress, strain and
+curvature fields of a combination are the factored sum of the fields of its basic load cases. The
+linear fields are computed once per basic load case into dense (node, load case, component) arrays,
+and all combinations are produced by one matrix product with the (combination, load case) factor
+matrix. Only the nonlinear steps, principal stresses, cracking and crack widths, run per combination,
+vectorised over all nodes and combinations at once.
+
+Stresses are superposed as x', y' components, since principal stresses of different load cases do not
+add up. The combined stresses at the reinforcement layers are rotated into the reinforcement directions.
+"""
+import numpy as np
+import pandas as pd
+
+if __package__:
+    from .crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+    from .shell_calculations import initConcreteCracking,getEPS_0_NBatch,getKappa_MBatch,strainAtZBatch
+    from .shell_calculations import principalToComponents,componentsToPrincipal,rebarDirectionStresses
+else:
+    from crack_width import FACES,DIRECTIONS,directionValues,crackWidthArrays
+    from shell_calculations import initConcreteCracking,getEPS_0_NBatch,getKappa_MBatch,strainAtZBatch
+    from shell_calculations import principalToComponents,componentsToPrincipal,rebarDirectionStresses
+
+STRESS_KEY_COLUMNS = ['Shell','Elem','Node']
+FORCE_KEY_COLUMNS = ['ID','Elem','Node']
+FORCE_COLUMNS = {"N":["Nx'","Ny'","Nx'y'"],"M":["Mx'","My'","Mx'y'"]}
+
+class UnitLoadCases:
+    """Linear fields of basic load cases, one (n_nodes, n_load_cases, 3) array per field
+
+    df_keys: dataframe identifying the nodes, e.g. Shell, Elem and Node
+    load_cases: names of the basic load cases
+    fields: dictionary of field name to array, missing results are nan
+    """
+    def __init__(self,df_keys,load_cases,fields):
+        self.df_keys=df_keys.reset_index(drop=True)
+        self.load_cases=list(load_cases)
+        self.fields=fields
+
+    def factorMatrix(self,factors):
+        """(combination names, (n_combinations, n_load_cases) array) from factors
+
+        factors: dataframe with one row per combination and one column per basic load case, or a
+        dictionary {combination: {load case: factor}}. Load cases not given get the factor 0.
+        """
+        if isinstance(factors,dict):
+            factors=pd.DataFrame.from_dict(factors,orient="index")
+        unknown=[load_case for load_case in factors.columns if load_case not in self.load_cases]
+        if unknown:
+            raise ValueError(f"Load cases {unknown} are not among the basic load cases {self.load_cases}")
+        factors=factors.reindex(columns=self.load_cases).fillna(0)
+        return list(factors.index),factors.to_numpy(dtype=float)
+
+    def combine(self,factors):
+        """Combined fields for every combination by one matrix product per field
+
+        Returns (combination names, dictionary of field name to (n_nodes, n_combinations, 3) array),
+        nan where a basic load case with non-zero factor is missing for a node
+        """
+        names,factor_matrix=self.factorMatrix(factors)
+        combined={}
+        for name,field in self.fields.items():
+            missing=np.isnan(field)
+            values=np.einsum("nlk,cl->nck",np.where(missing,0.0,field),factor_matrix)
+            used_missing=np.einsum("nlk,cl->nck",missing.astype(float),(factor_matrix!=0).astype(float))>0
+            combined[name]=np.where(used_missing,np.nan,values)
+        return names,combined
+
+def denseLoadCaseArrays(df,key_columns,value_columns):
+    #Pivoting a long table with one row per node and load case to (n_nodes, n_load_cases, n_values)
+    node_codes,df_keys=_factorizeRows(df[key_columns])
+    load_case_codes,load_cases=pd.factorize(df["load_case"],sort=False)
+
+    values=np.full((len(df_keys),len(load_cases),len(value_columns)),np.nan)
+    values[node_codes,load_case_codes]=df[value_columns].to_numpy(dtype=float)
+
+    return df_keys,list(load_cases),values
+
+def _factorizeRows(df_keys):
+    #Integer code per row and the unique rows, in order of first appearance
+    codes=pd.MultiIndex.from_frame(df_keys).factorize()[0]
+    first_rows=np.unique(codes,return_index=True)[1]
+    return codes,df_keys.iloc[first_rows].reset_index(drop=True)
+
+def stressUnitLoadCases(df_sigma,t,k_kappa_T=2):
+    """Membrane stresses and cracked curvatures of each basic load case from top and bottom stresses
+
+    df_sigma: dataframe from stress_approach.getTopBottomShellStressesDataFrame with the basic load cases
+    t: thickness [mm]
+    k_kappa_T: factor for increasing curvature when cross section cracks, as in strainsAtRebars
+
+    Returns UnitLoadCases with fields sigma_mid and kappa_T of [sigma_x, sigma_y, tau_xy] components
+    """
+    key_columns=[column for column in STRESS_KEY_COLUMNS if column in df_sigma.columns]
+    df_components=df_sigma[key_columns+['load_case']].copy()
+    for face in ("top","bottom"):
+        components=principalToComponents(df_sigma[f'sigma_1_{face}'],df_sigma[f'sigma_2_{face}'],df_sigma[f'alpha_{face}'])
+        for name,values in zip(("sigma_x","sigma_y","tau_xy"),components):
+            df_components[f"{name}_{face}"]=values
+
+    df_keys,load_cases,top=denseLoadCaseArrays(df_components,key_columns,["sigma_x_top","sigma_y_top","tau_xy_top"])
+    bottom=denseLoadCaseArrays(df_components,key_columns,["sigma_x_bottom","sigma_y_bottom","tau_xy_bottom"])[2]
+
+    t=np.broadcast_to(np.asarray(t,dtype=float),(len(df_keys),)) if np.ndim(t)==0 else _nodeValues(df_sigma,key_columns,t)
+    fields={"sigma_mid":(top+bottom)/2,"kappa_T":(top-bottom)/t[:,None,None]*k_kappa_T}
+
+    return UnitLoadCases(df_keys,load_cases,fields)
+
+def _nodeValues(df,key_columns,values):
+    #Per node value from a per row array, taking the first row of each node
+    codes=_factorizeRows(df[key_columns])[0]
+    first_rows=np.unique(codes,return_index=True)[1]
+    return np.asarray(values,dtype=float)[first_rows]
+
+def forceUnitLoadCases(df_forces,t,key_columns=None,materialModel=initConcreteCracking,t_unit="mm"):
+    """Strains in the middle plane and curvatures of each basic load case from internal forces
+
+    df_forces: dataframe from force_approach.getShellForces with the basic load cases
+    t: thickness [mm], scalar
+    key_columns: columns identifying the nodes, FORCE_KEY_COLUMNS present in df_forces if None
+
+    Returns UnitLoadCases with fields eps_0_N and kappa, see shell_calculations.getEPS_0_NBatch and getKappa_MBatch
+    """
+    if key_columns is None:
+        key_columns=[column for column in FORCE_KEY_COLUMNS if column in df_forces.columns]
+    df_keys,load_cases,forces=denseLoadCaseArrays(df_forces,key_columns,FORCE_COLUMNS["N"]+FORCE_COLUMNS["M"])
+
+    material=materialModel()
+    flat=forces.reshape(-1,6)
+    fields={"eps_0_N":getEPS_0_NBatch(t,flat[:,:3],t_unit=t_unit,material=material).reshape(forces.shape[:2]+(3,)),
+        "kappa":getKappa_MBatch(t,flat[:,3:],t_unit=t_unit,material=material).reshape(forces.shape[:2]+(3,))}
+
+    return UnitLoadCases(df_keys,load_cases,fields)
+
+def combinedStrainsAtRebars(unit_load_cases,factors,t,Ec,d_top,v=0.15,d_bottom=None,rebar_angle=0):
+    """Strains in the reinforcement directions at top and bottom reinforcement for every node and combination
+
+    unit_load_cases: output of stressUnitLoadCases
+    factors: load factors per combination, see UnitLoadCases.factorMatrix
+    t, Ec, d_top, v, d_bottom, rebar_angle: as for stress_approach.strainsAtRebars
+
+    Returns (combination names, dictionary with epsilon_x_top, epsilon_x_bottom, epsilon_y_top and
+    epsilon_y_bottom arrays of shape (n_nodes, n_combinations))
+    """
+    if d_bottom is None:
+        d_bottom=d_top
+    d_top,d_bottom=directionValues(d_top),directionValues(d_bottom)
+    names,combined=unit_load_cases.combine(factors)
+    sigma_mid,kappa_T=combined["sigma_mid"],combined["kappa_T"]
+
+    epsilon={}
+    for direction in DIRECTIONS:
+        other="y" if direction=="x" else "x"
+        for face,z in (("top",d_top[direction]-t/2),("bottom",-(d_bottom[direction]-t/2))):
+            #combined x', y' stresses at the rebar layer, rotated into the reinforcement directions
+            sigma_at_rebars=sigma_mid+kappa_T*z
+            sigma_1,sigma_2,alpha=componentsToPrincipal(sigma_at_rebars[...,0],sigma_at_rebars[...,1],sigma_at_rebars[...,2])
+            sigma=dict(zip(("x","y"),rebarDirectionStresses(sigma_1,sigma_2,alpha,rebar_angle=rebar_angle)[:2]))
+            epsilon[f"epsilon_{direction}_{face}"]=(sigma[direction]-v*sigma[other])/Ec
+
+    return names,epsilon
+
+def combinedStrainsAtZ(unit_load_cases,factors,z,z_unit="mm"):
+    """Strains at distance z from middle plane for every node and combination, with cracked bending
+
+    unit_load_cases: output of forceUnitLoadCases
+    z: [mm], scalar
+
+    Returns (combination names, (n_nodes, n_combinations, 3) array of [eps_x, eps_y, gamma_xy])
+    """
+    names,combined=unit_load_cases.combine(factors)
+    shape=combined["eps_0_N"].shape
+    eps_z=strainAtZBatch(combined["eps_0_N"].reshape(-1,3),combined["kappa"].reshape(-1,3),z,z_unit=z_unit)
+
+    return names,eps_z.reshape(shape)
+
+def combinedCrackWidths(unit_load_cases,factors,t,Ec,phi,cc,d_top,v=0.15,d_bottom=None,rebar_angle=0,**crack_width_parameters):
+    """Crack widths in both reinforcement directions at top and bottom for every node and combination
+
+    unit_load_cases: output of stressUnitLoadCases
+    factors: load factors per combination, see UnitLoadCases.factorMatrix
+    phi, cc, d_top, d_bottom: one value or (x, y) tuples, see crack_width.directionValues
+    crack_width_parameters: k1, k3, k4, kt, fct_eff, Es, Ecm passed to crack_width.crackWidthArrays
+
+    Returns dataframe with the node keys, load_case (combination name), epsilon_<direction>_<face>,
+    wk_<direction>_<face>, and wk_top and wk_bottom as the largest of both directions, one row per
+    node and combination
+    """
+    names,epsilon=combinedStrainsAtRebars(unit_load_cases,factors,t,Ec,d_top,v=v,d_bottom=d_bottom,rebar_angle=rebar_angle)
+    phi,cc,d_top,d_bottom=directionValues(phi),directionValues(cc),directionValues(d_top),directionValues(d_bottom)
+
+    n_nodes,n_combinations=epsilon["epsilon_x_top"].shape
+    df_crack_widths=unit_load_cases.df_keys.iloc[np.repeat(np.arange(n_nodes),n_combinations)].reset_index(drop=True)
+    df_crack_widths["load_case"]=np.tile(np.asarray(names,dtype=object),n_nodes)
+    for direction in DIRECTIONS:
+        result=crackWidthArrays(epsilon[f"epsilon_{direction}_top"],epsilon[f"epsilon_{direction}_bottom"],t,
+            phi[direction],cc[direction],d_top[direction],d_bottom=d_bottom[direction],**crack_width_parameters)
+        for face in FACES:
+            df_crack_widths[f"epsilon_{direction}_{face}"]=epsilon[f"epsilon_{direction}_{face}"].ravel()
+            df_crack_widths[f"wk_{direction}_{face}"]=np.broadcast_to(result[f"wk_{face}"],(n_nodes,n_combinations)).ravel()
+    for face in FACES:
+        df_crack_widths[f"wk_{face}"]=df_crack_widths[[f"wk_{direction}_{face}" for direction in DIRECTIONS]].max(axis=1)
+
+    return df_crack_widths
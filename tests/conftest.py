@@ -0,0 +1,8 @@
+import os
+import sys
+
+#the modules import each other by their plain names, as when run as scripts from the repository
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in (REPO_DIR,os.path.join(REPO_DIR,"inspiration"),os.path.join(REPO_DIR,"benchmarks")):
+    if directory not in sys.path:
+        sys.path.append(directory)
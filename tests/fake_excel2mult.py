@@ -0,0 +1,41 @@
+"""Stand-in for excel2mult in tests of excel2mult_runner
+
+Reads settings.json from the working directory like the design tool and writes the report it would
+create, <report_outputfile filename>.txt with the settings. The options make the run misbehave:
+
+    --exit-code N      exit with N after writing the report
+    --sleep-first S    sleep S seconds on the first run in the directory, e.g. to run into the timeout
+
+usage:
+    runExcel2MultJobs(payloads,command=[sys.executable,"tests/fake_excel2mult.py","--exit-code","3"])
+"""
+import sys
+import json
+import time
+import argparse
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Stand-in for excel2mult")
+    parser.add_argument("--exit-code",type=int,default=0)
+    parser.add_argument("--sleep-first",type=float,default=0.0)
+    args=parser.parse_args(argv)
+
+    #runs in this directory so far, kept in a file as every run is a new process
+    try:
+        with open("runs.txt","r") as f:
+            runs=int(f.read())
+    except FileNotFoundError:
+        runs=0
+    with open("runs.txt","w") as f:
+        f.write(str(runs+1))
+    if runs==0 and args.sleep_first>0:
+        time.sleep(args.sleep_first)
+
+    with open("settings.json","r") as f:
+        data=json.load(f)
+    with open(data["report_outputfile"]["filename"]+".txt","w") as f:
+        json.dump(data,f,indent=2)
+    return args.exit_code
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import DIRECTIONS,FACES,Sr_max,crackWidthArrays,crackWidths,crackWidthsInRebarDirections,getK2
+from stress_approach import SIGMA_COLUMNS,strainsAtRebars
+
+PARAMETERS = {"t":300,"phi":16,"cc":150,"d_top":(250,234)}
+
+@pytest.fixture
+def df_epsilon():
+    rng=np.random.default_rng(0)
+    df_sigma=pd.DataFrame(rng.normal(0.5,1.0,(50,len(SIGMA_COLUMNS))),columns=SIGMA_COLUMNS)
+    for face in FACES:
+        df_sigma[f"alpha_{face}"]=rng.uniform(-np.pi/2,np.pi/2,len(df_sigma))
+    return strainsAtRebars(df_sigma,t=300,Ec=30000,d_top=(250,234))
+
+def test_crack_widths_from_strains_at_rebars(df_epsilon):
+    df=crackWidths(df_epsilon.copy(),**PARAMETERS)
+    df_expected=crackWidthsInRebarDirections(df_epsilon.copy(),**PARAMETERS)
+
+    pd.testing.assert_frame_equal(df,df_expected)
+    for face in FACES:
+        assert (df[f"wk_{face}"]>=0).all()
+        np.testing.assert_array_equal(df[f"wk_{face}"],np.maximum(df[f"wk_x_{face}"],df[f"wk_y_{face}"]))
+
+def test_crack_spacing_from_strains_at_rebars(df_epsilon):
+    df=Sr_max(df_epsilon.copy(),**PARAMETERS)
+    df_widths=crackWidths(df_epsilon.copy(),**PARAMETERS)
+
+    for direction in DIRECTIONS:
+        for face in FACES:
+            np.testing.assert_array_equal(df[f"sr_max_{direction}_{face}"],df_widths[f"sr_max_{direction}_{face}"])
+
+def test_single_direction(df_epsilon):
+    df=crackWidths(df_epsilon.copy(),t=300,phi=16,cc=150,d_top=234,direction="y")
+
+    assert "wk_y_top" in df.columns
+    assert "wk_x_top" not in df.columns
+    np.testing.assert_array_equal(df["wk_y_top"],crackWidths(df_epsilon.copy(),**PARAMETERS)["wk_y_top"])
+
+def _crackWidthRow(eps_top,eps_bottom,t,phi,cc,d_top,d_bottom,k1=0.8,k3=3.4,k4=0.425,kt=0.4,fct_eff=3.2,Es=200000,Ecm=34000):
+    #EC2 7.3.4 for one row, written out per face as a reference for the vectorised engine
+    a={"top":t-d_top,"bottom":t-d_bottom}
+    #linear strain profile through the two layers, z from the top face
+    slope=(eps_bottom-eps_top)/(d_bottom-a["top"])
+    face_strain={"top":eps_top-slope*a["top"],"bottom":eps_top+slope*(t-a["top"])}
+    eps_layer={"top":eps_top,"bottom":eps_bottom}
+    eps1,eps2=max(face_strain.values()),min(face_strain.values())
+    k2=min(max((eps1+eps2)/(2*eps1),0.5),1.0) if eps1>0 else 0.5
+    As=math.pi*phi**2/4*1000/cc
+
+    result={"k2":k2}
+    for face,other in (("top","bottom"),("bottom","top")):
+        eps_face,eps_other=face_strain[face],face_strain[other]
+        x=t*-eps_other/(eps_face-eps_other) if eps_face>0 and eps_other<0 else 0.0
+        hc_ef=min(2.5*a[face],(t-x)/3) if x>0 else min(2.5*a[face],t/2)
+        rho=As/(hc_ef*1000)
+        c=a[face]-phi/2
+        sr_max=1.3*(t-x) if cc>5*(c+phi/2) else k3*c+k1*k2*k4*phi/rho
+        sigma_s=Es*max(eps_layer[face],0.0)
+        eps_sm_cm=max((sigma_s-kt*fct_eff/rho*(1+Es/Ecm*rho))/Es,0.6*sigma_s/Es)
+        result.update({f"x_{face}":x,f"hc_ef_{face}":hc_ef,f"sr_max_{face}":sr_max,f"wk_{face}":sr_max*eps_sm_cm})
+    return result
+
+def test_matches_reference_row_by_row():
+    rng=np.random.default_rng(0)
+    n=300
+    eps_top,eps_bottom=rng.normal(2e-4,6e-4,(2,n))
+    t=rng.choice([200.,300.,400.],n)
+    phi=rng.choice([10.,16.,25.],n)
+    #spacings below and above 5(c+phi/2)
+    cc=rng.choice([100.,150.,300.,600.],n)
+    d_top,d_bottom=t-rng.uniform(40,70,n),t-rng.uniform(40,70,n)
+
+    result=crackWidthArrays(eps_top,eps_bottom,t,phi,cc,d_top,d_bottom)
+    for i in range(n):
+        expected=_crackWidthRow(eps_top[i],eps_bottom[i],t[i],phi[i],cc[i],d_top[i],d_bottom[i])
+        for key,value in expected.items():
+            assert result[key][i]==pytest.approx(value,rel=1e-9,abs=1e-12),(i,key)
+
+def test_effective_height_in_pure_tension():
+    #both faces in tension, no compression zone: hc,ef=min(2.5(h-d), h/2)
+    result=crackWidthArrays(np.array([1e-3,1e-3]),np.array([1e-3,1e-3]),t=300,phi=16,cc=150,d_top=np.array([250.,200.]))
+    np.testing.assert_array_equal(result["x_top"],[0.,0.])
+    np.testing.assert_allclose(result["hc_ef_top"],[125.,150.])
+    np.testing.assert_allclose(result["k2"],[1.,1.])
+
+def test_effective_height_in_bending():
+    #top in tension, bottom in compression: hc,ef=min(2.5(h-d), (h-x)/3)
+    result=crackWidthArrays(np.array([1e-3]),np.array([-5e-4]),t=300,phi=16,cc=150,d_top=250)
+    x=result["x_top"][0]
+    assert 0<x<300
+    assert result["hc_ef_top"][0]==pytest.approx(min(125.,(300-x)/3))
+    assert result["k2"][0]==0.5
+    #the face in compression has no crack
+    assert result["wk_bottom"][0]==0
+
+def test_wide_spacing_upper_bound():
+    result=crackWidthArrays(np.array([1e-3]),np.array([1e-3]),t=300,phi=16,cc=400,d_top=250)
+    assert result["sr_max_top"][0]==pytest.approx(1.3*300)
+
+def test_k2_limits():
+    np.testing.assert_allclose(getK2(np.array([1.,1.,-1.,-1.]),np.array([1.,-1.,1.,-1.])),[1.,0.5,0.5,0.5])
@@ -0,0 +1,81 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width_batch import (SUMMARY_COLUMNS,crackWidthTable,exportKeys,exportParameters,main,outputPath,
+    readParameters,rebarDepths,runBatch,shellSummary)
+from stress_approach import getTopBottomShellStressesDataFrame
+from synthetic_exports import SyntheticModel,writeSyntheticExport
+
+@pytest.fixture(scope="module")
+def exports(tmp_path_factory):
+    #exports with the same file name in two folders
+    root=tmp_path_factory.mktemp("exports")
+    paths=[]
+    for seed,folder in enumerate(("part_A","part_B")):
+        os.makedirs(root/folder)
+        path=str(root/folder/"FD.txt")
+        writeSyntheticExport(SyntheticModel(n_shells=2,elements_per_shell=6,nodes_per_element=2,n_load_cases=2,seed=seed),path)
+        paths.append(path)
+    return paths
+
+def test_export_keys(tmp_path):
+    assert exportKeys([str(tmp_path/"a.xlsx"),str(tmp_path/"b.txt")])==["a.xlsx","b.txt"]
+    assert exportKeys([str(tmp_path/"A"/"FD.xlsx"),str(tmp_path/"B"/"C"/"FD.xlsx")])==["A/FD.xlsx","B/C/FD.xlsx"]
+    assert exportKeys([])==[]
+
+@pytest.mark.parametrize("names",[("FD.xlsx","FD.xlsx"),("FD.xlsx","FD.txt"),("A/FD.xlsx","A__FD.xlsx")])
+def test_duplicate_keys_are_rejected(tmp_path,names):
+    with pytest.raises(ValueError):
+        exportKeys([str(tmp_path/name) for name in names])
+
+def test_export_parameters(tmp_path):
+    path=tmp_path/"parameters.json"
+    path.write_text(json.dumps({"t":250,"phi":[16,12],"overrides":{"part_B/FD.txt":{"t":200}}}))
+    parameters=readParameters(str(path))
+
+    assert exportParameters(parameters,"part_A/FD.txt")["t"]==250
+    assert exportParameters(parameters,"part_B/FD.txt")["t"]==200
+    assert "overrides" not in exportParameters(parameters,"part_B/FD.txt")
+    #outer x layer from cover, inner y layer in contact with it
+    assert rebarDepths(exportParameters(parameters,"part_A/FD.txt"))==((250-45-8,250-45-16-6),None)
+    assert rebarDepths(dict(parameters,d_top=[240,225],d_bottom=[250,235]))==((240,225),(250,235))
+
+def _expectedSummary(export_path,parameters,export_key):
+    return shellSummary(crackWidthTable(getTopBottomShellStressesDataFrame(export_path),parameters),export_key)
+
+@pytest.mark.parametrize("max_workers",[1,2])
+def test_batch_matches_single_exports(exports,tmp_path,max_workers):
+    parameters=dict(readParameters(),overrides={"part_B/FD.txt":{"t":250,"cover":35}})
+    df_summary=runBatch(exports,parameters,output_dir=str(tmp_path),max_workers=max_workers)
+
+    df_expected=pd.concat([_expectedSummary(exports[0],exportParameters(parameters,"part_A/FD.txt"),"part_A/FD.txt"),
+        _expectedSummary(exports[1],exportParameters(parameters,"part_B/FD.txt"),"part_B/FD.txt")],ignore_index=True)
+    pd.testing.assert_frame_equal(df_summary.astype({"Shell":str,"load_case":str}),df_expected.astype({"Shell":str,"load_case":str}))
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path/"summary.csv"),df_expected.astype({"Shell":str,"load_case":str}),check_dtype=False)
+    for export_key in ("part_A/FD.txt","part_B/FD.txt"):
+        assert os.path.exists(outputPath(export_key,str(tmp_path),"csv"))
+    assert os.path.basename(outputPath("part_B/FD.txt",str(tmp_path),"csv"))=="part_B__FD_crack_widths.csv"
+
+def test_unknown_override_is_rejected(exports,tmp_path):
+    parameters=dict(readParameters(),overrides={"FD.txt":{"t":250}})
+    with pytest.raises(ValueError,match="not in the batch"):
+        runBatch(exports,parameters,output_dir=str(tmp_path),max_workers=1)
+
+def test_failed_export_is_reported(exports,tmp_path):
+    missing=os.path.join(os.path.dirname(exports[0]),"missing.txt")
+    df_summary=runBatch([exports[0],missing],readParameters(),output_dir=str(tmp_path),max_workers=1)
+
+    assert list(df_summary.columns)==SUMMARY_COLUMNS
+    assert (df_summary.loc[df_summary["export"]=="FD.txt","status"]=="ok").all()
+    failed=df_summary[df_summary["export"]=="missing.txt"]
+    assert len(failed)==1 and failed["status"].iloc[0].startswith("error")
+
+def test_command_line(exports,tmp_path,capsys):
+    pattern=os.path.join(os.path.dirname(os.path.dirname(exports[0])),"*","FD.txt")
+    assert main([pattern,"--output",str(tmp_path),"--workers","1"])==0
+    assert "Processed 2 exports, 0 failed" in capsys.readouterr().out
+    assert sorted(pd.read_csv(tmp_path/"summary.csv")["export"].unique())==["part_A/FD.txt","part_B/FD.txt"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from envelope import governingLoadCases,loadCaseEnvelope,selectGoverningRows
+
+LOAD_CASES = [f"LC{i}" for i in range(1,7)]
+
+@pytest.fixture
+def df():
+    rng=np.random.default_rng(0)
+    df_nodes=pd.DataFrame({"Shell":"S1","Elem":np.arange(30)//4+1,"Node":np.arange(30)%4+1})
+    df=pd.concat([df_nodes.assign(load_case=load_case) for load_case in LOAD_CASES],ignore_index=True)
+    #rounded values give ties, and some results are missing
+    df["wk_top"]=np.round(rng.uniform(0,0.4,len(df)),1)
+    df["wk_bottom"]=rng.uniform(0,0.4,len(df))
+    df.loc[rng.choice(len(df),20,replace=False),"wk_top"]=np.nan
+    df.loc[df["Elem"]==8,"wk_bottom"]=np.nan
+    return df.sample(frac=1,random_state=1).reset_index(drop=True)
+
+def _rankedRows(df,column):
+    #load cases per node sorted by value, largest first, ties in order of first appearance of the load case
+    load_case_order={load_case:i for i,load_case in enumerate(pd.unique(df["load_case"]))}
+    df=df.dropna(subset=[column]).assign(order=df["load_case"].map(load_case_order))
+    return df.sort_values([column,"order"],ascending=[False,True]).groupby(["Shell","Elem","Node"],sort=False)
+
+def test_envelope_matches_direct_maxima(df):
+    df_envelope,_=loadCaseEnvelope(df,top_k=3)
+    df_envelope=df_envelope.set_index(["Shell","Elem","Node"])
+
+    for column in ("wk_top","wk_bottom"):
+        np.testing.assert_array_equal(df_envelope[column],df.groupby(["Shell","Elem","Node"])[column].max()
+            .reindex(df_envelope.index))
+        for node,df_node in _rankedRows(df,column):
+            for k in range(3):
+                suffix="" if k==0 else f"_{k+1}"
+                if k<len(df_node):
+                    assert df_envelope.loc[node,f"{column}{suffix}"]==df_node[column].iloc[k]
+                    assert df_envelope.loc[node,f"{column}_case{suffix}"]==df_node["load_case"].iloc[k]
+                else:
+                    assert np.isnan(df_envelope.loc[node,f"{column}{suffix}"])
+                    assert df_envelope.loc[node,f"{column}_case{suffix}"] is None
+
+def test_missing_node_has_no_governing_case(df):
+    df_envelope,_=loadCaseEnvelope(df)
+    missing=df_envelope["Elem"]==8
+    assert df_envelope.loc[missing,"wk_bottom"].isna().all()
+    assert df_envelope.loc[missing,"wk_bottom_case"].isna().all()
+
+def test_index_selects_governing_rows(df):
+    df_envelope,df_index=loadCaseEnvelope(df,top_k=2)
+    assert isinstance(df_index["load_case"].dtype,pd.CategoricalDtype)
+
+    expected=set()
+    for column in ("wk_top","wk_bottom"):
+        for suffix in ("","_2"):
+            rows=df_envelope[df_envelope[f"{column}_case{suffix}"].notna()]
+            expected|=set(zip(rows["Shell"],rows["Elem"],rows["Node"],rows[f"{column}_case{suffix}"]))
+    assert set(df_index.astype({"load_case":object}).itertuples(index=False,name=None))==expected
+
+    df_governing=selectGoverningRows(df,df_index)
+    assert set(df_governing[["Shell","Elem","Node","load_case"]].itertuples(index=False,name=None))==expected
+    assert set(governingLoadCases(df_index))=={case for *_,case in expected}
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+
+import pandas as pd
+import pytest
+
+from excel2mult_runner import buildSettingsPayloads,runExcel2MultJobs
+from result_writers import writeGroupedFiles
+
+FAKE_EXCEL2MULT = os.path.join(os.path.dirname(os.path.abspath(__file__)),"fake_excel2mult.py")
+
+BASE_SETTINGS = {"excel_outputfile":{"filename":None,"LC":None},
+    "multicon_inputfile":{"phi_SO":None,"phi_SOQ":None,"phi_SU":None,"phi_SUQ":None},
+    "report_outputfile":{"filename":None}}
+
+def _payloads(n=2):
+    df=pd.DataFrame({"ID":[f"W.{i+1}" for i in range(n)],"LC ":range(1,n+1),
+        "phi_SO":12,"phi_SOQ":10,"phi_SU":16,"phi_SUQ":10})
+    return buildSettingsPayloads(df,BASE_SETTINGS)
+
+def _writeInputs(tmp_path,payloads):
+    for _,xlsx_filename,_ in payloads:
+        (tmp_path/xlsx_filename).write_bytes(xlsx_filename.encode())
+
+def _run(tmp_path,payloads,*args,**kwargs):
+    kwargs.setdefault("timeout",30)
+    _writeInputs(tmp_path,payloads)
+    return runExcel2MultJobs(payloads,command=[sys.executable,FAKE_EXCEL2MULT,*args],
+        work_root=str(tmp_path/"jobs"),input_dir=str(tmp_path),max_workers=2,**kwargs)
+
+def test_successful_jobs(tmp_path):
+    payloads=_payloads()
+    records=_run(tmp_path,payloads,retries=0)
+
+    assert [record["status"] for record in records]==["ok","ok"]
+    assert [record["attempts"] for record in records]==[1,1]
+    assert [record["returncode"] for record in records]==[0,0]
+    #every job reports from its own settings, so the jobs do not see each other's payload
+    for (job_name,xlsx_filename,settings),record in zip(payloads,records):
+        assert record["job"]==job_name
+        assert json.loads((tmp_path/"jobs"/job_name/(settings["report_outputfile"]["filename"]+".txt")).read_text())==settings
+    assert (tmp_path/"jobs"/payloads[0][0]/"W.1.xlsx").read_bytes()==b"W.1.xlsx"
+    assert (tmp_path/"jobs"/payloads[1][0]/"W.2.xlsx").read_bytes()==b"W.2.xlsx"
+
+def test_missing_input_is_rejected(tmp_path):
+    payloads=_payloads()
+    (tmp_path/"W.1.xlsx").write_bytes(b"input")
+    with pytest.raises(FileNotFoundError,match="W.2.xlsx"):
+        runExcel2MultJobs(payloads,command=[sys.executable,FAKE_EXCEL2MULT],work_root=str(tmp_path/"jobs"),
+            input_dir=str(tmp_path))
+    #no job is started
+    assert not (tmp_path/"jobs").exists()
+
+def test_input_names_match_written_files(tmp_path):
+    #IDs with characters not allowed in file names
+    df=pd.DataFrame({"ID":["W/1","P:2"],"LC ":[1,2],"phi_SO":12,"phi_SOQ":10,"phi_SU":16,"phi_SUQ":10})
+    written=writeGroupedFiles(df[["ID","phi_SO"]],output_dir=str(tmp_path),max_workers=1)
+    payloads=buildSettingsPayloads(df,BASE_SETTINGS)
+
+    assert sorted(xlsx_filename for _,xlsx_filename,_ in payloads)==sorted(os.path.basename(path) for path in written)
+    assert [settings["report_outputfile"]["filename"] for _,_,settings in payloads]==["W_1","P_2"]
+
+def test_timeout_is_retried(tmp_path):
+    payloads=_payloads(1)
+    records=_run(tmp_path,payloads,"--sleep-first","10",timeout=1,retries=1)
+
+    assert records[0]["status"]=="ok"
+    assert records[0]["attempts"]==2
+    assert (tmp_path/"jobs"/payloads[0][0]/"runs.txt").read_text()=="2"
+
+def test_timeout_without_retries(tmp_path):
+    records=_run(tmp_path,_payloads(1),"--sleep-first","10",timeout=1,retries=0)
+
+    assert records[0]["status"]=="timeout"
+    assert records[0]["returncode"] is None
+    assert records[0]["attempts"]==1
+
+def test_nonzero_exit(tmp_path):
+    payloads=_payloads(1)
+    records=_run(tmp_path,payloads,"--exit-code","3",retries=1)
+
+    assert records[0]["status"]=="failed"
+    assert records[0]["returncode"]==3
+    assert records[0]["attempts"]==2
+
+def test_missing_executable(tmp_path):
+    payloads=_payloads(1)
+    _writeInputs(tmp_path,payloads)
+    records=runExcel2MultJobs(payloads,command=[str(tmp_path/"missing.exe")],work_root=str(tmp_path/"jobs"),
+        input_dir=str(tmp_path),retries=2)
+
+    assert records[0]["status"]=="error"
+    assert records[0]["attempts"]==1
+
+def test_settings_and_manifest(tmp_path):
+    payloads=_payloads()
+    records=_run(tmp_path,payloads,retries=0)
+
+    for job_name,xlsx_filename,settings in payloads:
+        written=json.loads((tmp_path/"jobs"/job_name/"settings.json").read_text())
+        assert written==settings
+        assert written["excel_outputfile"]["filename"]==xlsx_filename
+    assert [settings["excel_outputfile"]["LC"] for _,_,settings in payloads]==[1,2]
+    assert payloads[1][2]["multicon_inputfile"]=={"phi_SO":12,"phi_SOQ":10,"phi_SU":16,"phi_SUQ":10}
+    #the base settings are copied, not modified
+    assert BASE_SETTINGS["report_outputfile"]["filename"] is None
+
+    manifest=json.loads((tmp_path/"jobs"/"manifest.json").read_text())
+    assert manifest==records
+    assert [record["input"] for record in manifest]==["W.1.xlsx","W.2.xlsx"]
+    assert all(record["work_dir"]==str(tmp_path/"jobs"/record["job"]) for record in manifest)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fd_loader import fillMissingStringsInDataFrame
+
+def _fillLoop(values):
+    #the python loop fillMissingStringsInDataFrame replaces, rows before the first string left empty
+    filled=[]
+    last=None
+    for value in values:
+        if isinstance(value,str):
+            last=value
+        filled.append(last)
+    return filled
+
+@pytest.mark.parametrize("seed",range(5))
+def test_fill_matches_loop(seed):
+    rng=np.random.default_rng(seed)
+    choices=np.array(["W.1","W.2","P.3","",None,np.nan,7,2.5],dtype=object)
+    values=list(rng.choice(choices,200,p=[0.1,0.1,0.1,0.05,0.35,0.2,0.05,0.05]))
+    #non-default index, as after filtering rows
+    df=pd.DataFrame({"ID":values,"Elem":np.arange(200)},index=np.arange(200)*3+1)
+
+    df_filled=fillMissingStringsInDataFrame(df.copy(),"ID")
+
+    assert isinstance(df_filled["ID"].dtype,pd.CategoricalDtype)
+    assert [None if pd.isnull(value) else value for value in df_filled["ID"]]==_fillLoop(values)
+    assert df_filled.index.equals(df.index)
+    pd.testing.assert_series_equal(df_filled["Elem"],df["Elem"])
+
+def test_leading_empty_rows_stay_empty():
+    df=fillMissingStringsInDataFrame(pd.DataFrame({"ID":[None,np.nan,"W.1",None,"W.2",np.nan]}),"ID")
+    assert df["ID"].isnull().tolist()==[True,True,False,False,False,False]
+    assert df["ID"].tolist()[2:]==["W.1","W.1","W.2","W.2"]
+
+def test_string_dtype_column():
+    #read_excel gives the pandas string dtype in pandas 3
+    df=pd.DataFrame({"ID":pd.array(["W.1",None,None,"P.2",None],dtype="string")})
+    assert fillMissingStringsInDataFrame(df,"ID")["ID"].tolist()==["W.1","W.1","W.1","P.2","P.2"]
+
+def test_column_without_strings():
+    df=fillMissingStringsInDataFrame(pd.DataFrame({"ID":[np.nan,np.nan]}),"ID")
+    assert df["ID"].isnull().all()
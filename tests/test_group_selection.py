@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from group_selection import RunningNLargestPerGroup,nLargestPerGroup
+
+@pytest.fixture
+def df():
+    rng=np.random.default_rng(0)
+    n_rows=400
+    #few distinct values for ties, blank cells as missing values and a group with only missing values
+    values=rng.integers(0,5,n_rows).astype(float)
+    values[rng.random(n_rows)<0.2]=np.nan
+    groups=rng.choice(["W.1","W.2","P.3","P.4"],n_rows).astype(object)
+    values[groups=="P.4"]=np.nan
+    groups[rng.random(n_rows)<0.05]=None
+    return pd.DataFrame({"ID":groups,"Sigma 1":values,"row":np.arange(n_rows)})
+
+def _groupbyNLargest(df,n):
+    #the per group implementation nLargestPerGroup replaces
+    df_largest=df.groupby("ID").apply(lambda x: x.nlargest(n,"Sigma 1"),include_groups=False)
+    return df_largest.reset_index(level=0).reset_index(drop=True)[df.columns]
+
+@pytest.mark.parametrize("n",[1,3,200])
+def test_same_rows_as_groupby_nlargest(df,n):
+    pd.testing.assert_frame_equal(nLargestPerGroup(df,"ID","Sigma 1",n=n).reset_index(drop=True),_groupbyNLargest(df,n))
+
+@pytest.mark.parametrize("n",[1,3,200])
+def test_running_same_as_all_chunks(df,n):
+    running=RunningNLargestPerGroup("ID","Sigma 1",n=n)
+    for start in range(0,len(df),70):
+        running.update(df.iloc[start:start+70])
+
+    pd.testing.assert_frame_equal(running.result(),nLargestPerGroup(df,"ID","Sigma 1",n=n).reset_index(drop=True))
+
+def test_missing_values_only_for_small_groups():
+    df=pd.DataFrame({"ID":["a","a","a","b"],"Sigma 1":[np.nan,1.0,1.0,np.nan]})
+
+    assert nLargestPerGroup(df,"ID","Sigma 1",n=2).index.tolist()==[1,2,3]
+    assert nLargestPerGroup(df,"ID","Sigma 1",n=3).index.tolist()==[1,2,0,3]
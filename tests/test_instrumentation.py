@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+import pytest
+
+from instrumentation import activeTrace,stage,tracing
+from crack_width_batch import crackWidthTable,readParameters
+from stress_approach import getTopBottomShellStressesDataFrame
+from synthetic_exports import SyntheticModel,writeSyntheticTextExport
+
+def test_no_records_without_trace():
+    with stage("outside",rows=10) as outside:
+        outside.rows=20
+    assert activeTrace() is None
+
+def test_nested_stages():
+    with tracing() as trace:
+        with stage("outer") as outer:
+            with stage("inner",rows=5,load_case="LC1"):
+                pass
+            with stage("inner",rows=7,load_case="LC2"):
+                pass
+            outer.rows=12
+
+    df=trace.toDataFrame()
+    assert df["name"].tolist()==["inner","inner","outer"]
+    assert [record["parent"] for record in trace.records]==["outer","outer",None]
+    assert df["depth"].tolist()==[1,1,0]
+    assert [record["load_case"] for record in trace.records]==["LC1","LC2",None]
+    assert df.loc[2,"wall_s"]>=df.loc[0,"wall_s"]+df.loc[1,"wall_s"]
+    assert df.loc[2,"start_s"]<=df.loc[0,"start_s"]<=df.loc[1,"start_s"]
+    assert (df["rss_growth_mb"]>=0).all()
+    assert df["rss_high_water_mb"].is_monotonic_increasing
+
+    df_summary=trace.summary().set_index("name")
+    assert df_summary.loc["inner","calls"]==2
+    assert df_summary.loc["inner","rows"]==12
+    assert df_summary.loc["inner","wall_s"]==pytest.approx(df.loc[0,"wall_s"]+df.loc[1,"wall_s"])
+    assert df_summary.loc["inner","rows_per_s"]==pytest.approx(12/df_summary.loc["inner","wall_s"])
+
+    df_by_load_case=trace.summary(by_load_case=True).set_index(["name","load_case"])
+    assert df_by_load_case.loc[("inner","LC2"),"rows"]==7
+
+def test_time_split_by_load_case_rows():
+    with tracing() as trace:
+        with stage("crack_widths",rows=4,load_cases=["LC1","LC2","LC1","LC1"]):
+            pass
+
+    wall=trace.records[0]["wall_s"]
+    assert trace.records[0]["load_case_rows"]=={"LC1":3,"LC2":1}
+    df_summary=trace.summary(by_load_case=True).set_index("load_case")
+    assert df_summary.loc["LC1","rows"]==3
+    assert df_summary.loc["LC1","wall_s"]==pytest.approx(0.75*wall)
+    assert df_summary.loc["LC2","wall_s"]==pytest.approx(0.25*wall)
+    assert trace.summary()["wall_s"].tolist()==[pytest.approx(wall)]
+
+def test_traced_memory_of_nested_stages():
+    with tracing(trace_memory=True) as trace:
+        with stage("outer"):
+            with stage("inner"):
+                data=bytearray(20*1024**2)
+            del data
+
+    df=trace.toDataFrame().set_index("name")
+    assert df.loc["inner","peak_traced_mb"]>=19
+    assert df.loc["outer","peak_traced_mb"]>=df.loc["inner","peak_traced_mb"]
+
+def test_only_one_trace():
+    with tracing():
+        with pytest.raises(RuntimeError):
+            with tracing():
+                pass
+
+def test_pipeline_stages_by_load_case(tmp_path):
+    txt_path=str(tmp_path/"FD.txt")
+    writeSyntheticTextExport(SyntheticModel(n_shells=2,elements_per_shell=10,n_load_cases=3),txt_path)
+    trace_path=tmp_path/"trace.json"
+
+    with tracing(trace_path) as trace:
+        df_result=crackWidthTable(getTopBottomShellStressesDataFrame(txt_path),readParameters())
+
+    df_summary=trace.summary(by_load_case=True)
+    load_cases=sorted(df_result["load_case"].unique())
+    for name in ("pair_top_bottom","strains_at_rebars","crack_widths"):
+        df_stage=df_summary[df_summary["name"]==name]
+        assert sorted(df_stage["load_case"])==load_cases,name
+        assert df_stage["rows"].sum()==len(df_result)
+
+    written=json.loads(trace_path.read_text())
+    assert [record["name"] for record in written["stages"]]==trace.toDataFrame()["name"].tolist()
+
+    trace.write(tmp_path/"trace.csv")
+    assert len(pd.read_csv(tmp_path/"trace.csv"))==len(trace.records)
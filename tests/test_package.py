@@ -0,0 +1,53 @@
+import os
+import sys
+import json
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#imports the repository as package under another name in a fresh interpreter, without the
+#repository or its parent folder on sys.path
+_PACKAGE_SCRIPT = """
+import sys,json,importlib.util
+sys.path=[path for path in sys.path if path not in ("",{repo_dir!r})]
+path_before=list(sys.path)
+modules_before=set(sys.modules)
+spec=importlib.util.spec_from_file_location("dlc",{init_path!r},submodule_search_locations=[{repo_dir!r}])
+dlc=importlib.util.module_from_spec(spec)
+sys.modules["dlc"]=dlc
+spec.loader.exec_module(dlc)
+imported_on_import=sorted(set(sys.modules)-modules_before-{{"dlc"}})
+
+resolved={{}}
+for name in dlc.__all__:
+    value=getattr(dlc,name)
+    module_name="dlc."+dlc._LAZY_ATTRIBUTES[name]
+    resolved[name]={{"module":getattr(value,"__module__",None),"same":getattr(sys.modules[module_name],name) is value}}
+print(json.dumps({{"imported_on_import":imported_on_import,"resolved":resolved,"path_unchanged":sys.path==path_before,
+    "dir":"getTopBottomShellStressesDataFrame" in dir(dlc),
+    "top_level":sorted(name for name in sys.modules if name in {module_names!r})}}))
+"""
+
+def _importPackage():
+    module_names=sorted({name for name in (os.path.splitext(file_name)[0] for file_name in os.listdir(REPO_DIR)
+        if file_name.endswith(".py")) if name!="__init__"})
+    script=_PACKAGE_SCRIPT.format(repo_dir=REPO_DIR,init_path=os.path.join(REPO_DIR,"__init__.py"),module_names=module_names)
+    completed=subprocess.run([sys.executable,"-c",script],cwd=os.path.dirname(REPO_DIR),capture_output=True,text=True)
+    assert completed.returncode==0,completed.stderr
+    return json.loads(completed.stdout.strip().split("\n")[-1])
+
+def test_lazy_attributes():
+    result=_importPackage()
+
+    #nothing but the package itself is imported until a name is accessed
+    assert result["imported_on_import"]==[]
+    assert result["dir"]
+    for name,resolved in result["resolved"].items():
+        assert resolved["same"],name
+        assert resolved["module"].startswith("dlc."),(name,resolved["module"])
+
+def test_no_top_level_modules():
+    result=_importPackage()
+
+    assert result["path_unchanged"]
+    assert result["top_level"]==[]
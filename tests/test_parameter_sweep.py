@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import FACES,crackWidthsInRebarDirections
+from parameter_sweep import parameterGrid,sweepCrackWidthArray,sweepCrackWidths,sweepFaceCrackWidths
+from stress_approach import SIGMA_COLUMNS,strainsAtRebars
+
+T = 300
+
+@pytest.fixture
+def df_sigma():
+    rng=np.random.default_rng(0)
+    df_sigma=pd.DataFrame(rng.normal(0.5,1.5,(40,len(SIGMA_COLUMNS))),columns=SIGMA_COLUMNS)
+    for face in FACES:
+        df_sigma[f"alpha_{face}"]=rng.uniform(-np.pi/2,np.pi/2,len(df_sigma))
+    df_sigma.loc[3,"sigma_1_top"]=np.nan
+    df_sigma["Elem"]=np.arange(len(df_sigma))//4
+    return df_sigma
+
+@pytest.fixture
+def grid():
+    return parameterGrid(phi=(12,16),cc=(150,200),cover=(40,50),k_kappa_T=(1,2),Ec=(30000,),v=(0.0,0.2))
+
+def _singleRun(df_sigma,parameters):
+    #one parameter set through the dataframe functions
+    d=T-parameters["cover"]-parameters["phi"]/2
+    d_top=(d,d-parameters["phi"])
+    df_epsilon=strainsAtRebars(df_sigma.copy(),T,parameters["Ec"],d_top,v=parameters["v"],k_kappa_T=parameters["k_kappa_T"])
+    return crackWidthsInRebarDirections(df_epsilon,T,parameters["phi"],parameters["cc"],d_top)
+
+def test_sweep_matches_single_runs(df_sigma,grid):
+    wk=sweepFaceCrackWidths(df_sigma,grid,T)
+
+    for j,parameters in grid.iterrows():
+        df=_singleRun(df_sigma,parameters)
+        for face in FACES:
+            np.testing.assert_allclose(wk[f"wk_{face}"][:,j],df[f"wk_{face}"],rtol=1e-10,equal_nan=True)
+
+def test_blocks_give_same_result(df_sigma,grid):
+    wk=sweepFaceCrackWidths(df_sigma,grid,T)
+    #fewer cells than parameter sets still evaluates one row at a time
+    for max_cells in (len(grid)*7,1):
+        wk_blocks=sweepFaceCrackWidths(df_sigma,grid,T,max_cells=max_cells)
+        for face in FACES:
+            np.testing.assert_array_equal(wk_blocks[f"wk_{face}"],wk[f"wk_{face}"])
+
+def test_face_selection(df_sigma,grid):
+    wk=sweepFaceCrackWidths(df_sigma,grid,T)
+    np.testing.assert_array_equal(sweepCrackWidthArray(df_sigma,grid,T,face="top"),wk["wk_top"])
+    np.testing.assert_array_equal(sweepCrackWidthArray(df_sigma,grid,T),np.maximum(wk["wk_top"],wk["wk_bottom"]))
+    with pytest.raises(ValueError):
+        sweepCrackWidthArray(df_sigma,grid,T,face="side")
+
+def test_labelled_dataframe(df_sigma,grid):
+    df=sweepCrackWidths(df_sigma,grid,T,as_xarray=False)
+    assert df.index.names==["Elem"]
+    assert list(df.columns.names)==list(grid.columns)
+    np.testing.assert_array_equal(df.to_numpy(),sweepCrackWidthArray(df_sigma,grid,T))
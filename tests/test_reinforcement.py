@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import crackWidthsInRebarDirections
+from reinforcement import CHECK_COLUMNS,LAYOUT_COLUMNS,minimumReinforcementLayout,nearestRebarIndex,proposeRebars,rebarAreaTable
+from shell_calculations import initReinforcementParameters
+from stress_approach import SIGMA_COLUMNS,strainsAtRebars
+
+def _proposeRebarLoop(As,area_unit=r'cm2/m',test_diameters_list=None,test_cc_list=None):
+    #the loop proposeRebars replaces, first candidate with strictly smaller error wins
+    D=[12,16,20,25,32] if test_diameters_list is None else test_diameters_list
+    S=[100,150,200,250] if test_cc_list is None else test_cc_list
+    scale_area=0.01 if area_unit==r'cm2/m' else 1
+    error=None
+    for d in D:
+        for s in S:
+            Asi=np.pi*d**2/4*1000/s*scale_area
+            if error is None or abs(As-Asi)<error:
+                error=abs(As-Asi)
+                candidate=(d,s)
+    return candidate
+
+@pytest.mark.parametrize("area_unit",[r'cm2/m',r'mm2/m'])
+def test_propose_rebars_matches_loop(area_unit):
+    rng=np.random.default_rng(0)
+    scale=0.01 if area_unit==r'cm2/m' else 1
+    table=rebarAreaTable(scale_area=scale)
+    #random areas, the candidate areas themselves, midpoints between candidates and values outside the table
+    As=np.concatenate([rng.uniform(0,9000,300)*scale,table["As"].to_numpy(),
+        (np.sort(table["As"].to_numpy())[1:]+np.sort(table["As"].to_numpy())[:-1])/2,[0.,1e6*scale]])
+
+    diameters,spacings=proposeRebars(As,area_unit=area_unit)
+    assert list(zip(diameters,spacings))==[_proposeRebarLoop(value,area_unit=area_unit) for value in As]
+
+def test_equal_areas_resolve_to_first_candidate():
+    #repeated areas and values halfway between two candidates give the candidate first in the table
+    As_table=np.array([5.,3.,3.,7.])
+    np.testing.assert_array_equal(nearestRebarIndex([3.,3.1,4.,6.,np.nan],As_table),[1,1,0,0,0])
+
+def test_shape_is_kept():
+    diameters,spacings=proposeRebars(np.full((2,3),10.0))
+    assert diameters.shape==spacings.shape==(2,3)
+
+@pytest.fixture
+def df_sigma():
+    rng=np.random.default_rng(1)
+    df_sigma=pd.DataFrame(rng.normal(10.0,8.0,(60,len(SIGMA_COLUMNS))),columns=SIGMA_COLUMNS)
+    for face in ("top","bottom"):
+        df_sigma[f"alpha_{face}"]=rng.uniform(-np.pi/2,np.pi/2,len(df_sigma))
+    df_sigma["Elem"]=np.arange(len(df_sigma))//6
+    return df_sigma
+
+def test_layout_columns_are_reinforcement_parameters(df_sigma):
+    df_layout=minimumReinforcementLayout(df_sigma,300,0.3,45)
+    assert list(df_layout.columns)==LAYOUT_COLUMNS
+    assert df_layout.index.name=="Elem"
+    for _,row in df_layout.iterrows():
+        rebar_dict=initReinforcementParameters(**row)
+        assert rebar_dict["y_u"]["c_yu"]==45+1.25*row["phi_xu"]
+
+def test_layout_is_smallest_candidate_meeting_limit(df_sigma):
+    wk_limit=0.2
+    df_layout,df_checks=minimumReinforcementLayout(df_sigma,300,wk_limit,45,return_checks=True)
+    assert list(df_checks.columns)==CHECK_COLUMNS
+    #the stresses give both varying layouts and groups where not even the largest candidate suffices
+    assert df_layout["phi_xu"].nunique()>1 and not df_checks["ok_bottom"].all()
+
+    table=rebarAreaTable()
+    for elem,df_elem in df_sigma.groupby("Elem"):
+        #crack widths of every candidate with the layers of initReinforcementParameters
+        wk={}
+        for phi,cc,As in table.itertuples(index=False):
+            d_top=(300-45-phi/2,300-45-1.25*phi-phi/2)
+            df_epsilon=strainsAtRebars(df_elem.copy(),300,30000,d_top,v=0.15,k_kappa_T=2)
+            df=crackWidthsInRebarDirections(df_epsilon,300,phi,cc,d_top)
+            wk[(phi,cc)]=(As,df["wk_top"].max(),df["wk_bottom"].max())
+        for face,suffix,position in (("top","o",1),("bottom","u",2)):
+            feasible=[(As,key) for key,(As,*widths) in wk.items() if widths[position-1]<=wk_limit]
+            expected=min(feasible)[1] if feasible else max(wk.items(),key=lambda item:item[1][0])[0]
+            assert (df_layout.loc[elem,f"phi_x{suffix}"],df_layout.loc[elem,f"cc_x{suffix}"])==expected
+            assert df_checks.loc[elem,f"ok_{face}"]==bool(feasible)
+            np.testing.assert_allclose(df_checks.loc[elem,f"wk_{face}"],wk[expected][position])
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import crackWidthsInRebarDirections
+from result_store import ResultStore,writeCrackWidthStore
+from stress_approach import getTopBottomShellStressesDataFrame,strainsAtRebars
+from synthetic_exports import SyntheticModel,iterTables,writeSyntheticTextExport
+
+KEYS = ['Shell','Elem','Node','load_case']
+PARAMETERS = {"t":300,"Ec":30000,"d_top":(250,234),"phi":16,"cc":150}
+MODEL = {"n_shells":3,"elements_per_shell":10,"nodes_per_element":2,"n_load_cases":3}
+
+def _writeTextExport(path,tables):
+    with open(path,"w",encoding="utf-8",newline="") as f:
+        for title,columns,units,df in tables:
+            f.write(title+"\n"+"\t".join(columns)+"\n")
+            if units is not None:
+                f.write("\t".join(units)+"\n")
+            df.to_csv(f,sep="\t",header=False,index=False,lineterminator="\n")
+            f.write("\n")
+
+@pytest.fixture(scope="module")
+def export_path(tmp_path_factory):
+    path=str(tmp_path_factory.mktemp("exports")/"FD.txt")
+    writeSyntheticTextExport(SyntheticModel(**MODEL),path)
+    return path
+
+@pytest.fixture(scope="module")
+def df_expected(export_path):
+    #crack widths of the whole export in memory
+    df_sigma=getTopBottomShellStressesDataFrame(export_path)
+    df_epsilon=strainsAtRebars(df_sigma.copy(),PARAMETERS["t"],PARAMETERS["Ec"],PARAMETERS["d_top"])
+    df_result=crackWidthsInRebarDirections(df_epsilon,PARAMETERS["t"],PARAMETERS["phi"],PARAMETERS["cc"],PARAMETERS["d_top"])
+    return pd.concat([df_sigma[KEYS].astype({"Shell":str,"load_case":str}),df_result[["wk_top","wk_bottom"]]],axis=1)
+
+@pytest.mark.parametrize("chunk_rows",[7,10**6])
+def test_store_matches_in_memory_crack_widths(export_path,df_expected,tmp_path,chunk_rows):
+    store=writeCrackWidthStore(export_path,str(tmp_path/"store"),chunk_rows=chunk_rows,**PARAMETERS)
+    assert store.load_cases==list(pd.unique(df_expected["load_case"]))
+
+    df=ResultStore(str(tmp_path/"store")).toDataFrame(["wk_top","wk_bottom"])
+    df=df.sort_values(KEYS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df,df_expected.sort_values(KEYS).reset_index(drop=True),check_dtype=False)
+
+def test_envelope_matches_direct_maxima(export_path,df_expected,tmp_path):
+    store=writeCrackWidthStore(export_path,str(tmp_path/"store"),**PARAMETERS)
+
+    df_envelope=store.envelope("wk_top").set_index(['Shell','Elem','Node'])
+    groups=df_expected.groupby(['Shell','Elem','Node'])["wk_top"]
+    np.testing.assert_array_equal(df_envelope["wk_top"],groups.max().reindex(df_envelope.index))
+    #governing load case is the first load case with the maximum
+    expected_case=df_expected.loc[groups.idxmax(),['Shell','Elem','Node','load_case']].set_index(['Shell','Elem','Node'])
+    assert list(df_envelope["wk_top_case"])==list(expected_case["load_case"].reindex(df_envelope.index))
+
+    df_shell_max=store.shellMaxima("wk_bottom").set_index("Shell")["wk_bottom"]
+    pd.testing.assert_series_equal(df_shell_max,df_expected.groupby("Shell")["wk_bottom"].max().reindex(df_shell_max.index),
+        check_names=False,check_index_type=False)
+
+def test_store_is_float32(export_path,tmp_path):
+    store=writeCrackWidthStore(export_path,str(tmp_path/"store"),dtype="float32",**PARAMETERS)
+    assert store.loadCaseArray("wk_top",store.load_cases[0]).dtype==np.float32
+    with pytest.raises(KeyError):
+        store.loadCaseArray("wk_top","LC9")
+    with pytest.raises(KeyError):
+        store.loadCaseArray("wk_side",store.load_cases[0])
+
+def _stressTables(model):
+    return [table for table in iterTables(model) if table[0].startswith("Shells, Stresses")]
+
+def test_unknown_nodes_are_rejected(tmp_path):
+    tables=_stressTables(SyntheticModel(**MODEL))
+    #a node of the second load case that is not in the first
+    for title,_,_,df in tables[2:4]:
+        df.loc[df.index[-1],"Node"]=99999
+    _writeTextExport(str(tmp_path/"FD.txt"),tables)
+
+    with pytest.raises(ValueError,match="not in"):
+        writeCrackWidthStore(str(tmp_path/"FD.txt"),str(tmp_path/"store"),**PARAMETERS)
+
+def test_repeated_load_case_is_rejected(tmp_path):
+    tables=_stressTables(SyntheticModel(**MODEL))
+    #the first load case again after the second
+    _writeTextExport(str(tmp_path/"FD.txt"),tables[:4]+tables[:2])
+
+    with pytest.raises(ValueError,match="consecutive"):
+        writeCrackWidthStore(str(tmp_path/"FD.txt"),str(tmp_path/"store"),**PARAMETERS)
+
+def test_missing_stresses_are_rejected(tmp_path):
+    _writeTextExport(str(tmp_path/"FD.txt"),[table for table in iterTables(SyntheticModel(**MODEL))
+        if not table[0].startswith("Shells, Stresses")])
+
+    with pytest.raises(ValueError,match="No shell stresses"):
+        writeCrackWidthStore(str(tmp_path/"FD.txt"),str(tmp_path/"store"),**PARAMETERS)
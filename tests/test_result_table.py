@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import crackWidthsInRebarDirections
+from result_table import ResultTable,compactDataFrame
+from stress_approach import SIGMA_COLUMNS,getTopBottomShellStressesDataFrame,strainsAtRebars
+from synthetic_exports import SyntheticModel,writeSyntheticTextExport
+
+D_TOP = (247,231)
+
+@pytest.fixture
+def df_sigma():
+    rng=np.random.default_rng(0)
+    n=60
+    df_sigma=pd.DataFrame({"Shell":rng.choice(["P.1","P.2","W.1"],n),"Elem":np.arange(n)//4+1,
+        "Node":np.arange(n)%4+1001,"load_case":rng.choice(["LC1 - for selected objects","LC2 - for selected objects"],n)})
+    for column in SIGMA_COLUMNS:
+        df_sigma[column]=rng.normal(2,3,n)
+    df_sigma.loc[5,"sigma_1_bottom"]=np.nan
+    return df_sigma
+
+def test_compact_dtypes(df_sigma):
+    df=compactDataFrame(df_sigma)
+
+    for column in ("Shell","load_case"):
+        assert isinstance(df[column].dtype,pd.CategoricalDtype)
+    assert df["Elem"].dtype==np.int8
+    assert df["Node"].dtype==np.int16
+    assert (df[SIGMA_COLUMNS].dtypes==np.float64).all()
+    assert compactDataFrame(df_sigma,float32=True)[SIGMA_COLUMNS].dtypes.eq(np.float32).all()
+    assert df.memory_usage(deep=True).sum()<df_sigma.memory_usage(deep=True).sum()
+
+def test_round_trip(df_sigma):
+    df=compactDataFrame(df_sigma)
+    #converting back gives the original values and dtypes
+    pd.testing.assert_frame_equal(df.astype(df_sigma.dtypes.to_dict()),df_sigma)
+
+    df=compactDataFrame(df_sigma,float32=True)
+    for column in SIGMA_COLUMNS:
+        np.testing.assert_allclose(df[column].astype(float),df_sigma[column],rtol=1e-6)
+    assert df["sigma_1_bottom"].isna().sum()==1
+
+def test_compact_reader(tmp_path):
+    path=str(tmp_path/"FD.txt")
+    writeSyntheticTextExport(SyntheticModel(n_shells=3,elements_per_shell=10,nodes_per_element=2,n_load_cases=2),path)
+    df_sigma=getTopBottomShellStressesDataFrame(path)
+    df=getTopBottomShellStressesDataFrame(path,float32=True)
+
+    assert isinstance(df["load_case"].dtype,pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(df.astype(df_sigma.dtypes.to_dict()),df_sigma,rtol=1e-6)
+
+def test_integer_columns_with_missing_values_are_kept(df_sigma):
+    df_sigma["Elem"]=df_sigma["Elem"].astype(float)
+    df_sigma.loc[0,"Elem"]=np.nan
+    pd.testing.assert_series_equal(compactDataFrame(df_sigma)["Elem"],df_sigma["Elem"])
+
+def test_derived_columns_match_dataframe_functions(df_sigma):
+    table=ResultTable(df_sigma).addRebarStrains(300,30000,D_TOP).addCrackWidths(300,16,150,D_TOP)
+    #nothing is computed before a derived column is accessed
+    assert "wk_top" in table and "wk_top" not in table.frame.columns
+
+    df_epsilon=strainsAtRebars(df_sigma.copy(),300,30000,D_TOP)
+    df_expected=crackWidthsInRebarDirections(df_epsilon.copy(),300,16,150,D_TOP)
+    np.testing.assert_array_equal(table["wk_top"],df_expected["wk_top"])
+    for column in ("epsilon_x_top","epsilon_y_bottom","wk_x_bottom","wk_bottom"):
+        np.testing.assert_array_equal(table.toDataFrame([column])[column],df_expected[column])
+    with pytest.raises(KeyError):
+        table["wk_z_top"]
+
+def test_float32_derived_columns(df_sigma):
+    table=ResultTable(df_sigma,float32=True).addRebarStrains(300,30000,D_TOP)
+    assert table["epsilon_x_top"].dtype==np.float32
+    df_epsilon=strainsAtRebars(df_sigma.copy(),300,30000,D_TOP)
+    np.testing.assert_allclose(table["epsilon_x_top"],df_epsilon["epsilon_x_top"],rtol=1e-5,atol=1e-9)
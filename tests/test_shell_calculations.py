@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from shell_calculations import (getEPS_0_N,getEPS_0_NBatch,getKappa_M,getKappa_MBatch,strainAtZ,strainAtZBatch,
+    strainAtZFromForcesBatch,principalToComponents,componentsToPrincipal)
+
+#the scalar functions the batch functions are compared with use np.matrix
+pytestmark=pytest.mark.filterwarnings("ignore::PendingDeprecationWarning")
+
+@pytest.fixture
+def forces():
+    rng=np.random.default_rng(0)
+    n=40
+    return {"t":rng.choice([200.,250.,300.],n),"N":rng.normal(0,200,(n,3)),"M":rng.normal(0,30,(n,3)),
+        "z":rng.uniform(-150,150,n)}
+
+def test_batch_strains_match_scalar_functions(forces):
+    eps_0_N=getEPS_0_NBatch(forces["t"],forces["N"])
+    kappa=getKappa_MBatch(forces["t"],forces["M"])
+    eps_z=strainAtZBatch(eps_0_N,kappa,forces["z"])
+
+    for i,(t,N,M,z) in enumerate(zip(forces["t"],forces["N"],forces["M"],forces["z"])):
+        eps_0_N_row=getEPS_0_N(t,np.matrix(N).T)
+        kappa_row=getKappa_M(t,np.matrix(M).T)
+        np.testing.assert_allclose(eps_0_N[i],eps_0_N_row,rtol=1e-12)
+        np.testing.assert_allclose(kappa[i],kappa_row,rtol=1e-12)
+        np.testing.assert_allclose(eps_z[i],strainAtZ(eps_0_N_row,kappa_row,z),rtol=1e-12,atol=1e-18)
+
+def test_cracked_rows_double_bending(forces):
+    eps_0_N=getEPS_0_NBatch(forces["t"],forces["N"])
+    kappa=getKappa_MBatch(forces["t"],forces["M"])
+    eps_z=strainAtZBatch(eps_0_N,kappa,forces["z"])
+
+    uncracked=eps_0_N-kappa*forces["z"][:,None]/1000
+    #both cracked and uncracked rows are covered by the random forces
+    assert (uncracked[:,0]>0).any() and (uncracked[:,0]<=0).any()
+    np.testing.assert_allclose(eps_z[:,2],uncracked[:,2])
+
+def test_strains_from_forces(forces):
+    eps_z=strainAtZFromForcesBatch(forces["t"],forces["N"],forces["M"],forces["z"])
+    eps_0_N=getEPS_0_NBatch(forces["t"],forces["N"])
+    kappa=getKappa_MBatch(forces["t"],forces["M"])
+    np.testing.assert_array_equal(eps_z,strainAtZBatch(eps_0_N,kappa,forces["z"]))
+
+def test_scalar_thickness_and_z(forces):
+    eps_0_N=getEPS_0_NBatch(300,forces["N"])
+    np.testing.assert_allclose(eps_0_N,getEPS_0_NBatch(np.full(len(forces["N"]),300.),forces["N"]))
+    np.testing.assert_allclose(strainAtZBatch(eps_0_N,eps_0_N,50),strainAtZBatch(eps_0_N,eps_0_N,np.full(len(eps_0_N),50.)))
+
+def test_principal_round_trip():
+    rng=np.random.default_rng(1)
+    sigma_x,sigma_y,tau_xy=rng.normal(0,2,(3,100))
+    np.testing.assert_allclose(principalToComponents(*componentsToPrincipal(sigma_x,sigma_y,tau_xy)),(sigma_x,sigma_y,tau_xy),atol=1e-12)
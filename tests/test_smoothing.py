@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shell_calculations import componentsToPrincipal,principalToComponents
+from smoothing import FACES,nodeIncidence,smoothNodalStresses
+from stress_approach import getTopBottomShellStressesDataFrame
+from synthetic_exports import SyntheticModel,writeSyntheticTextExport
+
+def _mesh(n_x,n_y,shell="S1"):
+    #quadrilateral elements on a n_x by n_y grid, neighbouring elements share their corner nodes
+    rows=[]
+    for i in range(n_x):
+        for j in range(n_y):
+            elem=i*n_y+j+1
+            for di,dj in ((0,0),(1,0),(1,1),(0,1)):
+                rows.append((shell,elem,(i+di)*(n_y+1)+j+dj+1))
+    return pd.DataFrame(rows,columns=["Shell","Elem","Node"])
+
+def _stresses(df_mesh,load_cases,seed=0):
+    rng=np.random.default_rng(seed)
+    df=pd.concat([df_mesh.assign(load_case=load_case) for load_case in load_cases],ignore_index=True)
+    for face in FACES:
+        df[f"sigma_1_{face}"]=rng.normal(1,2,len(df))
+        df[f"sigma_2_{face}"]=df[f"sigma_1_{face}"]-rng.uniform(0,3,len(df))
+        df[f"alpha_{face}"]=rng.uniform(-np.pi/2,np.pi/2,len(df))
+    return df
+
+@pytest.fixture
+def df_sigma():
+    return _stresses(_mesh(3,2),["LC1","LC2"])
+
+def _referenceSmoothing(df_sigma,weights=None):
+    #weighted average of the x', y' components over the elements sharing each node, per load case
+    df=df_sigma.copy()
+    df["weight"]=1.0 if weights is None else df["Elem"].map(weights)
+    columns=[]
+    for face in FACES:
+        for name,values in zip(("sigma_x","sigma_y","tau_xy"),
+                principalToComponents(df[f"sigma_1_{face}"],df[f"sigma_2_{face}"],df[f"alpha_{face}"])):
+            df[f"{name}_{face}"]=values*df["weight"]
+            columns.append(f"{name}_{face}")
+    groups=df.groupby(["Shell","Node","load_case"])
+    means=groups[columns].sum().div(groups["weight"].sum(),axis=0)
+    means=means.reindex(pd.MultiIndex.from_frame(df_sigma[["Shell","Node","load_case"]])).to_numpy()
+
+    df_expected=df_sigma.copy()
+    for i,face in enumerate(FACES):
+        for name,values in zip(("sigma_1","sigma_2","alpha"),componentsToPrincipal(*means[:,3*i:3*i+3].T)):
+            df_expected[f"{name}_{face}"]=values
+    return df_expected
+
+def test_smoothing_matches_grouped_average(df_sigma):
+    weights={elem:1.0+elem/10 for elem in df_sigma["Elem"].unique()}
+    pd.testing.assert_frame_equal(smoothNodalStresses(df_sigma),_referenceSmoothing(df_sigma),rtol=1e-10)
+    pd.testing.assert_frame_equal(smoothNodalStresses(df_sigma,element_weights=weights),
+        _referenceSmoothing(df_sigma,weights),rtol=1e-10)
+
+def test_shared_node_is_averaged(df_sigma):
+    df=smoothNodalStresses(df_sigma)
+    #the inner node of a 3x2 grid is shared by four elements, which all get the same smoothed stress
+    df_node=df[(df["Node"]==5)&(df["load_case"]=="LC1")]
+    assert len(df_node)==4
+    assert df_node["sigma_1_top"].nunique()==1
+
+def test_reused_incidence_gives_same_result(df_sigma):
+    weights={elem:2.0 if elem==1 else 1.0 for elem in df_sigma["Elem"].unique()}
+    incidence=nodeIncidence(df_sigma[df_sigma["load_case"]=="LC1"],element_weights=weights)
+    df_expected=smoothNodalStresses(df_sigma,element_weights=weights)
+    #results do not depend on what was smoothed before
+    smoothNodalStresses(_stresses(_mesh(2,2),["LC1"],seed=1))
+    pd.testing.assert_frame_equal(smoothNodalStresses(df_sigma,incidence=incidence),df_expected)
+    assert not df_expected["sigma_1_top"].isna().any()
+
+def test_singular_nodes_are_left_out(df_sigma):
+    incidence=nodeIncidence(df_sigma)
+    df=smoothNodalStresses(df_sigma,singular_nodes=[1,5],incidence=incidence)
+    df_remaining=df_sigma[~df_sigma["Node"].isin([1,5])].reset_index(drop=True)
+
+    assert not df["Node"].isin([1,5]).any()
+    pd.testing.assert_frame_equal(df,smoothNodalStresses(df_remaining),rtol=1e-12)
+
+def test_per_node(df_sigma):
+    df=smoothNodalStresses(df_sigma,per_node=True)
+    assert len(df)==12*2
+    assert not df.duplicated(["Shell","Node","load_case"]).any()
+
+def test_pairs_outside_incidence_are_rejected(df_sigma):
+    incidence=nodeIncidence(df_sigma[df_sigma["Elem"]!=6])
+    with pytest.raises(ValueError):
+        smoothNodalStresses(df_sigma,incidence=incidence)
+
+def test_synthetic_export_shares_nodes(tmp_path):
+    path=str(tmp_path/"FD.txt")
+    writeSyntheticTextExport(SyntheticModel(n_shells=2,elements_per_shell=5,nodes_per_element=4,n_load_cases=2),path)
+    df_sigma=getTopBottomShellStressesDataFrame(path).astype({"Shell":str,"load_case":str})
+
+    #all but the four end nodes of every strip of quads are shared by two elements of the same shell, none between shells
+    elements_per_node=df_sigma[df_sigma["load_case"]==df_sigma["load_case"].iloc[0]].groupby("Node")["Elem"].nunique()
+    assert sorted(elements_per_node.value_counts().items())==[(1,8),(2,16)]
+    assert (df_sigma.groupby("Node")["Shell"].nunique()==1).all()
+    pd.testing.assert_frame_equal(smoothNodalStresses(df_sigma),_referenceSmoothing(df_sigma),rtol=1e-10)
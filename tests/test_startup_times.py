@@ -0,0 +1,21 @@
+import pytest
+
+from startup_times import MODULES,DEFAULT_BUDGET_S,checkStartupTimes
+
+@pytest.fixture(scope="module")
+def startup_times():
+    #every module imported once in a fresh interpreter, see benchmarks/startup_times.py
+    return {result["module"]:result for result in checkStartupTimes(budget=DEFAULT_BUDGET_S,repeat=1)}
+
+@pytest.mark.parametrize("module",sorted(MODULES))
+def test_import_within_budget(startup_times,module):
+    result=startup_times[module]
+    assert result["import_s"]<=DEFAULT_BUDGET_S,result["reason"]
+
+@pytest.mark.parametrize("module",sorted(MODULES))
+def test_import_prints_nothing(startup_times,module):
+    assert startup_times[module]["output"]==""
+
+@pytest.mark.parametrize("module",sorted(MODULES))
+def test_import_without_heavy_dependencies(startup_times,module):
+    assert startup_times[module]["heavy"]==[]
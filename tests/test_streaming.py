@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import crackWidthsInRebarDirections
+from group_selection import nLargestPerGroup
+from stress_approach import getTopBottomShellStressesDataFrame,strainsAtRebars
+from streaming import iterTopBottomStressChunks,streamCrackWidths
+from synthetic_exports import SyntheticModel,writeSyntheticExport
+
+KEYS = ['Elem','Node','load_case']
+PARAMETERS = {"t":300,"Ec":30000,"d_top":(250,234),"phi":16,"cc":150}
+
+@pytest.fixture(scope="module",params=["xlsx","txt"])
+def export_path(request,tmp_path_factory):
+    path=str(tmp_path_factory.mktemp("exports")/f"FD.{request.param}")
+    writeSyntheticExport(SyntheticModel(n_shells=3,elements_per_shell=15,nodes_per_element=2,n_load_cases=3),path)
+    return path
+
+@pytest.mark.parametrize("chunk_rows",[7,50,10**6])
+def test_chunks_match_in_memory_stresses(export_path,chunk_rows):
+    df_chunks=pd.concat(list(iterTopBottomStressChunks(export_path,chunk_rows=chunk_rows)),ignore_index=True)
+    df_sigma=getTopBottomShellStressesDataFrame(export_path)
+
+    assert all(len(df)<=chunk_rows for df in iterTopBottomStressChunks(export_path,chunk_rows=chunk_rows))
+    df_chunks=df_chunks.sort_values(KEYS).reset_index(drop=True)
+    df_sigma=df_sigma.sort_values(KEYS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(df_chunks.astype({"Shell":str}),df_sigma.astype({"Shell":str}),check_dtype=False)
+
+@pytest.mark.parametrize("chunk_rows",[7,50])
+def test_stream_matches_in_memory_crack_widths(export_path,chunk_rows):
+    df_shell_max,df_largest=streamCrackWidths(export_path,n_largest=3,chunk_rows=chunk_rows,**PARAMETERS)
+    df_sigma=getTopBottomShellStressesDataFrame(export_path)
+    df_epsilon=strainsAtRebars(df_sigma,PARAMETERS["t"],PARAMETERS["Ec"],PARAMETERS["d_top"])
+    df_result=crackWidthsInRebarDirections(df_epsilon,PARAMETERS["t"],PARAMETERS["phi"],PARAMETERS["cc"],PARAMETERS["d_top"])
+    df_result=pd.concat([df_sigma[['Shell']+KEYS],df_result[["wk_top","wk_bottom"]]],axis=1)
+    df_result["wk"]=df_result[["wk_top","wk_bottom"]].max(axis=1)
+
+    df_expected_max=df_result.groupby("Shell",sort=True)[["wk_top","wk_bottom","wk"]].max().reset_index()
+    pd.testing.assert_frame_equal(df_shell_max.sort_values("Shell").reset_index(drop=True).astype({"Shell":str}),
+        df_expected_max.astype({"Shell":str}),check_dtype=False)
+
+    df_expected_largest=nLargestPerGroup(df_result,"Shell","wk",n=3)
+    def _rows(df):
+        return sorted(zip(df["Shell"].astype(str),df["Elem"],df["Node"],df["load_case"].astype(str),np.round(df["wk"],12)))
+    assert _rows(df_largest)==_rows(df_expected_largest)
+    assert df_largest["wk"].is_monotonic_decreasing
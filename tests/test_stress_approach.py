@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fd_loader import fillMissingStringsInDataFrame
+from stress_approach import getTopBottomShellStressesDataFrame
+from synthetic_exports import SyntheticModel,iterTables
+
+KEYS = ['Elem','Node','load_case']
+COLUMNS = ['Shell','Elem','Node','load_case','sigma_1_top','sigma_2_top','alpha_top','sigma_1_bottom','sigma_2_bottom','alpha_bottom']
+
+def _writeTextExport(path,tables):
+    with open(path,"w",encoding="utf-8",newline="") as f:
+        for title,columns,units,df in tables:
+            f.write(title+"\n"+"\t".join(columns)+"\n")
+            if units is not None:
+                f.write("\t".join(units)+"\n")
+            df.to_csv(f,sep="\t",header=False,index=False,lineterminator="\n")
+            f.write("\n")
+
+@pytest.fixture
+def export(tmp_path):
+    """Stress tables where some keys are only on one face and some bottom values are blank"""
+    rng=np.random.default_rng(0)
+    tables=[]
+    for title,columns,units,df in iterTables(SyntheticModel(n_shells=3,elements_per_shell=8,nodes_per_element=2,n_load_cases=2)):
+        if title.startswith("Shells, Stresses"):
+            #rows without shell name can be dropped without changing the shell of the other rows
+            blank=np.flatnonzero(df["Shell"].isnull().to_numpy())
+            df=df.drop(index=rng.choice(blank,3,replace=False))
+            if ", bottom," in title:
+                df.loc[df.index[rng.choice(np.flatnonzero(df["Shell"].isnull().to_numpy()),2,replace=False)],"Sigma 1"]=np.nan
+        tables.append((title,columns,units,df))
+    path=str(tmp_path/"FD.txt")
+    _writeTextExport(path,tables)
+    return path,tables
+
+def _referencePairing(tables):
+    #the merge of the previous implementation, on Elem, keeping the rows where node and load case also match
+    faces={}
+    for title,columns,units,df in tables:
+        for face in ("top","bottom"):
+            if title.startswith(f"Shells, Stresses, {face},"):
+                df=df.assign(load_case=title.split("Load case: ")[1])
+                faces.setdefault(face,[]).append(df)
+    df_top=fillMissingStringsInDataFrame(pd.concat(faces["top"],ignore_index=True),"Shell")
+    df_bottom=pd.concat(faces["bottom"],ignore_index=True)
+    df=pd.merge(df_top,df_bottom,on=["Elem"],suffixes=("_top","_bottom"))
+    df=df[(df["Node_top"]==df["Node_bottom"])&(df["load_case_top"]==df["load_case_bottom"])]
+    df=df[df["Sigma 1_bottom"].notnull()]
+    df=df.rename(columns={"Shell_top":"Shell","Node_top":"Node","load_case_top":"load_case","Sigma 1_top":"sigma_1_top",
+        "Sigma 2_top":"sigma_2_top","alpha_top":"alpha_top","Sigma 1_bottom":"sigma_1_bottom","Sigma 2_bottom":"sigma_2_bottom",
+        "alpha_bottom":"alpha_bottom"})
+    return df[COLUMNS].sort_values(KEYS).reset_index(drop=True)
+
+def test_keyed_join_matches_reference(export):
+    path,tables=export
+    df_sigma=getTopBottomShellStressesDataFrame(path)
+    df_expected=_referencePairing(tables)
+
+    pd.testing.assert_frame_equal(df_sigma.astype({"Shell":str,"load_case":str}),
+        df_expected.astype({"Shell":str,"load_case":str}),check_dtype=False)
+
+def test_unmatched_keys_are_dropped(export):
+    path,tables=export
+    df_sigma=getTopBottomShellStressesDataFrame(path)
+    n_rows=SyntheticModel(n_shells=3,elements_per_shell=8,nodes_per_element=2,n_load_cases=2).n_rows*2
+
+    #3 rows dropped from each of the 4 stress tables, 2 blank Sigma 1 on each bottom face, no duplicated keys
+    assert n_rows-4*3-2*2<=len(df_sigma)<=n_rows-2*3-2*2
+    assert not df_sigma.duplicated(KEYS).any()
+    assert df_sigma[KEYS].equals(df_sigma[KEYS].sort_values(KEYS).reset_index(drop=True))
+    assert df_sigma["sigma_1_bottom"].notnull().all()
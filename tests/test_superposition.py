@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crack_width import DIRECTIONS,FACES,crackWidthsInRebarDirections
+from shell_calculations import (componentsToPrincipal,getEPS_0_NBatch,getKappa_MBatch,principalToComponents,
+    strainAtZBatch)
+from stress_approach import strainsAtRebars
+from superposition import (FORCE_COLUMNS,UnitLoadCases,combinedCrackWidths,combinedStrainsAtRebars,
+    combinedStrainsAtZ,forceUnitLoadCases,stressUnitLoadCases)
+
+LOAD_CASES = ["shrinkage","temperature_gradient","temperature"]
+FACTORS = {"ULS":{"shrinkage":1.0,"temperature_gradient":1.5},
+    "SLS":{"shrinkage":1.0,"temperature_gradient":0.6,"temperature":-0.6},
+    "T":{"temperature":1.0}}
+T = 300
+
+def _nodes(n):
+    return pd.DataFrame({"Shell":"S1","Elem":np.arange(n)//4+1,"Node":np.arange(n)%4+1})
+
+@pytest.fixture
+def df_sigma():
+    rng=np.random.default_rng(0)
+    df_nodes=_nodes(24)
+    frames=[]
+    for load_case in LOAD_CASES:
+        df=df_nodes.copy()
+        df["load_case"]=load_case
+        for face in FACES:
+            df[f"sigma_1_{face}"]=rng.normal(2,3,len(df))
+            df[f"sigma_2_{face}"]=df[f"sigma_1_{face}"]-rng.uniform(0,4,len(df))
+            df[f"alpha_{face}"]=rng.uniform(-np.pi/2,np.pi/2,len(df))
+        frames.append(df)
+    return pd.concat(frames,ignore_index=True)
+
+def _combinedStresses(df_sigma,factors):
+    #each combination summed as x', y' components per node and converted back to principal stresses
+    frames=[]
+    for name,combination in factors.items():
+        df=df_sigma[df_sigma["load_case"]==LOAD_CASES[0]][["Shell","Elem","Node"]].reset_index(drop=True)
+        df["load_case"]=name
+        for face in FACES:
+            components=np.zeros((len(df),3))
+            for load_case,factor in combination.items():
+                df_case=df_sigma[df_sigma["load_case"]==load_case].reset_index(drop=True)
+                components+=factor*np.column_stack(principalToComponents(df_case[f"sigma_1_{face}"],
+                    df_case[f"sigma_2_{face}"],df_case[f"alpha_{face}"]))
+            for column,values in zip(("sigma_1","sigma_2","alpha"),componentsToPrincipal(*components.T)):
+                df[f"{column}_{face}"]=values
+        frames.append(df)
+    return pd.concat(frames,ignore_index=True)
+
+def test_combine_matches_factored_sum():
+    rng=np.random.default_rng(1)
+    field=rng.normal(size=(5,3,3))
+    field[0,2]=np.nan
+    unit_load_cases=UnitLoadCases(_nodes(5),LOAD_CASES,{"field":field})
+
+    names,combined=unit_load_cases.combine(FACTORS)
+    assert names==list(FACTORS)
+    for c,combination in enumerate(FACTORS.values()):
+        expected=sum(factor*field[:,LOAD_CASES.index(load_case)] for load_case,factor in combination.items())
+        #a missing load case only makes the combinations using it missing
+        np.testing.assert_allclose(combined["field"][:,c],expected,rtol=1e-12)
+    assert np.isnan(combined["field"][0,1]).all() and not np.isnan(combined["field"][0,0]).any()
+
+def test_unknown_load_case_is_rejected():
+    unit_load_cases=UnitLoadCases(_nodes(2),LOAD_CASES,{"field":np.zeros((2,3,3))})
+    with pytest.raises(ValueError):
+        unit_load_cases.combine({"ULS":{"wind":1.0}})
+
+def test_strains_at_rebars_match_combined_stresses(df_sigma):
+    d_top=(T-45-8,T-45-24)
+    names,epsilon=combinedStrainsAtRebars(stressUnitLoadCases(df_sigma,T,k_kappa_T=2),FACTORS,T,30000,d_top)
+    df_epsilon=strainsAtRebars(_combinedStresses(df_sigma,FACTORS),T,30000,d_top,k_kappa_T=2)
+
+    for direction in DIRECTIONS:
+        for face in FACES:
+            #rows of df_epsilon are ordered by combination, the arrays by node
+            expected=df_epsilon[f"epsilon_{direction}_{face}"].to_numpy().reshape(len(names),-1).T
+            np.testing.assert_allclose(epsilon[f"epsilon_{direction}_{face}"],expected,rtol=1e-9,atol=1e-15)
+
+def test_crack_widths_match_combined_stresses(df_sigma):
+    d_top=(T-45-8,T-45-24)
+    df=combinedCrackWidths(stressUnitLoadCases(df_sigma,T),FACTORS,T,30000,16,150,d_top)
+    df_epsilon=strainsAtRebars(_combinedStresses(df_sigma,FACTORS),T,30000,d_top)
+    df_expected=crackWidthsInRebarDirections(df_epsilon,T,16,150,d_top)
+
+    #one row per node and combination, against one row per combination and node
+    assert list(df["load_case"][:len(FACTORS)])==list(FACTORS)
+    for face in FACES:
+        expected=df_expected[f"wk_{face}"].to_numpy().reshape(len(FACTORS),-1).T.ravel()
+        np.testing.assert_allclose(df[f"wk_{face}"],expected,rtol=1e-9,atol=1e-12)
+
+def test_strains_at_z_match_combined_forces():
+    rng=np.random.default_rng(2)
+    df_nodes=_nodes(12).rename(columns={"Shell":"ID"})
+    columns=FORCE_COLUMNS["N"]+FORCE_COLUMNS["M"]
+    forces={load_case:rng.normal(0,100,(len(df_nodes),6)) for load_case in LOAD_CASES}
+    df_forces=pd.concat([df_nodes.assign(load_case=load_case,**dict(zip(columns,values.T)))
+        for load_case,values in forces.items()],ignore_index=True)
+
+    names,eps_z=combinedStrainsAtZ(forceUnitLoadCases(df_forces,T),FACTORS,100)
+    for c,combination in enumerate(FACTORS.values()):
+        combined=sum(factor*forces[load_case] for load_case,factor in combination.items())
+        expected=strainAtZBatch(getEPS_0_NBatch(T,combined[:,:3]),getKappa_MBatch(T,combined[:,3:]),100)
+        np.testing.assert_allclose(eps_z[:,c],expected,rtol=1e-9,atol=1e-15)
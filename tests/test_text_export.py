@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+import pytest
+
+from fd_loader import readFemDesignWorkbook
+from fd_text_export import RESULT_LISTPROCS,batchScriptString,readFemDesignTextExport
+from stress_approach import getTopBottomShellStressesDataFrame
+from synthetic_exports import SyntheticModel,writeSyntheticTextExport,writeSyntheticWorkbook
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def exports(tmp_path_factory):
+    #the same synthetic model written as excel and as list file
+    model=SyntheticModel(n_shells=3,elements_per_shell=20,nodes_per_element=2,n_load_cases=2)
+    directory=tmp_path_factory.mktemp("exports")
+    xlsx_path,txt_path=str(directory/"FD.xlsx"),str(directory/"FD.txt")
+    writeSyntheticWorkbook(model,xlsx_path)
+    writeSyntheticTextExport(model,txt_path)
+    return xlsx_path,txt_path
+
+def test_text_export_matches_workbook(exports):
+    xlsx_path,txt_path=exports
+    workbook=readFemDesignWorkbook(xlsx_path)
+    text_export=readFemDesignTextExport(txt_path)
+
+    assert sorted(text_export)==sorted(workbook)
+    for kind,df in workbook.items():
+        #the C parser and openpyxl give different integer and string dtypes for the same values
+        pd.testing.assert_frame_equal(text_export[kind],df,check_dtype=False,obj=kind)
+
+def test_stresses_from_text_export_match_workbook(exports):
+    xlsx_path,txt_path=exports
+    pd.testing.assert_frame_equal(getTopBottomShellStressesDataFrame(txt_path),
+        getTopBottomShellStressesDataFrame(xlsx_path),check_dtype=False)
+
+def test_batch_script_matches_template():
+    #stress_output_batch.bsc is saved from FEM-design, the generated script lists the same tables
+    with open(os.path.join(REPO_DIR,"stress_output_batch.bsc"),encoding="utf-8-sig") as f:
+        assert batchScriptString(["Svinn"])==f.read().strip()
+
+def test_batch_script_only_stresses():
+    assert list(RESULT_LISTPROCS)==["stresses"]
+    with pytest.raises(ValueError):
+        batchScriptString(["Svinn"],result_types=("internal_forces",))
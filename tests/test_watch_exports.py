@@ -0,0 +1,92 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+from crack_width_batch import readParameters
+from synthetic_exports import SyntheticModel,writeSyntheticTextExport
+from watch_exports import STATE_FILE,watchExports
+
+@pytest.fixture
+def folders(tmp_path):
+    export_dir,output_dir=tmp_path/"exports",tmp_path/"results"
+    export_dir.mkdir()
+    writeSyntheticTextExport(SyntheticModel(n_shells=2,elements_per_shell=10,n_load_cases=3),str(export_dir/"FD.txt"))
+    return export_dir,output_dir
+
+def _watch(folders,capsys,max_passes=1,**parameters):
+    export_dir,output_dir=folders
+    watchExports(str(export_dir),dict(readParameters(),**parameters),str(output_dir),interval=0,max_passes=max_passes)
+    return capsys.readouterr().out
+
+def _state(folders):
+    with open(folders[1]/STATE_FILE) as f:
+        return json.load(f)
+
+def _results(folders):
+    return pd.read_csv(folders[1]/"FD_crack_widths.csv")
+
+def _changeLoadCase(export_path,load_case):
+    #changes Sigma 1 of the first row of the top face of load_case and bumps the modification time
+    tables=export_path.read_text().split("\n\n")
+    for i,table in enumerate(tables):
+        if table.startswith("Shells, Stresses, top") and f"Load case: {load_case} " in table:
+            lines=table.split("\n")
+            cells=lines[3].split("\t")
+            cells[9]=str(float(cells[9])+1.0)
+            lines[3]="\t".join(cells)
+            tables[i]="\n".join(lines)
+    export_path.write_text("\n\n".join(tables))
+    stat=os.stat(export_path)
+    os.utime(export_path,ns=(stat.st_atime_ns,stat.st_mtime_ns+10**9))
+
+def test_new_export_is_computed(folders,capsys):
+    output=_watch(folders,capsys)
+
+    assert "FD.txt: recomputed 3 load cases" in output
+    assert sorted(_state(folders)["FD.txt"]["files"])==["FD_crack_widths.csv","FD_envelope.csv"]
+    assert _results(folders)["load_case"].nunique()==3
+
+def test_unchanged_export_is_skipped(folders,capsys):
+    output=_watch(folders,capsys,max_passes=2)
+
+    assert output.count("FD.txt: recomputed")==1
+    assert _watch(folders,capsys)==""
+
+def test_changed_load_case_is_recomputed(folders,capsys):
+    _watch(folders,capsys)
+    df_before=_results(folders)
+    _changeLoadCase(folders[0]/"FD.txt","LC2")
+    output=_watch(folders,capsys)
+
+    assert "recomputed 1 load cases ['LC2 - for selected objects']" in output
+    df_after=_results(folders)
+    changed=df_after["load_case"]=="LC2 - for selected objects"
+    pd.testing.assert_frame_equal(df_after[~changed],df_before[~changed])
+    assert not df_after[changed].equals(df_before[changed])
+
+    #same table as a full calculation of the changed export
+    full_folders=(folders[0],folders[1].parent/"full")
+    _watch(full_folders,capsys)
+    pd.testing.assert_frame_equal(df_after,pd.read_csv(full_folders[1]/"FD_crack_widths.csv"))
+
+def test_parameter_change_recomputes_every_load_case(folders,capsys):
+    _watch(folders,capsys)
+    df_before=_results(folders)
+    output=_watch(folders,capsys,t=250)
+
+    assert "FD.txt: recomputed 3 load cases" in output
+    df_after=_results(folders)
+    assert (df_after["wk"]!=df_before["wk"]).any()
+    assert _watch(folders,capsys,t=250)==""
+
+def test_removed_export_is_cleaned_up(folders,capsys):
+    _watch(folders,capsys)
+    os.remove(folders[0]/"FD.txt")
+    output=_watch(folders,capsys)
+
+    assert "FD.txt was removed" in output
+    assert _state(folders)=={}
+    assert not (folders[1]/"FD_crack_widths.csv").exists()
+    assert not (folders[1]/"FD_envelope.csv").exists()
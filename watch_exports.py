@@ -0,0 +1,213 @@
+"""Watching a folder of FEM-design exports and recomputing only the load cases that changed
+
+The export directory is polled on the local file system. When an export is new or its size or
+modification time changed, its top and bottom stresses are read and every load case is hashed. Only
+load cases with a new hash are pushed through the strain and crack width calculation, and their rows
+replace the previous rows in the persisted result table of the export. Load cases no longer in the
+export are removed. The envelope over load cases is then rebuilt from the persisted table.
+
+The calculation parameters of every export are hashed as well. When they change, e.g. another t, phi
+or cc in the parameter file, every load case of the export is recomputed, so a result table never
+mixes rows computed with different parameters. Results of exports removed from the folder are deleted.
+
+Persisted per export in the output directory:
+    <export>_crack_widths.<format>   result table, see crack_width_batch.crackWidthTable
+    <export>_envelope.<format>       largest wk_top, wk_bottom and wk per node with governing load case
+    watch_state.json                 size, modification time, parameter hash, load case hashes and
+                                     result files of every export
+
+usage:
+    python watch_exports.py exports --parameters parameters.json --output results --interval 10
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+import pandas as pd
+
+if __package__:
+    from .crack_width_batch import readParameters,exportParameters,crackWidthTable,outputPath
+else:
+    from crack_width_batch import readParameters,exportParameters,crackWidthTable,outputPath
+
+STATE_FILE = "watch_state.json"
+EXPORT_EXTENSIONS = (".xlsx",".txt")
+ENVELOPE_COLUMNS = ("wk_top","wk_bottom","wk")
+
+def findExports(export_dir):
+    #Exports in export_dir, without temporary files excel creates while a workbook is open
+    return sorted(os.path.join(export_dir,name) for name in os.listdir(export_dir)
+        if name.lower().endswith(EXPORT_EXTENSIONS) and not name.startswith("~$"))
+
+def loadCaseHashes(df_sigma):
+    #sha256 of the stress rows of every load case
+    row_hashes=pd.util.hash_pandas_object(df_sigma.drop(columns="load_case"),index=False).to_numpy()
+    hashes={}
+    for load_case,rows in df_sigma.groupby("load_case",sort=False).indices.items():
+        hashes[str(load_case)]=hashlib.sha256(row_hashes[rows].tobytes()).hexdigest()
+    return hashes
+
+def parameterHash(parameters):
+    #sha256 of the calculation parameters of an export, see crack_width_batch.exportParameters
+    return hashlib.sha256(json.dumps(parameters,sort_keys=True,default=str).encode()).hexdigest()
+
+def _readState(output_dir):
+    state_path=os.path.join(output_dir,STATE_FILE)
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path,"r") as f:
+        return json.load(f)
+
+def _writeState(output_dir,state):
+    #written to a temporary file first, so an interrupted write leaves the previous state
+    state_path=os.path.join(output_dir,STATE_FILE)
+    tmp_path=state_path+".tmp"
+    with open(tmp_path,"w") as f:
+        json.dump(state,f,indent=2)
+    os.replace(tmp_path,state_path)
+
+def _readResults(path,file_format):
+    if not os.path.exists(path):
+        return None
+    if file_format=="parquet":
+        return pd.read_parquet(path)
+    if file_format=="xlsx":
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+def updateExport(export_path,parameters,output_dir,export_state=None):
+    """Recomputes the changed load cases of one export and updates its persisted results
+
+    export_state: state of the export from the previous update, None for a new export
+        every load case is recomputed if the state was made with other parameters
+
+    Returns (new export state, list of recomputed load cases, list of removed load cases)
+    """
+    if __package__:
+        from .stress_approach import getTopBottomShellStressesDataFrame
+        from .result_writers import writeDataFrame
+        from .envelope import loadCaseEnvelope
+    else:
+        from stress_approach import getTopBottomShellStressesDataFrame
+        from result_writers import writeDataFrame
+        from envelope import loadCaseEnvelope
+
+    stat=os.stat(export_path)
+    df_sigma=getTopBottomShellStressesDataFrame(export_path)
+    hashes=loadCaseHashes(df_sigma)
+    parameter_hash=parameterHash(parameters)
+    if export_state is not None and export_state.get("parameters")!=parameter_hash:
+        #results of the previous parameters are not reused, load cases no longer in the export are still reported
+        export_state=dict(export_state,load_cases={load_case:None for load_case in export_state["load_cases"]})
+        reuse_results=False
+    else:
+        reuse_results=export_state is not None
+    previous_hashes={} if export_state is None else export_state["load_cases"]
+
+    changed=[load_case for load_case,value in hashes.items() if previous_hashes.get(load_case)!=value]
+    removed=[load_case for load_case in previous_hashes if load_case not in hashes]
+
+    file_format=parameters["output_format"]
+    #exports are all in one folder, so the file name is the key of the export, see crack_width_batch.exportKeys
+    result_path=outputPath(os.path.basename(export_path),output_dir,file_format)
+    envelope_path=os.path.join(output_dir,f"{os.path.splitext(os.path.basename(export_path))[0]}_envelope.{file_format}")
+    df_previous=_readResults(result_path,file_format) if reuse_results else None
+
+    if changed or removed or df_previous is None:
+        if df_previous is None:
+            #no persisted results to merge with, every load case is computed
+            changed=list(hashes)
+            df_kept=None
+        else:
+            df_kept=df_previous[~df_previous["load_case"].astype(str).isin(changed+removed)]
+        df_changed=df_sigma[df_sigma["load_case"].astype(str).isin(changed)].copy()
+        df_new=crackWidthTable(df_changed,parameters) if len(df_changed) else None
+
+        df_result=pd.concat([df for df in (df_kept,df_new) if df is not None],ignore_index=True)
+        #same row order as a full recalculation, see getTopBottomShellStressesDataFrame
+        df_result=df_result.sort_values(by=['Elem','Node','load_case'],kind="mergesort").reset_index(drop=True)
+        writeDataFrame(df_result,result_path,sheet_name="crack widths")
+
+        df_envelope=loadCaseEnvelope(df_result,value_columns=ENVELOPE_COLUMNS)[0]
+        writeDataFrame(df_envelope,envelope_path,sheet_name="envelope")
+
+    new_state={"size":stat.st_size,"mtime_ns":stat.st_mtime_ns,"parameters":parameter_hash,"load_cases":hashes,
+        "files":[os.path.basename(result_path),os.path.basename(envelope_path)]}
+    return new_state,changed,removed
+
+def _removeResults(output_dir,export_state):
+    #deletes the result files of an export no longer in the export folder
+    for file_name in export_state.get("files",[]):
+        path=os.path.join(output_dir,file_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+def updateExports(export_dir,parameters,output_dir):
+    """One polling pass over export_dir, updating exports that are new, changed on disk or whose parameters changed
+
+    The results of exports removed from export_dir are deleted.
+    Returns dictionary {export name: (recomputed load cases, removed load cases)} of updated exports
+    """
+    os.makedirs(output_dir,exist_ok=True)
+    state=_readState(output_dir)
+    updates={}
+
+    export_paths=findExports(export_dir)
+    for export_path in export_paths:
+        name=os.path.basename(export_path)
+        stat=os.stat(export_path)
+        export_state=state.get(name)
+        export_parameters=exportParameters(parameters,name)
+        if (export_state is not None and export_state["size"]==stat.st_size and export_state["mtime_ns"]==stat.st_mtime_ns
+            and export_state.get("parameters")==parameterHash(export_parameters)):
+            continue
+        try:
+            state[name],changed,removed=updateExport(export_path,export_parameters,output_dir,export_state)
+        except Exception as e:
+            #exports are often polled while FEM-design is still writing them, retried on the next pass
+            print(f"Could not update {name}: {e}")
+            continue
+        updates[name]=(changed,removed)
+        _writeState(output_dir,state)
+
+    for name in [name for name in state if name not in {os.path.basename(path) for path in export_paths}]:
+        print(f"{name} was removed from {export_dir}, its results are deleted")
+        _removeResults(output_dir,state.pop(name))
+        _writeState(output_dir,state)
+
+    return updates
+
+def watchExports(export_dir,parameters,output_dir,interval=10,max_passes=None):
+    """Polls export_dir every interval seconds and updates changed exports, until interrupted
+
+    max_passes: number of polling passes, runs until interrupted if None
+    """
+    n_passes=0
+    try:
+        while max_passes is None or n_passes<max_passes:
+            for name,(changed,removed) in updateExports(export_dir,parameters,output_dir).items():
+                print(f"{name}: recomputed {len(changed)} load cases {changed}, removed {len(removed)} {removed}")
+            n_passes+=1
+            if max_passes is None or n_passes<max_passes:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description="Recompute crack widths for changed load cases of FEM-design exports in a folder")
+    parser.add_argument("export_dir",help="folder with excel exports or list files")
+    parser.add_argument("--parameters",help="json parameter file, see crack_width_batch")
+    parser.add_argument("--output",default="crack_width_results",help="output directory")
+    parser.add_argument("--interval",type=float,default=10,help="seconds between polling passes")
+    parser.add_argument("--once",action="store_true",help="run a single polling pass and exit")
+    args=parser.parse_args(argv)
+
+    watchExports(args.export_dir,readParameters(args.parameters),args.output,interval=args.interval,
+        max_passes=1 if args.once else None)
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())